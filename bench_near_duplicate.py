@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmark deteksi pesan mirip: _calculate_similarity lama (scan linear) vs NearDuplicateIndex
+
+Korpus chat sintetis: sebagian pertanyaan dasar disimpan, lalu dicari
+variasinya (typo, geser/prefix, urutan kata dibalik, huruf dipanjangkan,
+emoji) sebagai positif, dan pertanyaan lain yang mirip strukturnya sebagai
+negatif. Dicetak precision/recall per threshold dan waktu lookup; pada
+threshold default (0.7) precision/recall dan deteksi pesan yang digeser atau
+diacak urutannya di-assert supaya tuning berikutnya tidak diam-diam turun.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from modules_client.near_duplicate import NearDuplicateIndex
+from modules_client.reply_cache import normalize_message
+
+TEMPLATES = [
+    "{x} apa yang paling bagus sekarang",
+    "bang kasih tips main {x} dong",
+    "gimana cara counter {x} di rank",
+    "kenapa {x} sering kalah di early game",
+    "boleh minta rekomendasi {x} buat pemula",
+    "menurut kamu {x} masih meta ga season ini",
+    "udah pernah coba {x} belum bang",
+    "berapa lama belajar {x} sampai jago",
+]
+TOPICS = ["hero", "item build", "emblem", "marksman", "tank", "assassin", "jungler",
+          "roamer", "mage", "fighter", "support", "spell", "layla", "miya", "tigreal"]
+FILLERS = ["bang", "kak", "min", "bro", "wkwk", "dong", "nih"]
+EMOJIS = ["🔥", "😂", "🙏", "!!!", "???"]
+
+# Batas bawah kualitas pada threshold default NearDuplicateStage
+DEFAULT_THRESHOLD = 0.7
+MIN_PRECISION = 0.90
+MIN_RECALL = 0.95
+
+# (pesan tersimpan, variasi yang harus terdeteksi sebagai pesan yang sama)
+SHIFTED_CASES = [
+    ("gimana cara counter layla di rank", "bang gimana cara counter layla di rank"),
+    ("gimana cara counter layla di rank", "wkwk bro gimana cara counter layla di rank"),
+    ("gimana cara counter layla di rank", "counter layla di rank gimana cara"),
+    ("gimana cara counter layla di rank", "di rank gimana cara counter layla"),
+    ("bang kasih tips main tank dong", "main tank dong bang kasih tips"),
+    ("bang kasih tips main tank dong", "kak bang kasih tips main tank dong 🔥🔥"),
+]
+
+
+def legacy_similarity(str1, str2):
+    """Salinan CohostTabBasic._calculate_similarity"""
+    if not str1 or not str2:
+        return 0.0
+    shorter = min(len(str1), len(str2))
+    longer = max(len(str1), len(str2))
+    matches = sum(1 for i in range(shorter) if str1[i] == str2[i])
+    words1 = set(str1.split())
+    words2 = set(str2.split())
+    word_sim = len(words1 & words2) / max(len(words1), len(words2)) if (words1 or words2) else 0
+    return (matches / longer + word_sim) / 2
+
+
+CHAT_WORDS = ("mantap", "gg", "wkwk", "halo", "semua", "salam", "dari", "jakarta", "bandung",
+              "keren", "banget", "main", "lagi", "dong", "push", "rank", "mabar", "yuk",
+              "kapan", "live", "besok", "pagi", "malam", "nonton", "terus", "semangat")
+
+
+def random_chat(rng):
+    """Komentar acak lain yang lewat di chat"""
+    return " ".join(rng.choice(CHAT_WORDS) for _ in range(rng.randint(3, 8)))
+
+
+def typo(text, rng):
+    i = rng.randrange(len(text) - 1)
+    op = rng.choice(("swap", "drop", "double"))
+    if op == "swap":
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if op == "drop":
+        return text[:i] + text[i + 1:]
+    return text[:i] + text[i] + text[i:]
+
+
+def variants(text, rng):
+    """Perubahan yang tetap dianggap pesan yang sama"""
+    words = text.split()
+    cut = rng.randrange(1, len(words))
+    stretched = " ".join(w + w[-1] * 4 if i == len(words) - 1 else w for i, w in enumerate(words))
+    return [
+        typo(text, rng),
+        typo(typo(text, rng), rng),
+        f"{rng.choice(FILLERS)} {text}",
+        f"{rng.choice(FILLERS)} {rng.choice(FILLERS)} {text}",
+        " ".join(words[cut:] + words[:cut]),
+        stretched,
+        f"{text} {rng.choice(EMOJIS)}{rng.choice(EMOJIS)}",
+        text.upper(),
+    ]
+
+
+def build_corpus(seed=7):
+    rng = random.Random(seed)
+    questions = [t.format(x=x) for t in TEMPLATES for x in TOPICS]
+    rng.shuffle(questions)
+    stored = questions[: len(questions) // 2]
+    unseen = questions[len(questions) // 2:]
+    positives = [(v, q) for q in stored for v in variants(q, rng)]
+    negatives = list(unseen) + [v for q in unseen[:30] for v in variants(q, rng)[:3]]
+    return stored, positives, negatives
+
+
+def evaluate(lookup, positives, negatives):
+    tp = fp = 0
+    for query, expected in positives:
+        found = lookup(query)
+        if found is None:
+            continue
+        if found == expected:
+            tp += 1
+        else:
+            fp += 1
+    for query in negatives:
+        if lookup(query) is not None:
+            fp += 1
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / len(positives)
+    return precision, recall
+
+
+def legacy_lookup_factory(stored, threshold):
+    normalized = [(normalize_message(q.lower()), q) for q in stored]
+
+    def lookup(query):
+        norm = normalize_message(query.lower())
+        best, best_score = None, 0.0
+        for other, original in normalized:
+            score = legacy_similarity(norm, other)
+            if score > threshold and score > best_score:
+                best, best_score = original, score
+        return best
+    return lookup
+
+
+def index_lookup_factory(stored, threshold, bands=16, rows=4):
+    index = NearDuplicateIndex(window=3600, threshold=threshold, bands=bands, rows=rows)
+    now = time.time()
+    for q in stored:
+        index.add(q, "viewer", now=now)
+
+    def lookup(query):
+        match = index.query(query, now=now)
+        return match.text if match else None
+    return lookup, index
+
+
+def check_shifted_and_reordered(threshold=DEFAULT_THRESHOLD):
+    """Pesan yang digeser (prefix) atau diacak urutannya harus ketemu, topik lain tidak"""
+    stored = sorted({original for original, _ in SHIFTED_CASES})
+    lookup, _ = index_lookup_factory(stored, threshold)
+    for original, query in SHIFTED_CASES:
+        found = lookup(query)
+        print(f"{query!r} -> {found!r}")
+        assert found == original, f"{query!r} harusnya cocok dengan {original!r}, dapat {found!r}"
+    other = "gimana cara counter miya di rank"
+    assert lookup(other) is None, f"{other!r} bukan pertanyaan yang sama"
+
+
+def per_query_us(lookup, queries, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for q in queries:
+            lookup(q)
+        best = min(best, time.perf_counter() - started)
+    return best / len(queries) * 1e6
+
+
+def main():
+    stored, positives, negatives = build_corpus()
+    print(f"Korpus: {len(stored)} disimpan, {len(positives)} positif, {len(negatives)} negatif\n")
+
+    print("Kualitas (precision / recall)")
+    print("-" * 50)
+    for threshold in (0.75, 0.85):
+        p, r = evaluate(legacy_lookup_factory(stored, threshold), positives, negatives)
+        print(f"legacy   threshold {threshold:.2f}: {p:.3f} / {r:.3f}")
+    for threshold in (0.4, 0.5, 0.6, 0.7):
+        lookup, _ = index_lookup_factory(stored, threshold)
+        p, r = evaluate(lookup, positives, negatives)
+        print(f"minhash  threshold {threshold:.2f}: {p:.3f} / {r:.3f}")
+        if threshold == DEFAULT_THRESHOLD:
+            assert p >= MIN_PRECISION, f"precision {p:.3f} < {MIN_PRECISION} pada threshold {threshold}"
+            assert r >= MIN_RECALL, f"recall {r:.3f} < {MIN_RECALL} pada threshold {threshold}"
+    for bands, rows in ((32, 2), (8, 8)):
+        lookup, _ = index_lookup_factory(stored, 0.7, bands, rows)
+        p, r = evaluate(lookup, positives, negatives)
+        print(f"minhash  0.70 bands {bands}x{rows}: {p:.3f} / {r:.3f}")
+
+    print("\nPesan digeser / urutan diacak")
+    print("-" * 50)
+    check_shifted_and_reordered()
+
+    print("\nWaktu lookup per pesan vs jumlah pesan dalam window")
+    print("-" * 50)
+    rng = random.Random(3)
+    queries = [q for q, _ in positives[:100]] + negatives[:100]
+    for size in (100, 1000, 5000):
+        history = stored + [random_chat(rng) for _ in range(size - len(stored))]
+        legacy = per_query_us(legacy_lookup_factory(history, 0.85), queries[:40], repeat=1)
+        lookup, index = index_lookup_factory(history, 0.7)
+        indexed = per_query_us(lookup, queries)
+        print(f"{size:>5} pesan: legacy {legacy:>9.1f} us | minhash {indexed:>7.1f} us"
+              f" | kandidat rata-rata {index.stats()['avg_candidates']}")
+
+
+if __name__ == "__main__":
+    main()
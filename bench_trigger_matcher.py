@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark trigger matching: cara lama (loop per trigger) vs TriggerMatcher terkompilasi
+"""
+
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from modules_client.trigger_matcher import compile_triggers
+
+MESSAGES = [
+    "halo bang apa kabar hari ini?",
+    "ketuwa build hero apa yang bagus buat push rank",
+    "wkwkwk mantap gameplay nya",
+    "kak boleh minta tips main marksman ga",
+    "udah makan belum bang",
+    "gg banget tadi savage nya",
+    "pertanyaan dong, rank sekarang apa?",
+    "salam dari bandung semuanya",
+]
+
+
+def legacy_has_trigger(message, trigger_words):
+    """Salinan logika _has_trigger lama (tanpa debug log)"""
+    message_lower = message.lower().strip()
+    for trigger_clean in trigger_words:
+        if trigger_clean and (
+            trigger_clean in message_lower or
+            any(word.startswith(trigger_clean) for word in message_lower.split()) or
+            any(trigger_clean in word for word in message_lower.split()) or
+            any(abs(len(word) - len(trigger_clean)) <= 2 and
+                sum(c1 != c2 for c1, c2 in zip(word, trigger_clean)) <= 2
+                for word in message_lower.split() if len(word) >= 3)
+        ):
+            return True
+    return False
+
+
+def make_triggers(count, rng):
+    """Frasa acak + trigger asli di akhir list (kasus terburuk loop lama)"""
+    triggers = []
+    while len(triggers) < count - 4:
+        length = rng.randint(5, 10)
+        triggers.append("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return triggers + ["ketua", "bang", "kak", "min"]
+
+
+def main():
+    rng = random.Random(42)
+    rounds = 2000
+    print(f"{'triggers':>8} | {'legacy us/msg':>14} | {'compiled us/msg':>15} | speedup")
+    print("-" * 56)
+    for count in (10, 100, 500):
+        triggers = make_triggers(count, rng)
+        matcher = compile_triggers(triggers)
+
+        def run_legacy():
+            for message in MESSAGES:
+                legacy_has_trigger(message, triggers)
+
+        def run_compiled():
+            for message in MESSAGES:
+                matcher.match(message)
+
+        legacy = min(timeit.repeat(run_legacy, number=rounds // 10, repeat=3)) / (rounds // 10) / len(MESSAGES)
+        compiled = min(timeit.repeat(run_compiled, number=rounds, repeat=3)) / rounds / len(MESSAGES)
+        build = min(timeit.repeat(lambda: compile_triggers(triggers), number=5, repeat=3)) / 5
+        print(f"{count:>8} | {legacy * 1e6:>14.1f} | {compiled * 1e6:>15.1f} | {legacy / compiled:>6.1f}x")
+        print(f"{'':>8}   compile {build * 1e3:.1f} ms (once per trigger-list change)")
+
+    print("\nContoh hasil match:")
+    matcher = compile_triggers(make_triggers(100, rng))
+    for message in MESSAGES:
+        print(f"  {message!r:55} -> {matcher.match(message)}")
+
+
+if __name__ == "__main__":
+    main()
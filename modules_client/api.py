@@ -8,7 +8,16 @@ import json
 import requests
 import logging
 import os
-from modules_client.config_manager import ConfigManager
+import tempfile
+import threading
+import time
+from modules_client.config_manager import get_config_manager
+from modules_client.http_pool import http_pool
+from modules_client.provider_chain import ProviderChain, ProviderUnavailable, HedgePolicy
+from modules_client.reply_stream import iter_sse_completion, StreamError
+from modules_client.prompt_builder import ChatPrompt, Prompt, as_messages, as_text, completion_params, record_prompt_usage
+from modules_client.rate_limiter import get_rate_limiter
+from modules_client.offline_responder import get_offline_responder
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -22,7 +31,7 @@ class APIClient:
     SUPABASE_ONLY = True
     VPS_DISABLED = True
     def __init__(self):
-        self.cfg = ConfigManager()
+        self.cfg = get_config_manager()
         # SUPABASE ONLY MODE - No VPS dependencies
         self.base_url = "supabase_backend"
         print(f"[API] SUPABASE ONLY MODE: Using Supabase backend")
@@ -40,7 +49,7 @@ class APIClient:
             
         try:
             url = f"{self.base_url}/{endpoint}"
-            response = requests.post(url, json=data, timeout=timeout)
+            response = http_pool.post(url, json=data, timeout=timeout)
             response.raise_for_status()
             return response
         except requests.exceptions.ConnectionError:
@@ -70,336 +79,524 @@ class APIClient:
             
             return "Maaf, sistem AI sedang dalam maintenance"
 
-# Global instance
-_api_client = APIClient()
+# Global instance (created on first use, not at import)
+_api_client = None
+_api_client_lock = threading.Lock()
+
+def _get_api_client() -> APIClient:
+    global _api_client
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = APIClient()
+        return _api_client
 
 # Export functions
 def generate_reply(prompt: str) -> str:
-    return _api_client.generate_reply(prompt)
+    return _get_api_client().generate_reply(prompt)
 
 def get_server_info():
     """Info server yang sedang digunakan (untuk debugging)"""
+    client = _get_api_client()
     return {
-        "server_url": _api_client.base_url,
-        "mode": "development" if "localhost" in _api_client.base_url else "production"
+        "server_url": client.base_url,
+        "mode": "development" if "localhost" in client.base_url else "production",
+        "active_server": api_bridge.active_server,
+        "last_probe": api_bridge.last_probe,
     }
 
+SERVER_CACHE_FILE = "temp/api_server.json"
+
 class APIBridge:
-    """Bridge untuk komunikasi dengan Supabase server"""
-    
-    def __init__(self):
+    """Bridge untuk komunikasi dengan Supabase server
+
+    Nothing here touches the network at construction. active_server starts
+    as the last known-good server persisted in temp/api_server.json and is
+    refreshed by health probes on a background thread; the Supabase client
+    is created on first use.
+    """
+
+    def __init__(self, cache_file: str = SERVER_CACHE_FILE, probe_interval: float = 300.0):
         # Initialize server URLs first
         self.vps_server = "supabase_backend"
         self.local_server = "http://localhost:8888"
-        self.active_server = self._get_active_server()
-        
-        # Import Supabase client
+        self.cache_file = Path(cache_file)
+        self.probe_interval = probe_interval
+        self.last_probe = 0.0
+        self._lock = threading.Lock()
+        self._probing = False
+        self._active_server = self._load_last_good() or self.vps_server
+        self._supabase_client = None
+        self._supabase_checked = False
+
+    # ------------------------------------------------------------------
+    # Active server (last known-good + background refresh)
+    # ------------------------------------------------------------------
+    @property
+    def active_server(self) -> str:
+        """Current server; never blocks, schedules a probe when due"""
+        if time.time() - self.last_probe >= self.probe_interval:
+            self.refresh_async()
+        return self._active_server
+
+    @active_server.setter
+    def active_server(self, server: str):
+        self._active_server = server
+
+    def refresh_async(self):
+        """Start a background health probe unless one is already running"""
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+            self.last_probe = time.time()
+        threading.Thread(target=self._probe, name="APIServerProbe", daemon=True).start()
+
+    def _probe(self):
         try:
-            from modules_client.supabase_client import get_supabase_client
-            self.supabase_client = get_supabase_client()
-            self.use_supabase = True
-            print("[API] Using Supabase backend")
-        except ImportError:
-            # Fallback to VPS server if Supabase not available
-            self.use_supabase = False
-            print("[API] Using VPS backend (fallback)")
-        
+            server = self._get_active_server()
+            if server:
+                if server != self._active_server:
+                    print(f"[API] Active server changed: {self._active_server} -> {server}")
+                self._active_server = server
+                self._save_last_good(server)
+        except Exception as e:
+            logger.debug(f"Server probe failed: {e}")
+        finally:
+            with self._lock:
+                self._probing = False
+                self.last_probe = time.time()
+
     def _get_active_server(self):
-        """Test koneksi server dan return yang aktif"""
-        # Test VPS server dulu
+        """Test koneksi server dan return yang aktif (None kalau tidak ada yang merespon)"""
+        for server, timeout in ((self.vps_server, 3), (self.local_server, 10)):
+            if not server.startswith(("http://", "https://")):
+                continue
+            try:
+                response = http_pool.get(f"{server}/api/health", timeout=timeout)
+                if response.status_code == 200:
+                    print(f"[API] Server active: {server}")
+                    return server
+            except Exception:
+                pass
+        # Keep the last known-good server if nothing responded
+        return None
+
+    def _load_last_good(self) -> str:
         try:
-            response = requests.get(f"{self.vps_server}/api/health", timeout=3)
-            if response.status_code == 200:
-                print(f"[API] VPS server active: {self.vps_server}")
-                return self.vps_server
-        except Exception:
-            pass
-        
-        # Test local server
+            if self.cache_file.exists():
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get("server") or ""
+        except Exception as e:
+            logger.debug(f"Error loading server cache: {e}")
+        return ""
+
+    def _save_last_good(self, server: str):
         try:
-            response = requests.get(f"{self.local_server}/api/health", timeout=10)
-            if response.status_code == 200:
-                print(f"[API] Local server active: {self.local_server}")
-                return self.local_server
-        except Exception:
-            pass
-        
-        # Default ke VPS jika keduanya gagal
-        print(f"[API] No server responded, defaulting to VPS: {self.vps_server}")
-        return self.vps_server
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{self.cache_file.name}.", suffix=".tmp",
+                                            dir=str(self.cache_file.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"server": server, "checked_at": time.time()}, f)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.debug(f"Error saving server cache: {e}")
+
+    # ------------------------------------------------------------------
+    # Supabase client (lazy)
+    # ------------------------------------------------------------------
+    def _ensure_supabase(self):
+        if self._supabase_checked:
+            return
+        with self._lock:
+            if self._supabase_checked:
+                return
+            try:
+                from modules_client.supabase_client import get_supabase_client
+                self._supabase_client = get_supabase_client()
+                print("[API] Using Supabase backend")
+            except Exception as e:
+                # Fallback to VPS server if Supabase not available
+                self._supabase_client = None
+                print(f"[API] Using VPS backend (fallback): {e}")
+            self._supabase_checked = True
+
+    @property
+    def supabase_client(self):
+        self._ensure_supabase()
+        return self._supabase_client
+
+    @property
+    def use_supabase(self) -> bool:
+        self._ensure_supabase()
+        return self._supabase_client is not None
 
 # Global API bridge instance
 api_bridge = APIBridge()
 
-def generate_reply(prompt: str, timeout: int = 30) -> str:
+def _reply_from_deepseek_module(prompt: Prompt, timeout: float) -> str:
+    """DeepSeek module (preferred for basic mode)"""
+    from modules_client.deepseek_ai import generate_reply as deepseek_generate
+    return deepseek_generate(as_text(prompt))
+
+def _reply_from_supabase(prompt: Prompt, timeout: float) -> str:
+    """Supabase edge function"""
+    if not api_bridge.use_supabase:
+        raise ProviderUnavailable("Supabase client not available")
+    return api_bridge.supabase_client.generate_ai_reply(as_text(prompt), timeout)
+
+def _require_vps_server() -> str:
+    server = api_bridge.active_server
+    if not server or not server.startswith(("http://", "https://")):
+        raise ProviderUnavailable(f"invalid URL: {server}")
+    return server
+
+def _reply_from_vps_generate(prompt: Prompt, timeout: float) -> str:
+    """VPS /api/ai/generate endpoint"""
+    server = _require_vps_server()
+    response = http_pool.post(
+        f"{server}/api/ai/generate",
+        json={"prompt": as_text(prompt)},
+        timeout=timeout,
+        headers={"Content-Type": "application/json"}
+    )
+
+    if response.status_code != 200:
+        print(f"[API] VPS API error: {response.status_code}")
+        if response.status_code == 404:
+            print(f"[API] Endpoint /api/ai/generate not found on server")
+        return ""
+
+    result = response.json()
+    # Handle FastAPI response format
+    if result.get("status") == "success" and "data" in result:
+        return result["data"].get("reply", "").strip()
+    # Handle old format (fallback)
+    return result.get("reply", "").strip()
+
+def _reply_from_vps_reply(prompt: Prompt, timeout: float) -> str:
+    """Existing VPS /api/ai/reply endpoint"""
+    server = _require_vps_server()
+    response = http_pool.post(
+        f"{server}/api/ai/reply",
+        json={"text": as_text(prompt)},  # Different format for existing endpoint
+        timeout=timeout,
+        headers={"Content-Type": "application/json"}
+    )
+
+    if response.status_code != 200:
+        print(f"[API] Existing endpoint error: {response.status_code}")
+        return ""
+
+    result = response.json()
+    # Handle various response formats
+    if "data" in result and isinstance(result["data"], dict):
+        return result["data"].get("reply", "").strip()
+    elif "reply" in result:
+        return result.get("reply", "").strip()
+    elif "data" in result and isinstance(result["data"], str):
+        return result["data"].strip()
+    return ""
+
+def _split_keys(value):
+    """API keys from a list or a comma separated string (short/placeholder values dropped)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [k.strip() for k in value if isinstance(k, str) and len(k.strip()) > 10]
+
+def _settings_keys(*names):
+    """Keys under api_keys, local settings first, then the merged (Supabase) view
+
+    The Supabase layer replaces the whole api_keys dict, so a local-only
+    pool such as DEEPSEEK_API_KEYS would not be visible in the merged view.
     """
-    Generate AI reply using Supabase with VPS fallback
+    cfg = get_config_manager()
+    keys = []
+    for api_keys in (cfg.get_local("api_keys", {}), cfg.get("api_keys", {})):
+        if not isinstance(api_keys, dict):
+            continue
+        for name in names:
+            keys += _split_keys(api_keys.get(name))
+    return keys
+
+def _deepseek_keys():
+    """DeepSeek API keys: settings api_keys, then env, then the Supabase config"""
+    cfg = get_config_manager()
+    keys = _settings_keys("DEEPSEEK_API_KEYS", "DEEPSEEK_API_KEY")
+    if not keys:
+        keys = _split_keys(os.getenv("DEEPSEEK_API_KEYS")) + _split_keys(os.getenv("DEEPSEEK_API_KEY"))
+    if not keys:
+        try:
+            keys = _split_keys(cfg.get_api_key("DEEPSEEK_API_KEY"))
+        except Exception:
+            keys = []
+    return list(dict.fromkeys(keys))
+
+def _local_deepseek_key():
+    """DeepSeek API key from config or env, or None"""
+    keys = _deepseek_keys()
+    return keys[0] if keys else None
+
+def _openai_keys():
+    keys = _settings_keys("OPENAI_API_KEYS")
+    try:
+        from modules_client.chatgpt_ai import chatgpt_ai
+        keys += _split_keys(chatgpt_ai.api_key)
+    except Exception:
+        pass
+    return list(dict.fromkeys(keys))
+
+def get_key_pool(provider: str):
+    """Rate-limited key pool for "deepseek_direct" or "chatgpt" (None for other providers)"""
+    keys = {"deepseek_direct": _deepseek_keys, "chatgpt": _openai_keys}.get(provider)
+    if keys is None:
+        return None
+    strategy = get_config_manager().get("api_key_strategy", "least_loaded")
+    return get_rate_limiter().pool(provider, keys(), strategy)
+
+def rate_limit_wait(timeout: float) -> float:
+    """How long a request may wait for key capacity ("ai_rate_limit_wait", capped by timeout)"""
+    try:
+        wait = float(get_config_manager().get("ai_rate_limit_wait", 5.0))
+    except (TypeError, ValueError):
+        wait = 5.0
+    return max(0.0, min(wait, timeout / 2))
+
+def _reply_from_deepseek_direct(prompt: Prompt, timeout: float) -> str:
+    """Direct DeepSeek API with a local API key from config or env"""
+    pool = get_key_pool("deepseek_direct")
+    if not pool:
+        raise ProviderUnavailable("no local DeepSeek API key")
+    started = time.monotonic()
+    lease = pool.acquire(wait=rate_limit_wait(timeout))
+    if lease is None:
+        raise ProviderUnavailable("all DeepSeek keys are rate limited")
+    timeout = max(1.0, timeout - (time.monotonic() - started))
+
+    headers = {
+        "Authorization": f"Bearer {lease.key}",
+        "Content-Type": "application/json",
+    }
+
+    payload = {
+        "model": "deepseek-chat",
+        "messages": as_messages(prompt),
+        "temperature": 0.8,
+        "top_p": 0.95,
+        **completion_params(prompt, 400),
+    }
+
+    response = None
+    try:
+        response = http_pool.post(
+            "https://api.deepseek.com/v1/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=timeout
+        )
+    finally:
+        lease.release(response.status_code if response is not None else None,
+                      response.headers if response is not None else None)
+
+    if response.status_code == 429:
+        # Throttled, not broken: skip without counting against the breaker
+        raise ProviderUnavailable("DeepSeek rate limited (429)")
+    if response.status_code != 200:
+        print(f"[API] Direct DeepSeek error: {response.status_code}")
+        return ""
+
+    result = response.json()
+    record_prompt_usage(result.get("usage"))
+    reply = result["choices"][0]["message"]["content"].strip()
+    # Clean reply for safe encoding
+    return reply.encode('utf-8', errors='replace').decode('utf-8')
+
+def _reply_from_chatgpt(prompt: Prompt, timeout: float) -> str:
+    """ChatGPT, used as the secondary for hedged requests"""
+    from modules_client.chatgpt_ai import chatgpt_ai
+    if not chatgpt_ai.api_key:
+        raise ProviderUnavailable("no OpenAI API key")
+    params = completion_params(prompt, 400)
+    if isinstance(prompt, ChatPrompt):
+        return chatgpt_ai.generate_reply(prompt.user, max_tokens=params["max_tokens"], timeout=timeout,
+                                         system_prompt=prompt.system, stop=params.get("stop"))
+    return chatgpt_ai.generate_reply(prompt, max_tokens=params["max_tokens"], timeout=timeout)
+
+# Providers in preferred order; the chain reorders them by observed health
+_provider_chain = ProviderChain(failure_threshold=3, recovery_timeout=30.0)
+_provider_chain.register("deepseek_module", _reply_from_deepseek_module)
+_provider_chain.register("supabase", _reply_from_supabase)
+_provider_chain.register("vps_generate", _reply_from_vps_generate)
+_provider_chain.register("vps_reply", _reply_from_vps_reply)
+_provider_chain.register("deepseek_direct", _reply_from_deepseek_direct)
+_provider_chain.register("chatgpt", _reply_from_chatgpt, hedge_only=True)
+
+def get_provider_chain() -> ProviderChain:
+    """Provider registry used by generate_reply"""
+    return _provider_chain
+
+def get_provider_stats():
+    """Health, breaker state and latency of each AI provider (for debugging)"""
+    return _provider_chain.stats()
+
+def get_length_stats():
+    """Generated vs. spoken characters of AI replies (spoken_ratio)"""
+    from modules_client.length_control import get_length_controller
+    return get_length_controller().stats()
+
+def get_rate_limit_stats():
+    """Per-provider key pools: learned rate, in-flight and 429 counts per key"""
+    return get_rate_limiter().stats()
+
+def get_prompt_cache_stats():
+    """Provider-reported prefix cache hits (prompt_cache_hit_tokens / cached_tokens)"""
+    from modules_client.prompt_builder import prompt_cache_stats
+    return prompt_cache_stats.stats()
+
+def get_hedging_stats():
+    """Hedge rate (extra requests sent) and win rate (hedges that answered first)"""
+    return _provider_chain.hedging_stats()
+
+def _get_hedge_policy():
+    """Hedging policy from the "ai_hedging" setting, or None when disabled (default)
     
-    Args:
-        prompt: User prompt for AI
-        timeout: Request timeout in seconds
-        
-    Returns:
-        AI generated reply string, or fallback response if failed
+    Example: {"enabled": true, "percentile": 95, "min_delay": 0.5, "min_samples": 5}
     """
-    print(f"[API] generate_reply called with prompt length: {len(prompt)}")
-    
-    # Method 1: Try DeepSeek API directly (preferred for basic mode)
+    settings = get_config_manager().get("ai_hedging", {})
+    if not isinstance(settings, dict) or not settings.get("enabled", False):
+        return None
+    defaults = HedgePolicy()
+    try:
+        return HedgePolicy(
+            percentile=float(settings.get("percentile", defaults.percentile)),
+            min_delay=float(settings.get("min_delay", defaults.min_delay)),
+            min_samples=int(settings.get("min_samples", defaults.min_samples)),
+        )
+    except (TypeError, ValueError):
+        return defaults
+
+def _streaming_endpoints():
+    """{provider name: (url, key pool, model)} for every SSE-capable provider we have a key for
+
+    ChatGPT is left out: it is hedge-only in the provider chain, not a
+    regular provider.
+    """
+    endpoints = {}
+    deepseek_pool = get_key_pool("deepseek_direct")
+    if deepseek_pool:
+        endpoints["deepseek_direct"] = ("https://api.deepseek.com/v1/chat/completions",
+                                        deepseek_pool, "deepseek-chat")
+    return endpoints
+
+def _stream_from(provider, url, pool, model, prompt: Prompt, timeout: float, state: dict):
+    """Stream one provider's reply; state["received"] tells the caller whether anything came out
+
+    Leases and breaker slots are given back in finally, so a consumer that
+    stops iterating early (GeneratorExit) does not leak them.
+    """
+    if not provider.breaker.allow():
+        provider.skipped += 1
+        return
+    lease = pool.acquire(wait=rate_limit_wait(timeout))
+    if lease is None:
+        provider.breaker.release()
+        provider.skipped += 1
+        return
+
+    payload = {
+        "model": model,
+        "messages": as_messages(prompt),
+        "temperature": 0.8,
+        "stream_options": {"include_usage": True},
+        **completion_params(prompt, 400),
+    }
+    started = time.monotonic()
+    status_code, headers = None, None
+    verdict = None  # True / False for the breaker, None: release the slot without one
     try:
-        print(f"[API] Trying DeepSeek AI endpoint...")
-        from modules_client.deepseek_ai import generate_reply as deepseek_generate
-        reply = deepseek_generate(prompt)
-        if reply and len(reply.strip()) > 0:
-            print(f"[API] DeepSeek AI success: {len(reply)} chars")
-            return reply
+        for chunk in iter_sse_completion(url, lease.key, payload, timeout=timeout,
+                                         on_usage=record_prompt_usage):
+            state["received"] = True
+            yield chunk
+        status_code = 200
+        verdict = state["received"]
+    except StreamError as e:
+        status_code, headers = e.status_code, e.headers
+        if e.status_code == 429 and not state["received"]:
+            # Throttled, not broken: skip without counting against the breaker
+            print(f"[API] Streaming from {provider.name} rate limited")
         else:
-            print(f"[API] DeepSeek AI returned empty reply")
+            print(f"[API] Streaming from {provider.name} failed: {e}")
+            verdict = False
     except Exception as e:
-        print(f"[API] DeepSeek AI error: {e}")
-    
-    # Method 2: Try Supabase API (fallback)
-    if api_bridge.use_supabase:
-        try:
-            print(f"[API] Trying Supabase AI endpoint...")
-            reply = api_bridge.supabase_client.generate_ai_reply(prompt, timeout)
-            if reply and len(reply.strip()) > 0:
-                print(f"[API] Supabase AI success: {len(reply)} chars")
-                return reply
+        print(f"[API] Streaming from {provider.name} failed: {e}")
+        verdict = False
+    finally:
+        lease.release(status_code, headers)
+        if verdict is None:
+            provider.breaker.release()
+        else:
+            provider.observe(verdict, time.monotonic() - started, penalty=timeout)
+            if verdict:
+                provider.breaker.record_success()
             else:
-                print(f"[API] Supabase AI returned empty reply")
-        except Exception as e:
-            print(f"[API] Supabase AI error: {e}")
+                provider.breaker.record_failure()
+
+def stream_reply(prompt: Prompt, timeout: int = 30):
+    """
+    Generate AI reply incrementally, yielding text chunks as they arrive
     
-    # Method 3: Try VPS API endpoint (fallback) - SKIP INVALID URLs
-    if api_bridge.active_server and api_bridge.active_server.startswith(("http://", "https://")):
-        try:
-            print(f"[API] Trying VPS API endpoint...")
-            
-            response = requests.post(
-                f"{api_bridge.active_server}/api/ai/generate",
-                json={"prompt": prompt},
-                timeout=timeout,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Handle FastAPI response format
-                if result.get("status") == "success" and "data" in result:
-                    reply = result["data"].get("reply", "").strip()
-                    if reply:
-                        print(f"[API] VPS API success: {len(reply)} chars")
-                        return reply
-                
-                # Handle old format (fallback)
-                elif "reply" in result:
-                    reply = result.get("reply", "").strip()
-                    if reply:
-                        print(f"[API] VPS API success (old format): {len(reply)} chars")
-                        return reply
-                
-                print(f"[API] VPS API returned empty reply")
-                
-            else:
-                print(f"[API] VPS API error: {response.status_code}")
-                if response.status_code == 404:
-                    print(f"[API] Endpoint /api/ai/generate not found on server")
-                try:
-                    error_detail = response.json()
-                    print(f"[API] Error detail: {error_detail}")
-                except:
-                    print(f"[API] Error response: {response.text[:200]}")
-                
-        except requests.exceptions.RequestException as e:
-            print(f"[API] VPS API request failed: {e}")
-        except Exception as e:
-            print(f"[API] VPS API unexpected error: {e}")
-    else:
-        print(f"[API] Skipping VPS API (invalid URL: {api_bridge.active_server})")
+    Providers are tried in the same health order as generate_reply. While
+    the next one has an SSE endpoint (DeepSeek with a local key) its reply
+    is streamed; from the first provider without one, the rest of the walk
+    goes through the provider chain (hedging included) and that reply is
+    yielded once.
+    """
+    endpoints = _streaming_endpoints()
+    streamed = []
+    for provider in _provider_chain.ordered():
+        endpoint = endpoints.get(provider.name)
+        if endpoint is None:
+            break
+        streamed.append(provider.name)
+        state = {"received": False}
+        yield from _stream_from(provider, *endpoint, prompt, timeout, state)
+        if state["received"]:
+            return  # Part of the reply is already out; don't restart it elsewhere
+
+    yield generate_reply(prompt, timeout, exclude=streamed)
+
+def generate_reply(prompt: Prompt, timeout: int = 30, exclude=()) -> str:
+    """
+    Generate AI reply from the healthiest available provider
     
-    # Method 1.5: Try existing /api/ai/reply endpoint as fallback
-    if api_bridge.active_server and api_bridge.active_server.startswith(("http://", "https://")):
-        try:
-            print(f"[API] Trying existing /api/ai/reply endpoint...")
-            
-            response = requests.post(
-                f"{api_bridge.active_server}/api/ai/reply",
-                json={"text": prompt},  # Different format for existing endpoint
-                timeout=timeout,
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Handle various response formats
-                reply = ""
-                if "data" in result and isinstance(result["data"], dict):
-                    reply = result["data"].get("reply", "").strip()
-                elif "reply" in result:
-                    reply = result.get("reply", "").strip()
-                elif "data" in result and isinstance(result["data"], str):
-                    reply = result["data"].strip()
-                
-                if reply:
-                    print(f"[API] Existing endpoint success: {len(reply)} chars")
-                    return reply
-                else:
-                    print(f"[API] Existing endpoint returned empty reply")
-                    
-            else:
-                print(f"[API] Existing endpoint error: {response.status_code}")
-                
-        except Exception as e:
-            print(f"[API] Existing endpoint error: {e}")
-    else:
-        print(f"[API] Skipping existing endpoint (invalid URL: {api_bridge.active_server})")
+    Providers with an open circuit are skipped without any network call.
+    With "ai_hedging" enabled, a primary that is slower than usual is raced
+    against ChatGPT and the first answer wins.
     
-    # Method 2: Try direct DeepSeek API if local API key available
-    try:
-        print(f"[API] Trying direct DeepSeek API...")
+    Args:
+        prompt: User prompt for AI (plain string or ChatPrompt with a stable system prefix)
+        timeout: Request timeout in seconds
+        exclude: Names of providers the caller already tried itself
         
-        # Check if we have local API key from config or env
-        from modules_client.config_manager import ConfigManager
-        cfg = ConfigManager()
-        deepseek_key = cfg.get("api_keys", {}).get("DEEPSEEK_API_KEY") or os.getenv("DEEPSEEK_API_KEY")
-        if deepseek_key and len(deepseek_key) > 10:
-            print(f"[API] Using local DeepSeek API key...")
-            
-            headers = {
-                "Authorization": f"Bearer {deepseek_key}",
-                "Content-Type": "application/json",
-            }
-            
-            payload = {
-                "model": "deepseek-chat",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 400,
-                "temperature": 0.8,
-                "top_p": 0.95,
-            }
-            
-            response = requests.post(
-                "https://api.deepseek.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=timeout
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                reply = result["choices"][0]["message"]["content"].strip()
-                if reply:
-                    # Clean reply for safe encoding
-                    try:
-                        reply_clean = reply.encode('utf-8', errors='replace').decode('utf-8')
-                        print(f"[API] Direct DeepSeek success: {len(reply_clean)} chars")
-                        return reply_clean
-                    except Exception as enc_error:
-                        print(f"[API] Encoding fix failed: {enc_error}")
-                        return reply
-            else:
-                print(f"[API] Direct DeepSeek error: {response.status_code}")
-                
-        else:
-            print(f"[API] No local DeepSeek API key found")
-            
-    except Exception as e:
-        print(f"[API] Direct DeepSeek API error: {e}")
+    Returns:
+        AI generated reply string, or fallback response if failed
+    """
+    print(f"[API] generate_reply called with prompt length: {len(as_text(prompt))}")
+    
+    reply = _provider_chain.call(prompt, timeout, hedging=_get_hedge_policy(), exclude=exclude)
+    if reply:
+        print(f"[API] AI reply success: {len(reply)} chars")
+        return reply
     
-    # Method 3: Fallback response
-    print(f"[API] All methods failed, using fallback response")
-    return _get_fallback_response(prompt)
+    # Last resort: rule-based fallback response
+    print(f"[API] All providers failed, using fallback response")
+    return _get_fallback_response(prompt.user if isinstance(prompt, ChatPrompt) else prompt)
 
 def _get_fallback_response(prompt: str) -> str:
-    """Generate enhanced fallback response when AI API fails"""
-    prompt_lower = prompt.lower()
-    
-    # Extract author name from prompt if possible
-    author = "teman"
-    if "penonton" in prompt and "bertanya" in prompt:
-        # Try to extract author name from typical prompt format
-        import re
-        author_match = re.search(r'Penonton (\w+) bertanya', prompt)
-        if author_match:
-            author = author_match.group(1)
-    
-    # Enhanced rule-based responses for gaming context
-    if any(word in prompt_lower for word in ["halo", "hai", "hello", "hi"]):
-        responses = [
-            f"Hai {author}! Lagi push rank nih, gimana kabarmu?",
-            f"Halo {author}! Welcome to stream, lagi main MOBA nih",
-            f"Hai {author}! Thanks udah join stream, enjoy ya!"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["kabar", "apa kabar", "gimana"]):
-        responses = [
-            f"Baik {author}! Lagi semangat push rank, kamu gimana?",
-            f"Alhamdulillah baik {author}, lagi fokus main nih",
-            f"Baik dong {author}, lagi grinding rank soalnya hehe"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["build", "item", "gear", "equipment"]):
-        responses = [
-            f"{author} untuk build sekarang meta damage penetration dulu bro",
-            f"Build {author}? War axe, hunter strike, malefic roar meta banget",
-            f"{author} coba build damage dulu, nanti tank item terakhir"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["rank", "ranking", "tier", "main"]):
-        responses = [
-            f"{author} lagi push rank nih, target mythic season ini",
-            f"Rank {author}? Lagi di legend, target mythic nih",
-            f"{author} main rank yuk, butuh duo partner nih"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["hero", "champion", "character"]):
-        responses = [
-            f"{author} hero favorit gue Layla, damage nya gila sih",
-            f"Hero {author}? Coba main marksman, enak buat carry",
-            f"{author} hero meta sekarang assassin sama marksman"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["makan", "udah makan", "lunch", "dinner"]):
-        responses = [
-            f"Udah makan {author}, sekarang lagi fokus main nih",
-            f"{author} udah makan dong, kamu jangan lupa makan ya",
-            f"Alhamdulillah udah makan {author}, energy full buat main"
-        ]
-        import random
-        return random.choice(responses)
-    
-    elif any(word in prompt_lower for word in ["col", "bang"]):
-        responses = [
-            f"Iya {author}! Ada yang bisa gue bantu?",
-            f"Hai {author}! Gimana ada pertanyaan?",
-            f"Yes {author}! Mau tanya apa nih?"
-        ]
-        import random
-        return random.choice(responses)
-    
-    else:
-        # General responses
-        responses = [
-            f"Hai {author}! Thanks udah nonton stream",
-            f"{author} ada yang mau ditanyain tentang game?",
-            f"Halo {author}! Enjoy streamnya ya, jangan lupa follow",
-            f"{author} gimana pendapat kamu tentang gameplay tadi?",
-            f"Thanks {author}! Semoga terhibur sama streamnya"
-        ]
-        import random
-        return random.choice(responses)
+    """Rule-based reply when every provider failed (intent from the viewer message only)"""
+    return get_offline_responder().respond_to_prompt(prompt)
 
 def test_api_connection():
     """Test API connection and return status"""
@@ -412,14 +609,14 @@ def test_api_connection():
     
     # Test VPS server
     try:
-        response = requests.get(f"{api_bridge.vps_server}/api/health", timeout=3)
+        response = http_pool.get(f"{api_bridge.vps_server}/api/health", timeout=3)
         results["vps_server"] = response.status_code == 200
     except:
         pass
     
     # Test local server  
     try:
-        response = requests.get(f"{api_bridge.local_server}/api/health", timeout=10)
+        response = http_pool.get(f"{api_bridge.local_server}/api/health", timeout=10)
         results["local_server"] = response.status_code == 200
     except:
         pass
@@ -429,7 +626,7 @@ def test_api_connection():
     if deepseek_key and len(deepseek_key) > 10:
         try:
             headers = {"Authorization": f"Bearer {deepseek_key}"}
-            response = requests.get("https://api.deepseek.com/v1/models", headers=headers, timeout=5)
+            response = http_pool.get("https://api.deepseek.com/v1/models", headers=headers, timeout=5)
             results["deepseek_direct"] = response.status_code == 200
         except:
             pass
@@ -0,0 +1,405 @@
+"""
+Async AI - bounded, cancellable AI calls on a dedicated event loop
+
+One background thread runs an asyncio loop. Every AI request becomes a
+coroutine on that loop, limited by a semaphore, with an optional deadline
+and cancellation token. Providers are tried in the provider chain's health
+order: with aiohttp installed, direct DeepSeek is called natively on the
+loop when it is next in line; the rest of the walk runs through the
+blocking provider chain on a small executor sized to the same limit. A
+call's slot stays taken until its executor work has really finished, even
+after a timeout or cancellation.
+
+Callers keep the familiar blocking generate_reply(prompt) signature, use
+submit() for a concurrent.futures.Future, or stream() to iterate a
+streamed reply under the same slot, deadline and cancellation token.
+"""
+
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Optional, Callable, Iterator, List, Set
+import logging
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+from modules_client.prompt_builder import Prompt
+
+logger = logging.getLogger('StreamMate')
+
+DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
+
+_STREAM_END = object()
+
+
+class AICancelled(Exception):
+    """The call was cancelled through its CancelToken (or cancel_all)"""
+
+
+class AIDeadlineExceeded(Exception):
+    """The call did not finish before its deadline"""
+
+
+class CancelToken:
+    """Cancels every call it was passed to; safe to use from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _on_cancel(self, callback: Callable[[], None]):
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+def _release_orphaned_lease(future: Future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    lease = future.result()
+    if lease is not None:
+        lease.release()
+
+
+class AsyncAIClient:
+    """Event-loop thread running AI calls with bounded concurrency"""
+
+    def __init__(self, max_concurrency: int = 4, default_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="AsyncAI")
+        self._tasks: Set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                       "deadline_exceeded": 0, "native_calls": 0, "executor_calls": 0,
+                       "peak_in_flight": 0, "slots_held_after_exit": 0, "streams": 0}
+
+    # ------------------------------------------------------------------
+    # Loop lifecycle
+    # ------------------------------------------------------------------
+    def _ensure_loop(self):
+        if self._ready.is_set():
+            return
+        with self._start_lock:
+            if self._ready.is_set():
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="AsyncAILoop", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+    def submit(self, prompt: Prompt, timeout: Optional[float] = None,
+               deadline: Optional[float] = None, token: Optional[CancelToken] = None) -> Future:
+        """Schedule an AI call; returns a Future with the reply
+
+        timeout bounds the call itself; deadline is an absolute
+        time.monotonic() value that also covers time spent waiting for a
+        concurrency slot. The Future raises AICancelled or
+        AIDeadlineExceeded instead of returning a reply in those cases.
+        """
+        return self._submit(lambda remaining, background: self._generate(prompt, remaining, background),
+                            timeout, deadline, token)
+
+    def _submit(self, work: Callable[[float, List[Future]], Awaitable], timeout: Optional[float],
+                deadline: Optional[float], token: Optional[CancelToken]) -> Future:
+        """Run work(remaining, background) under a slot, deadline and token"""
+        self._ensure_loop()
+        timeout = self.default_timeout if timeout is None else timeout
+        if deadline is None:
+            deadline = time.monotonic() + timeout
+        self._stats["submitted"] += 1
+
+        result: Future = Future()
+        call_id = next(self._ids)
+
+        def start():
+            task = self._loop.create_task(self._run_call(call_id, work, timeout, deadline))
+            self._tasks.add(task)
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], len(self._tasks))
+            task.add_done_callback(lambda t: self._finish(t, result))
+            if token is not None:
+                token._on_cancel(lambda: self._loop.call_soon_threadsafe(task.cancel))
+
+        self._loop.call_soon_threadsafe(start)
+        return result
+
+    def _finish(self, task: asyncio.Task, result: Future):
+        self._tasks.discard(task)
+        if task.cancelled():
+            self._stats["cancelled"] += 1
+            result.set_exception(AICancelled())
+            return
+        error = task.exception()
+        if error is None:
+            self._stats["completed"] += 1
+            result.set_result(task.result())
+        else:
+            if isinstance(error, AIDeadlineExceeded):
+                self._stats["deadline_exceeded"] += 1
+            else:
+                self._stats["failed"] += 1
+            result.set_exception(error)
+
+    def stream(self, prompt: Prompt, timeout: Optional[float] = None,
+               deadline: Optional[float] = None, token: Optional[CancelToken] = None) -> Iterator[str]:
+        """Blocking iterator over the chunks of api.stream_reply, run like submit()
+
+        The stream holds a concurrency slot, obeys timeout/deadline and is
+        stopped by token or cancel_all(); the iterator then raises
+        AICancelled or AIDeadlineExceeded. The blocking SSE read runs on the
+        executor and is closed (releasing its key lease and connection) at
+        the next chunk after the call ends.
+        """
+        chunks: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+
+        def pump(remaining: float):
+            from modules_client.api import stream_reply
+            source = stream_reply(prompt, remaining)
+            try:
+                for chunk in source:
+                    if stop.is_set():
+                        break
+                    chunks.put(chunk)
+            finally:
+                source.close()
+
+        async def work(remaining: float, background: List[Future]):
+            self._stats["streams"] += 1
+            try:
+                await self._in_executor(background, pump, remaining)
+            finally:
+                stop.set()
+
+        call_token = CancelToken()
+        if token is not None:
+            token._on_cancel(call_token.cancel)
+        future = self._submit(work, timeout, deadline, call_token)
+        future.add_done_callback(lambda _: chunks.put(_STREAM_END))
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _STREAM_END:
+                    break
+                yield chunk
+            future.result()  # AICancelled / AIDeadlineExceeded / provider errors
+        finally:
+            if not future.done():
+                # Consumer stopped early: end the call and free its slot
+                stop.set()
+                call_token.cancel()
+
+    async def _run_call(self, call_id: int, work: Callable[[float, List[Future]], Awaitable],
+                        timeout: float, deadline: float):
+        remaining = deadline - time.monotonic()
+        try:
+            # Waiting for a slot counts against the deadline too
+            await asyncio.wait_for(self._semaphore.acquire(), max(0.0, remaining))
+        except asyncio.TimeoutError:
+            raise AIDeadlineExceeded(f"call {call_id}: no free slot before deadline")
+        background: List[Future] = []  # executor work of this call, one step at a time
+        try:
+            remaining = min(timeout, deadline - time.monotonic())
+            if remaining <= 0:
+                raise AIDeadlineExceeded(f"call {call_id}: deadline passed")
+            try:
+                return await asyncio.wait_for(work(remaining, background), remaining)
+            except asyncio.TimeoutError:
+                raise AIDeadlineExceeded(f"call {call_id}: timed out after {remaining:.1f}s")
+        finally:
+            self._release_slot(background)
+
+    def _release_slot(self, background: List[Future]):
+        """Free the call's concurrency slot once its executor work is done
+
+        A timed-out or cancelled call cannot stop a blocking provider call
+        that already started; the slot is held until it returns, so no more
+        than max_concurrency requests are ever really in flight.
+        """
+        running = next((f for f in background if not f.done()), None)
+        if running is None:
+            self._semaphore.release()
+            return
+        self._stats["slots_held_after_exit"] += 1
+        running.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._semaphore.release))
+
+    async def _in_executor(self, background: List[Future], func: Callable, *args):
+        future = self._executor.submit(func, *args)
+        background.append(future)
+        return await asyncio.wrap_future(future)
+
+    async def _generate(self, prompt: Prompt, timeout: float, background: List[Future]) -> str:
+        """Walk the providers in the chain's order, DeepSeek natively when it is first"""
+        from modules_client.api import generate_reply, get_provider_chain
+        started = time.monotonic()
+        tried = []
+        if AIOHTTP_AVAILABLE:
+            ordered = get_provider_chain().ordered()
+            if ordered and ordered[0].name == "deepseek_direct":
+                tried.append(ordered[0].name)
+                reply = await self._deepseek_native(ordered[0], prompt, timeout, background)
+                if reply:
+                    return reply
+
+        # The rest of the chain (breakers, hedging, fallback), bounded by the executor
+        self._stats["executor_calls"] += 1
+        timeout = max(1.0, timeout - (time.monotonic() - started))
+        return await self._in_executor(background, generate_reply, prompt, timeout, tried)
+
+    async def _acquire_lease(self, pool, wait: float, background: List[Future]):
+        """pool.acquire() on the executor; a lease granted after we stopped waiting is given back"""
+        try:
+            return await self._in_executor(background, pool.acquire, wait)
+        except asyncio.CancelledError:
+            background[-1].add_done_callback(_release_orphaned_lease)
+            raise
+
+    async def _deepseek_native(self, provider, prompt: Prompt, timeout: float,
+                               background: List[Future]) -> Optional[str]:
+        """Direct DeepSeek call on the loop (shares the provider's breaker/health)"""
+        from modules_client.api import get_key_pool, rate_limit_wait
+        from modules_client.prompt_builder import as_messages, completion_params, record_prompt_usage
+        pool = get_key_pool("deepseek_direct")
+        if not pool:
+            return None
+        if not provider.breaker.allow():
+            provider.skipped += 1
+            return None
+
+        # Waiting for key capacity blocks, so it runs on the executor
+        try:
+            lease = await self._acquire_lease(pool, rate_limit_wait(timeout), background)
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            raise
+        if lease is None:
+            provider.breaker.release()
+            return None
+
+        self._stats["native_calls"] += 1
+        started = time.monotonic()
+        reply = None
+        status = None
+        headers = None
+        try:
+            session = await self._get_session()
+            payload = {
+                "model": "deepseek-chat",
+                "messages": as_messages(prompt),
+                "temperature": 0.8,
+                "top_p": 0.95,
+                **completion_params(prompt, 400),
+            }
+            request_headers = {"Authorization": f"Bearer {lease.key}", "Content-Type": "application/json"}
+            async with session.post(DEEPSEEK_URL, json=payload, headers=request_headers,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                status, headers = response.status, response.headers
+                if response.status == 200:
+                    result = await response.json()
+                    record_prompt_usage(result.get("usage"))
+                    reply = result["choices"][0]["message"]["content"].strip()
+                else:
+                    logger.warning(f"DeepSeek async error: {response.status}")
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            raise
+        except Exception as e:
+            logger.warning(f"DeepSeek async call failed: {e}")
+        finally:
+            lease.release(status, headers)
+
+        if status == 429:
+            # Rate limited: not a provider failure, let the chain try elsewhere
+            provider.breaker.release()
+            return None
+
+        provider.observe(bool(reply), time.monotonic() - started, penalty=timeout)
+        if reply:
+            provider.breaker.record_success()
+        else:
+            provider.breaker.record_failure()
+        return reply
+
+    def generate_reply(self, prompt: Prompt, timeout: int = 30,
+                       token: Optional[CancelToken] = None) -> str:
+        """Blocking call with the same signature as api.generate_reply"""
+        return self.submit(prompt, timeout=timeout, token=token).result()
+
+    def cancel_all(self):
+        """Cancel every call that is queued or running"""
+        if not self._ready.is_set():
+            return
+
+        def cancel():
+            for task in list(self._tasks):
+                task.cancel()
+
+        self._loop.call_soon_threadsafe(cancel)
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["in_flight"] = len(self._tasks)
+        stats["max_concurrency"] = self.max_concurrency
+        stats["native_http"] = AIOHTTP_AVAILABLE
+        return stats
+
+
+_client: Optional[AsyncAIClient] = None
+_client_lock = threading.Lock()
+
+
+def get_async_ai_client() -> AsyncAIClient:
+    """Get global async AI client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncAIClient()
+        return _client
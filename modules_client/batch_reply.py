@@ -0,0 +1,66 @@
+"""
+Batch Reply - parse one LLM answer that covers several viewer questions
+
+The cohost tab asks for replies to up to batch_size questions in a single
+request and has the model return a JSON object keyed by question number.
+Models wrap that JSON in prose or code fences often enough that parsing
+has to be forgiving; anything that can't be matched to a question is
+left out so the caller can fall back to a single request for it.
+"""
+
+import json
+import re
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$', re.MULTILINE)
+_NUMBERED_LINE = re.compile(r'^\s*"?(\d+)"?\s*[:.)-]\s*(.+?)\s*,?\s*$')
+
+
+def _extract_json_object(text: str) -> Optional[dict]:
+    cleaned = _FENCE.sub('', text.strip())
+    start = cleaned.find('{')
+    end = cleaned.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(cleaned[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_indexed_replies(text: str, count: int) -> Dict[int, str]:
+    """Map question number (1..count) to its reply
+
+    Accepts {"1": "...", "2": "..."} (optionally fenced or surrounded by
+    text) and, failing that, "1. ..." / "1: ..." numbered lines.
+    """
+    if not text:
+        return {}
+
+    replies: Dict[int, str] = {}
+    data = _extract_json_object(text)
+    if data is not None:
+        for key, value in data.items():
+            try:
+                index = int(str(key).strip())
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                value = value.get("reply") or value.get("balasan") or ""
+            if 1 <= index <= count and isinstance(value, str) and value.strip():
+                replies[index] = value.strip()
+        return replies
+
+    for line in text.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1))
+        reply = match.group(2).strip().strip('"').strip()
+        if 1 <= index <= count and reply and index not in replies:
+            replies[index] = reply
+    return replies
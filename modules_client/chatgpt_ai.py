@@ -4,11 +4,12 @@
 ChatGPT AI Integration - OpenAI API
 """
 
-import requests
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from modules_client.config_manager import config_manager
+from modules_client.http_pool import http_pool
+from modules_client.prompt_builder import record_prompt_usage
 
 logger = logging.getLogger('StreamMate')
 
@@ -22,7 +23,9 @@ class ChatGPTAI:
         if not self.api_key:
             logger.warning("OpenAI API key not found")
     
-    def generate_reply(self, prompt: str, max_tokens: int = 500) -> Optional[str]:
+    def generate_reply(self, prompt: str, max_tokens: int = 500, timeout: float = 30,
+                       system_prompt: Optional[str] = None,
+                       stop: Optional[List[str]] = None) -> Optional[str]:
         """Generate AI reply using ChatGPT (synchronous version for PyQt compatibility)"""
         if not self.api_key:
             logger.error("OpenAI API key not available")
@@ -39,7 +42,7 @@ class ChatGPTAI:
                 "messages": [
                     {
                         "role": "system",
-                        "content": "Kamu adalah AI assistant yang membantu streamer untuk berinteraksi dengan penonton. Balas dengan natural, friendly, dan relevan."
+                        "content": system_prompt or "Kamu adalah AI assistant yang membantu streamer untuk berinteraksi dengan penonton. Balas dengan natural, friendly, dan relevan."
                     },
                     {
                         "role": "user", 
@@ -49,16 +52,19 @@ class ChatGPTAI:
                 "max_tokens": max_tokens,
                 "temperature": 0.7
             }
+            if stop:
+                data["stop"] = stop
             
-            response = requests.post(
+            response = http_pool.post(
                 f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data,
-                timeout=30
+                timeout=timeout
             )
             
             if response.status_code == 200:
                 result = response.json()
+                record_prompt_usage(result.get("usage"))
                 reply = result["choices"][0]["message"]["content"]
                 logger.debug(f"ChatGPT reply generated: {len(reply)} chars")
                 return reply
@@ -92,7 +98,7 @@ class ChatGPTAI:
                 "max_tokens": 10
             }
             
-            response = requests.post(
+            response = http_pool.post(
                 f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data,
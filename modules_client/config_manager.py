@@ -2,54 +2,154 @@
 Config Manager - Updated to use Supabase for configuration
 """
 
+import atexit
+import copy
 import json
-import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Callable, Iterable, NamedTuple, Union, List
 import logging
 
+from modules_client.remote_config_cache import get_remote_config_cache
+from modules_client.settings_store import JsonSettingsStore, make_settings_store
+
 logger = logging.getLogger('StreamMate')
 
+# Remote values that override the local settings file
+REMOTE_API_KEY_NAMES = ['DEEPSEEK_API_KEY', 'YOUTUBE_API_KEY', 'TRAKTEER_API_KEY', 'TR_API_KEY']
+
+_MISSING = object()
+
+# Local storage backends selectable with the "settings_storage" setting
+SETTINGS_STORAGES = ("json", "journal")
+
+
+def configured_storage(config_file: Union[str, Path]) -> str:
+    """Storage backend named by the file's own "settings_storage" setting ("json" by default)"""
+    try:
+        storage = JsonSettingsStore(Path(config_file)).load().get("settings_storage", "json")
+    except Exception:
+        return "json"
+    return storage if storage in SETTINGS_STORAGES else "json"
+
+# Supabase config file is parsed once per process, not once per instance
+_supabase_config_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+_supabase_config_lock = threading.Lock()
+
+
+class ConfigChange(NamedTuple):
+    """A single settings key change pushed to subscribers"""
+    key: str
+    old: Any
+    new: Any
+    source: str  # "set", "file", "remote" or "initial"
+
+
 class ConfigManager:
     """Configuration manager with Supabase integration"""
     
-    def __init__(self, config_file: str = "config/settings.json"):
+    def __init__(self, config_file: str = "config/settings.json",
+                 remote_ttl: float = 300.0, stat_interval: float = 0.5,
+                 write_behind: bool = False, write_delay: float = 0.5,
+                 storage: Optional[str] = None):
         self.config_file = Path(config_file)
         self.supabase_config = None
+
+        # Local layer storage backend: "json" (rewrite file) or "journal" (append
+        # deltas); unless given, the "settings_storage" setting picks it at startup
+        if storage is None:
+            storage = configured_storage(self.config_file)
+        self._store = self._make_store(storage)
+
+        # ✅ PERFORMANCE: Layered snapshot (local file layer + remote layer)
+        # Rebuilt only when the file's mtime/size changes or a background
+        # refresh of the remote snapshot (every remote_ttl seconds) changes it
+        self.remote_ttl = remote_ttl
+        self.stat_interval = stat_interval
+        self._lock = threading.RLock()
+        self._local_layer: Dict[str, Any] = {}
+        self._local_stamp: Optional[Tuple[int, int]] = None
+        self._local_checked_at = 0.0
+        self._remote_layer: Dict[str, Any] = {}
+        self._remote_revision: Optional[int] = None
+        self._remote_cache = get_remote_config_cache(ttl=remote_ttl)
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._stats = {"hits": 0, "misses": 0, "local_reloads": 0, "remote_reloads": 0,
+                       "sets": 0, "flushes": 0}
+
+        # ✅ PERFORMANCE: Write-behind persistence - mutations are collected in
+        # memory and flushed once per write_delay window or batch() block
+        self.write_behind = write_behind
+        self.write_delay = write_delay
+        self._pending: Dict[str, Any] = {}
+        self._batch_depth = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        if write_behind:
+            atexit.register(self.flush)
+
+        # Change subscriptions (in-process set() + file watcher)
+        self._subscribers: Dict[int, Tuple[Optional[frozenset], Callable[[ConfigChange], None]]] = {}
+        self._next_token = 1
+        self._watched_keys: Optional[frozenset] = frozenset()
+        self._queued_events: List[Tuple[Callable[[ConfigChange], None], ConfigChange]] = []
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
         self._load_supabase_config()
+        if self.supabase_config:
+            self._remote_cache.set_fetcher(self._fetch_remote_bundle)
+            self._remote_cache.add_listener(self._on_remote_refreshed)
         
     def _load_supabase_config(self):
         """Load Supabase configuration"""
-        try:
-            supabase_config_file = Path("config/supabase_config.json")
-            if supabase_config_file.exists():
-                with open(supabase_config_file, 'r', encoding='utf-8') as f:
-                    self.supabase_config = json.load(f)
-                logger.info("Supabase config loaded")
-            else:
-                logger.warning("Supabase config file not found")
-        except Exception as e:
-            logger.error(f"Error loading Supabase config: {e}")
+        supabase_config_file = Path("config/supabase_config.json")
+        cache_key = str(supabase_config_file.resolve())
+        with _supabase_config_lock:
+            if cache_key in _supabase_config_cache:
+                self.supabase_config = _supabase_config_cache[cache_key]
+                return
+            try:
+                if supabase_config_file.exists():
+                    with open(supabase_config_file, 'r', encoding='utf-8') as f:
+                        self.supabase_config = json.load(f)
+                    logger.info("Supabase config loaded")
+                else:
+                    logger.warning("Supabase config file not found")
+            except Exception as e:
+                logger.error(f"Error loading Supabase config: {e}")
+            _supabase_config_cache[cache_key] = self.supabase_config
     
+    def _config_client(self):
+        """Supabase config client, or None when Supabase is not configured"""
+        if not self.supabase_config:
+            return None
+        from modules_client.supabase_config_client import config_client
+        return config_client
+
     def get_api_key(self, key_name: str) -> Optional[str]:
         """Get API key from Supabase or fallback to local config"""
         try:
-            # Try to get from Supabase first
-            if self.supabase_config:
-                from modules_client.supabase_config_client import config_client
-                api_key = config_client.get_api_key(key_name)
+            # Try Supabase first (served from the remote snapshot)
+            client = self._config_client()
+            if client:
+                api_key = self._remote_cache.lookup(
+                    "api_keys", key_name, lambda: client.get_api_key(key_name)
+                )
                 if api_key:
                     logger.debug(f"Got {key_name} from Supabase")
                     return api_key
         except Exception as e:
             logger.warning(f"Failed to get {key_name} from Supabase: {e}")
         
-        # Fallback to local config
+        # Fallback to local config (cached local layer)
         try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                
+            with self._lock:
+                self._get_snapshot()
+                config = self._local_layer
+
+            if config:
                 # Check in various possible locations
                 if key_name in config:
                     return config[key_name]
@@ -66,9 +166,12 @@ class ConfigManager:
     def get_payment_config(self, provider: str, config_key: str) -> Optional[str]:
         """Get payment configuration from Supabase"""
         try:
-            if self.supabase_config:
-                from modules_client.supabase_config_client import config_client
-                return config_client.get_payment_config(provider, config_key)
+            client = self._config_client()
+            if client:
+                return self._remote_cache.lookup(
+                    "payment", f"{provider}.{config_key}",
+                    lambda: client.get_payment_config(provider, config_key)
+                )
         except Exception as e:
             logger.warning(f"Failed to get payment config {provider}.{config_key}: {e}")
         return None
@@ -76,9 +179,11 @@ class ConfigManager:
     def get_server_config(self, config_key: str) -> Optional[str]:
         """Get server configuration from Supabase"""
         try:
-            if self.supabase_config:
-                from modules_client.supabase_config_client import config_client
-                return config_client.get_server_config(config_key)
+            client = self._config_client()
+            if client:
+                return self._remote_cache.lookup(
+                    "server", config_key, lambda: client.get_server_config(config_key)
+                )
         except Exception as e:
             logger.warning(f"Failed to get server config {config_key}: {e}")
         return None
@@ -86,91 +191,487 @@ class ConfigManager:
     def get_google_credentials(self, credential_type: str) -> Optional[Dict[str, Any]]:
         """Get Google credentials from Supabase"""
         try:
-            if self.supabase_config:
-                from modules_client.supabase_config_client import config_client
-                return config_client.get_google_credentials(credential_type)
+            client = self._config_client()
+            if client:
+                return self._remote_cache.lookup(
+                    "google", credential_type,
+                    lambda: client.get_google_credentials(credential_type)
+                )
         except Exception as e:
             logger.warning(f"Failed to get Google credentials {credential_type}: {e}")
         return None
-    
-    def load_settings(self) -> Dict[str, Any]:
-        """Load all settings with Supabase integration"""
-        settings = {}
-        
-        # Load local settings first
-        if self.config_file.exists():
+
+    def refresh(self, wait: bool = True) -> bool:
+        """Explicitly refetch all remote config (bypassing the TTL)"""
+        if not self.supabase_config:
+            return False
+        return self._remote_cache.refresh(wait=wait)
+
+    def _fetch_remote_bundle(self, known_keys: Dict[str, list]) -> Optional[Dict[str, Any]]:
+        """Fetch every remote config value in one pass (runs in the background)"""
+        client = self._config_client()
+        if client is None:
+            return None
+
+        api_key_names = set(REMOTE_API_KEY_NAMES) | set(known_keys.get("api_keys", []))
+        data: Dict[str, Any] = {
+            "api_keys": {name: client.get_api_key(name) for name in sorted(api_key_names)},
+            "ipaymu_config": client.get_ipaymu_config(),
+            "environment": client.get_environment(),
+            "debug_mode": client.is_debug_mode(),
+            "safety_mode": client.is_safety_mode(),
+            "payment": {},
+            "server": {},
+            "google": {},
+        }
+        for item in known_keys.get("payment", []):
+            provider, _, config_key = item.partition(".")
+            data["payment"][item] = client.get_payment_config(provider, config_key)
+        for config_key in known_keys.get("server", []):
+            data["server"][config_key] = client.get_server_config(config_key)
+        for credential_type in known_keys.get("google", []):
+            data["google"][credential_type] = client.get_google_credentials(credential_type)
+        return data
+
+    def _on_remote_refreshed(self, revision: int):
+        """Background refresh produced a new remote snapshot"""
+        with self._lock:
+            if self._snapshot is None:
+                return
+            self._remote_layer = self._read_remote_layer()
+            self._remote_revision = revision
+            self._stats["remote_reloads"] += 1
+            self._rebuild_snapshot("remote")
+        self._dispatch_events()
+
+    def _make_store(self, storage: str):
+        options = {"on_compacted": self._on_store_compacted} if storage == "journal" else {}
+        return make_settings_store(self.config_file, storage, **options)
+
+    @property
+    def storage(self) -> str:
+        return self._store.kind
+
+    def use_storage(self, storage: str):
+        """Switch the local storage backend ("json" or "journal")"""
+        with self._lock:
+            if storage == self._store.kind:
+                return
+            self.flush()
+            self._get_snapshot()
+            old_store = self._store
+            self._store = self._make_store(storage)
+            # Fold any journal back into settings.json before leaving it
+            old_store.close()
+            if storage == "journal":
+                self._store.write(self._local_layer)
+            self._local_stamp = self._file_stamp()
+
+    def _on_store_compacted(self):
+        """Background compaction rewrote settings.json - not an external edit"""
+        with self._lock:
+            if not self._pending:
+                self._local_stamp = self._file_stamp()
+
+    def _file_stamp(self):
+        """Change stamp of the local storage (mtime/size of its files)"""
+        return self._store.stamp()
+
+    def _read_local_layer(self) -> Dict[str, Any]:
+        """Read and parse the local settings (file plus journal, if any)"""
+        return self._store.load()
+
+    def _read_remote_layer(self) -> Dict[str, Any]:
+        """Values that Supabase overrides on top of local settings (from the snapshot)"""
+        remote = {}
+        if not self.supabase_config:
+            return remote
+
+        cache = self._remote_cache
+        api_keys = {
+            name: value for name, value in cache.section("api_keys").items()
+            if name in REMOTE_API_KEY_NAMES and value
+        }
+        if api_keys:
+            remote['api_keys'] = api_keys
+
+        ipaymu_config = cache.value("ipaymu_config")
+        if ipaymu_config:
+            remote['ipaymu_config'] = ipaymu_config
+
+        environment = cache.value("environment")
+        if environment:
+            remote['environment'] = environment
+
+        if cache.has_data:
+            remote['debug_mode'] = cache.value("debug_mode", False)
+            remote['safety_mode'] = cache.value("safety_mode", True)
+
+        return remote
+
+    def _refresh_layers(self, force: bool = False) -> bool:
+        """Revalidate both layers; return True if the snapshot had to be rebuilt"""
+        now = time.monotonic()
+        rebuilt = False
+        source = "remote"
+
+        # Local layer: stat the file at most once per stat_interval
+        if force or self._snapshot is None or now - self._local_checked_at >= self.stat_interval:
+            self._local_checked_at = now
+            if self.supabase_config:
+                # Stale remote snapshot is revalidated in the background, never here
+                self._remote_cache.ensure_fresh()
+            stamp = self._file_stamp()
+            if force or self._snapshot is None or stamp != self._local_stamp:
+                local = self._read_local_layer()
+                # Unflushed mutations still win over what is on disk
+                local.update(self._pending)
+                self._local_layer = local
+                self._local_stamp = stamp
+                self._stats["local_reloads"] += 1
+                rebuilt = True
+                source = "file"
+
+        # Remote layer: served from the (disk-backed) remote snapshot
+        revision = self._remote_cache.revision
+        if force or self._remote_revision != revision:
+            self._remote_layer = self._read_remote_layer()
+            self._remote_revision = revision
+            self._stats["remote_reloads"] += 1
+            rebuilt = True
+
+        if rebuilt or self._snapshot is None:
+            self._rebuild_snapshot(source)
+            rebuilt = True
+
+        return rebuilt
+
+    def _rebuild_snapshot(self, source: str = "set"):
+        """Merge local and remote layers into a fresh snapshot dict"""
+        old = self._snapshot
+        settings = dict(self._local_layer)
+        settings.update(self._remote_layer)
+        self._snapshot = settings
+        if old is not None and self._subscribers:
+            self._queue_changes(old, settings, source)
+
+    def _queue_changes(self, old: Dict[str, Any], new: Dict[str, Any], source: str):
+        """Diff two snapshots for watched keys and queue events for subscribers"""
+        keys = self._watched_keys
+        if keys is None:
+            keys = set(old) | set(new)
+
+        for key in keys:
+            old_value = old.get(key, _MISSING)
+            new_value = new.get(key, _MISSING)
+            if old_value == new_value:
+                continue
+            change = ConfigChange(
+                key,
+                None if old_value is _MISSING else old_value,
+                None if new_value is _MISSING else new_value,
+                source
+            )
+            for sub_keys, callback in self._subscribers.values():
+                if sub_keys is None or key in sub_keys:
+                    self._queued_events.append((callback, change))
+
+    def _dispatch_events(self):
+        """Deliver queued change events outside the lock"""
+        if not self._queued_events:
+            return
+        with self._lock:
+            events, self._queued_events = self._queued_events, []
+        for callback, change in events:
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                callback(change)
             except Exception as e:
-                logger.error(f"Error loading local settings: {e}")
-        
-        # Override with Supabase configs
-        try:
-            if self.supabase_config:
-                from modules_client.supabase_config_client import config_client
-                
-                # Get API keys
-                api_keys = {}
-                for key_name in ['DEEPSEEK_API_KEY', 'YOUTUBE_API_KEY', 'TRAKTEER_API_KEY', 'TR_API_KEY']:
-                    api_key = config_client.get_api_key(key_name)
-                    if api_key:
-                        api_keys[key_name] = api_key
-                
-                if api_keys:
-                    settings['api_keys'] = api_keys
-                
-                # Get payment config
-                ipaymu_config = config_client.get_ipaymu_config()
-                if ipaymu_config:
-                    settings['ipaymu_config'] = ipaymu_config
-                
-                # Get server config
-                environment = config_client.get_environment()
-                if environment:
-                    settings['environment'] = environment
-                
-                debug_mode = config_client.is_debug_mode()
-                settings['debug_mode'] = debug_mode
-                
-                safety_mode = config_client.is_safety_mode()
-                settings['safety_mode'] = safety_mode
-                
-        except Exception as e:
-            logger.warning(f"Error loading Supabase settings: {e}")
-        
+                logger.error(f"Config subscriber error for {change.key}: {e}")
+
+    def subscribe(self, keys: Union[str, Iterable[str], None],
+                  callback: Callable[[ConfigChange], None], fire_initial: bool = False) -> int:
+        """Call callback(ConfigChange) whenever one of keys changes
+
+        keys may be a single key, an iterable of keys or None for every key.
+        Callbacks run on the thread that detected the change (the caller of
+        set() or the watcher thread), so keep them short. Returns a token for
+        unsubscribe().
+        """
+        if keys is not None:
+            keys = frozenset([keys]) if isinstance(keys, str) else frozenset(keys)
+
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (keys, callback)
+            self._recompute_watched_keys()
+            snapshot = self._get_snapshot() if fire_initial else None
+
+        if fire_initial:
+            for key in sorted(keys) if keys is not None else sorted(snapshot):
+                try:
+                    callback(ConfigChange(key, None, copy.deepcopy(snapshot.get(key)), "initial"))
+                except Exception as e:
+                    logger.error(f"Config subscriber error for {key}: {e}")
+        return token
+
+    def unsubscribe(self, token: int):
+        """Remove a subscription created by subscribe()"""
+        with self._lock:
+            self._subscribers.pop(token, None)
+            self._recompute_watched_keys()
+
+    def _recompute_watched_keys(self):
+        watched = set()
+        for sub_keys, _ in self._subscribers.values():
+            if sub_keys is None:
+                self._watched_keys = None
+                return
+            watched |= sub_keys
+        self._watched_keys = frozenset(watched)
+
+    def start_watching(self, interval: float = 1.0):
+        """Poll the settings file in a daemon thread and push external edits"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        self._watch_stop.clear()
+
+        def watch_loop():
+            while not self._watch_stop.wait(interval):
+                try:
+                    with self._lock:
+                        self._local_checked_at = 0.0
+                        self._get_snapshot()
+                    self._dispatch_events()
+                except Exception as e:
+                    logger.warning(f"Config watcher error: {e}")
+
+        self._watch_thread = threading.Thread(target=watch_loop, name="ConfigWatcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        """Stop the file watcher thread"""
+        self._watch_stop.set()
+        self._watch_thread = None
+
+    def _get_snapshot(self) -> Dict[str, Any]:
+        """Return the merged settings snapshot, rebuilding it only when stale"""
+        # ⚡ Lock-free fast path: snapshots are copy-on-write (never mutated
+        # after publication), so readers just grab the current reference
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._local_checked_at < self.stat_interval:
+            self._stats["hits"] += 1
+            return snapshot
+
+        with self._lock:
+            if self._refresh_layers():
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+            return self._snapshot
+
+    def invalidate(self, remote: bool = False):
+        """Drop the cached snapshot so the next read reloads the settings file"""
+        with self._lock:
+            self._snapshot = None
+            self._local_stamp = None
+            if remote:
+                self._remote_revision = None
+                if self.supabase_config:
+                    self._remote_cache.refresh(wait=False)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the settings snapshot"""
+        with self._lock:
+            return dict(self._stats)
+
+    def load_settings(self) -> Dict[str, Any]:
+        """Load all settings with Supabase integration"""
+        with self._lock:
+            # Explicit load always revalidates the file (remote layer keeps its TTL)
+            self._local_checked_at = 0.0
+            settings = copy.deepcopy(self._get_snapshot())
+        self._dispatch_events()
         return settings
-    
+
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value"""
-        settings = self.load_settings()
-        return settings.get(key, default)
-    
+        value = self._get_snapshot().get(key, default)
+        self._dispatch_events()
+        # Containers are copied so callers can't mutate the cached snapshot
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def get_local(self, key: str, default: Any = None) -> Any:
+        """Get a value from the local settings only, ignoring Supabase overrides
+
+        The remote layer replaces top-level keys as a whole (e.g. all of
+        api_keys), so entries that only exist locally are read here.
+        """
+        self._get_snapshot()  # revalidates the local layer when stale
+        value = self._local_layer.get(key, default)
+        self._dispatch_events()
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def _write_local_file(self, full: bool = False):
+        """Persist the local layer (never the remote layer)"""
+        # Someone else changed the file since we read it: merge our pending
+        # mutations on top of their version instead of clobbering it
+        if self._file_stamp() != self._local_stamp:
+            local = self._read_local_layer()
+            local.update(self._pending)
+            self._local_layer = local
+
+        # json store: atomic temp-file + rename; journal store: append deltas
+        self._store.write(self._local_layer, changes=dict(self._pending) if not full else None)
+
+        self._pending.clear()
+        self._local_stamp = self._file_stamp()
+        self._local_checked_at = time.monotonic()
+        self._stats["flushes"] += 1
+        self._rebuild_snapshot()
+
+    def _schedule_flush(self):
+        """Start the write-behind timer unless one is already pending"""
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.write_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self) -> bool:
+        """Persist pending mutations now"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                ok = True
+            else:
+                try:
+                    self._write_local_file()
+                    ok = True
+                except Exception as e:
+                    logger.error(f"Error flushing settings: {e}")
+                    ok = False
+        self._dispatch_events()
+        return ok
+
+    @contextmanager
+    def batch(self):
+        """Group several set() calls into a single write
+
+        Usage:
+            with cfg.batch():
+                cfg.set("reply_mode", "Trigger")
+                cfg.set("paket", "basic")
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                done = self._batch_depth == 0
+            if done:
+                self.flush()
+
     def set(self, key: str, value: Any) -> bool:
         """Set configuration value (local only for now)"""
         try:
-            settings = self.load_settings()
-            settings[key] = value
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
-            
-            return True
+            with self._lock:
+                self._get_snapshot()
+                self._stats["sets"] += 1
+
+                # Skip no-op writes (e.g. app_version written on every launch)
+                if key not in self._pending and key in self._local_layer \
+                        and self._local_layer[key] == value:
+                    return True
+
+                value = copy.deepcopy(value)
+                local = dict(self._local_layer)
+                local[key] = value
+                self._local_layer = local
+                self._pending[key] = value
+                self._rebuild_snapshot()
+
+                if self._batch_depth > 0:
+                    deferred = True
+                elif self.write_behind:
+                    self._schedule_flush()
+                    deferred = True
+                else:
+                    deferred = False
+
+            if deferred:
+                self._dispatch_events()
+                return True
+            return self.flush()
         except Exception as e:
             logger.error(f"Error setting config {key}: {e}")
             return False
-    
+
     def save(self) -> bool:
         """Save current settings"""
         try:
-            settings = self.load_settings()
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                self._get_snapshot()
+                self._write_local_file(full=True)
             return True
         except Exception as e:
             logger.error(f"Error saving settings: {e}")
             return False
 
+    def enable_write_behind(self, write_delay: Optional[float] = None):
+        """Switch an existing instance to write-behind persistence"""
+        with self._lock:
+            if write_delay is not None:
+                self.write_delay = write_delay
+            if not self.write_behind:
+                self.write_behind = True
+                atexit.register(self.flush)
+
+
+# ====================================================================
+#  Process-wide registry: one shared ConfigManager per settings file
+# ====================================================================
+_registry: Dict[str, ConfigManager] = {}
+_registry_lock = threading.Lock()
+
+
+def get_config_manager(config_file: str = "config/settings.json",
+                       write_behind: bool = False,
+                       storage: Optional[str] = None) -> ConfigManager:
+    """Return the shared ConfigManager for config_file
+
+    Every caller asking for the same path gets the same instance, so a
+    set() anywhere is visible everywhere immediately and the file is parsed
+    once. write_behind=True upgrades the shared instance to write-behind;
+    storage ("json"/"journal") switches its storage backend. Without it the
+    backend comes from the "settings_storage" setting when the instance is
+    created.
+    """
+    key = str(Path(config_file).resolve())
+    with _registry_lock:
+        manager = _registry.get(key)
+        if manager is None:
+            manager = ConfigManager(config_file, write_behind=write_behind, storage=storage)
+            _registry[key] = manager
+            return manager
+    if write_behind:
+        manager.enable_write_behind()
+    if storage:
+        manager.use_storage(storage)
+    return manager
+
+
 # Global instance
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
@@ -0,0 +1,156 @@
+"""
+HTTP Pool - shared keep-alive sessions for AI provider calls
+
+Every AI request (DeepSeek, OpenAI, VPS server) goes through one
+requests.Session per scheme://host, so consecutive replies reuse an open
+TCP+TLS connection instead of paying a fresh handshake each time.
+"""
+
+import atexit
+import threading
+from typing import Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('StreamMate')
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HTTPSessionPool:
+    """Thread-safe registry of per-host keep-alive sessions
+
+    Sessions share nothing but the pool settings: each host gets its own
+    adapter with at most pool_maxsize open connections. Requests without
+    an explicit timeout get (connect_timeout, read_timeout).
+    """
+
+    def __init__(self, pool_maxsize: int = 4, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0):
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session_for(self, url: str) -> requests.Session:
+        """Get (or create) the keep-alive session for url's host"""
+        key = self._host_key(url)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                      pool_block=False)
+                session = requests.Session()
+                session.mount(key, adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                self._sessions[key] = session
+                self._adapters[key] = adapter
+                self._requests[key] = 0
+                self._errors[key] = 0
+            return session
+
+    def _resolve_timeout(self, timeout: Optional[Timeout]) -> Tuple[float, float]:
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, tuple):
+            return timeout
+        # A single number from older call sites is the overall budget; keep
+        # the connect phase short so a dead host fails fast
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None,
+                **kwargs) -> requests.Response:
+        """Send a request through the pooled session for url's host"""
+        if urlsplit(url).scheme not in ("http", "https"):
+            # Not poolable (e.g. the "supabase_backend" placeholder); let
+            # requests raise its usual error
+            return requests.request(method, url, timeout=self._resolve_timeout(timeout), **kwargs)
+
+        session = self.session_for(url)
+        key = self._host_key(url)
+        try:
+            response = session.request(method, url, timeout=self._resolve_timeout(timeout), **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors[key] += 1
+            raise
+        with self._lock:
+            self._requests[key] += 1
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-host request/connection counters
+
+        connections is how many TCP connections urllib3 has opened for the
+        host; every other request reused an existing one.
+        """
+        result = {}
+        with self._lock:
+            items = list(self._adapters.items())
+            counts = dict(self._requests)
+            errors = dict(self._errors)
+        for key, adapter in items:
+            connections = 0
+            try:
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is not None:
+                        connections += pool.num_connections
+            except Exception:
+                pass
+            total = counts.get(key, 0)
+            result[key] = {
+                "requests": total,
+                "errors": errors.get(key, 0),
+                "connections": connections,
+                "reused": max(0, total - connections),
+                "reuse_rate": round(max(0, total - connections) / total, 3) if total else 0.0,
+            }
+        return result
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._adapters.clear()
+            self._requests.clear()
+            self._errors.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+# Global instance
+http_pool = HTTPSessionPool()
+atexit.register(http_pool.close)
+
+
+def get_http_pool() -> HTTPSessionPool:
+    """Get global HTTP session pool"""
+    return http_pool
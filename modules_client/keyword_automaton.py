@@ -0,0 +1,90 @@
+"""
+Keyword Automaton - Aho-Corasick multi-keyword matching
+
+Shared by the offline responder (intent keywords) and the trigger matcher
+(trigger phrases): all keywords are compiled into one automaton so a
+message is scanned once no matter how many keywords there are.
+"""
+
+from collections import deque
+from typing import Dict, Any, Iterable, List, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercase text
+
+    Keywords are added with an associated value; after build() a single
+    pass over the text reports every keyword occurrence. With
+    whole_words=True a match must start and end at a word boundary, so
+    "hi" does not fire inside "hidup".
+    """
+
+    def __init__(self, whole_words: bool = True):
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]  # (keyword length, value)
+        self._built = False
+
+    def add(self, keyword: str, value: Any):
+        keyword = keyword.lower().strip()
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), value))
+        self._built = False
+
+    def build(self) -> "KeywordAutomaton":
+        """Compute failure links (call after the last add())"""
+        queue = deque(self._goto[0].values())  # depth-1 nodes fail to the root
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, Any]]:
+        """Yield (start, end, value) for every keyword occurrence in text"""
+        if not self._built:
+            self.build()
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        whole_words = self.whole_words
+        length = len(text)
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not out[node]:
+                continue
+            end = index + 1
+            for keyword_length, value in out[node]:
+                start = end - keyword_length
+                if whole_words and ((start > 0 and text[start - 1].isalnum())
+                                    or (end < length and text[end].isalnum())):
+                    continue
+                yield start, end, value
+
+    def values_in(self, text: str) -> List[Any]:
+        """Distinct matched values in order of first occurrence"""
+        seen = []
+        for _, _, value in self.iter_matches(text):
+            if value not in seen:
+                seen.append(value)
+        return seen
@@ -0,0 +1,89 @@
+"""
+Length Control - size AI replies to what TTS will actually speak
+
+Replies are spoken at roughly a fixed rate, and anything past the target
+speaking time is cut before TTS anyway. The controller turns a target
+duration into a character budget, shrinks it as the reply queue backs up,
+and derives max_tokens and stop sequences from it so the provider stops
+generating where speaking would stop. It also tracks how much of the
+generated text ends up being spoken.
+"""
+
+import math
+import threading
+from typing import Dict, Any, NamedTuple, Tuple
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+
+class GenerationLimits(NamedTuple):
+    """Per-request caps passed along with the prompt to the provider"""
+    max_tokens: int
+    max_chars: int
+    stop: Tuple[str, ...] = ()
+
+
+class LengthController:
+    """Speaking-time budget -> max_tokens / stop sequences, scaled down by queue depth"""
+
+    def __init__(self, target_seconds: float = 20.0, min_seconds: float = 6.0,
+                 chars_per_second: float = 12.0, chars_per_token: float = 3.0,
+                 backlog_factor: float = 0.25, terse_queue_depth: int = 3):
+        self.target_seconds = target_seconds
+        self.min_seconds = min_seconds
+        self.chars_per_second = chars_per_second
+        self.chars_per_token = chars_per_token
+        self.backlog_factor = backlog_factor
+        self.terse_queue_depth = terse_queue_depth
+        self._lock = threading.Lock()
+        self._stats = {"replies": 0, "generated_chars": 0, "spoken_chars": 0, "truncated": 0}
+
+    def speaking_seconds(self, queue_depth: int = 0) -> float:
+        """Target duration for one reply with queue_depth questions still waiting"""
+        seconds = self.target_seconds / (1.0 + self.backlog_factor * max(0, queue_depth))
+        return max(self.min_seconds, min(self.target_seconds, seconds))
+
+    def _tokens_for(self, chars: int) -> int:
+        # 20% headroom so the model can finish its sentence before the cap
+        return max(16, math.ceil(chars / self.chars_per_token * 1.2))
+
+    def limits(self, queue_depth: int = 0) -> GenerationLimits:
+        """Limits for a single reply"""
+        max_chars = int(self.speaking_seconds(queue_depth) * self.chars_per_second)
+        # A blank line ends the spoken answer; under backlog any new line does
+        stop = ("\n",) if queue_depth >= self.terse_queue_depth else ("\n\n",)
+        return GenerationLimits(self._tokens_for(max_chars), max_chars, stop)
+
+    def batch_limits(self, count: int, queue_depth: int = 0) -> GenerationLimits:
+        """Limits for one JSON answer covering count questions (no stop: JSON spans lines)"""
+        per_reply = int(self.speaking_seconds(queue_depth) * self.chars_per_second)
+        overhead = 12 * count + 8  # keys, quotes, braces
+        return GenerationLimits(self._tokens_for(per_reply * count + overhead), per_reply, ())
+
+    def record(self, generated: str, spoken: str):
+        """Account one reply: raw generated text vs. the text handed to TTS"""
+        generated_chars = len(generated or "")
+        spoken_chars = len(spoken or "")
+        with self._lock:
+            self._stats["replies"] += 1
+            self._stats["generated_chars"] += generated_chars
+            self._stats["spoken_chars"] += spoken_chars
+            if spoken_chars < generated_chars:
+                self._stats["truncated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        generated = stats["generated_chars"]
+        stats["spoken_ratio"] = round(stats["spoken_chars"] / generated, 3) if generated else 0.0
+        return stats
+
+
+# Global instance
+length_controller = LengthController()
+
+
+def get_length_controller() -> LengthController:
+    """Get global length controller"""
+    return length_controller
@@ -0,0 +1,115 @@
+"""
+Message Features - normalize a viewer comment once and share the result
+
+NormalizedMessage holds everything the reply pipeline derives from a
+comment: lowercase text, the normalized comparison text, its tokens,
+character shingles and whether it is emoji/punctuation only. Punctuation
+is dropped with a translation table that classifies each character once,
+letters stretched to three or more are collapsed ("haloooo" -> "halo",
+"banggg" -> "bang") and a few spelling variants are mapped token by token.
+features_for() memoizes recent comments, so the trigger check, filters,
+question classification and caches that each receive the raw text all
+reuse one record.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+# Spelling variants that elongation collapsing alone does not unify
+TOKEN_ALIASES: Dict[str, str] = {
+    'abang': 'bang',
+    'abangku': 'bang',
+    'bro': 'bang',
+    'kodam': 'khodam',
+    'kodham': 'khodam',
+}
+
+# A letter stretched to three or more: "haloooo", "banggg". Doubled letters
+# ("maaf", "tt") and digits ("100") are real spelling and stay as they are
+_STRETCHED = re.compile(r'([^\W\d_])\1{2,}')
+
+
+class _KeepWordChars(dict):
+    """str.translate table: keeps \\w and whitespace, drops everything else
+
+    Characters are classified on first use and remembered, so the table
+    covers all of Unicode without being built up front.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        value = codepoint if (char.isalnum() or char == '_' or char.isspace()) else None
+        self[codepoint] = value
+        return value
+
+
+_WORD_CHARS_TABLE = _KeepWordChars()
+
+
+def normalize_text(message: str) -> str:
+    """Comparison form of a message: lowercase, no punctuation/emoji, single spaces,
+    letter runs of three or more collapsed, spelling variants unified"""
+    return " ".join(_tokens((message or "").lower()))
+
+
+def _tokens(lower: str) -> List[str]:
+    tokens = _STRETCHED.sub(r'\1', lower.translate(_WORD_CHARS_TABLE)).split()
+    return [TOKEN_ALIASES.get(token, token) for token in tokens]
+
+
+class NormalizedMessage:
+    """Features of one comment, computed once (shingles on first use)"""
+
+    __slots__ = ("raw", "lower", "text", "tokens", "emoji_only", "_shingles")
+
+    def __init__(self, raw: str):
+        self.raw = raw or ""
+        self.lower = self.raw.lower()
+        self.tokens: Tuple[str, ...] = tuple(_tokens(self.lower))
+        self.text = " ".join(self.tokens)
+        self.emoji_only = not self.text
+        self._shingles: Optional[FrozenSet[str]] = None
+
+    def shingles(self, size: int = 3) -> FrozenSet[str]:
+        """Character shingles of the normalized text (size 3 is cached)"""
+        if size == 3 and self._shingles is not None:
+            return self._shingles
+        text = self.text
+        if len(text) <= size:
+            result = frozenset((text,)) if text else frozenset()
+        else:
+            result = frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+        if size == 3:
+            self._shingles = result
+        return result
+
+    def __repr__(self):
+        return f"NormalizedMessage({self.raw!r} -> {self.text!r})"
+
+
+_cache: "OrderedDict[str, NormalizedMessage]" = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 1024
+
+
+def features_for(message) -> NormalizedMessage:
+    """NormalizedMessage for message (str or an existing record), memoized per text"""
+    if isinstance(message, NormalizedMessage):
+        return message
+    message = message or ""
+    with _cache_lock:
+        features = _cache.get(message)
+        if features is not None:
+            _cache.move_to_end(message)
+            return features
+    features = NormalizedMessage(message)
+    with _cache_lock:
+        _cache[message] = features
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return features
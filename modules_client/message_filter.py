@@ -0,0 +1,354 @@
+"""
+Message Filter - staged pipeline deciding which comments are not worth a reply
+
+Each stage is a small object with its own precompiled state (regexes, a
+keyword automaton, normalized history, a near-duplicate index) and a check() that returns a
+rejection reason or None. The pipeline runs the stages in order and stops
+at the first rejection, so cheap stages that reject often run first; with
+adaptive ordering the order is re-ranked from the measured cost and
+rejection rate of each stage. Stateful stages only update their state
+(history, last-ask time) in accept(), once a message has passed every
+stage. Every stage counts checks, rejections and time spent.
+"""
+
+import re
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import Counter, deque
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
+import logging
+
+from modules_client.keyword_automaton import KeywordAutomaton
+from modules_client.message_features import NormalizedMessage, features_for
+from modules_client.near_duplicate import NearDuplicateIndex
+
+logger = logging.getLogger('StreamMate')
+
+TOXIC_WORDS = ("anjing", "tolol", "bangsat", "kontol", "memek", "goblok", "babi",
+               "kampret", "tai", "bajingan", "pepek", "jancok", "asu")
+
+_DIGITS_ONLY = re.compile(r'\d[\d\s]*')
+_NUMBER = re.compile(r'\d+')
+
+
+class FilterVerdict(NamedTuple):
+    """Why a message was rejected"""
+    stage: str
+    reason: str
+
+
+class MessageContext:
+    """One incoming comment: its shared NormalizedMessage plus author and time"""
+
+    __slots__ = ("author", "features", "stripped", "author_key", "now")
+
+    def __init__(self, author: str, features: NormalizedMessage, now: Optional[float] = None):
+        self.author = author
+        self.features = features
+        self.stripped = features.raw.strip()
+        self.author_key = author.lower().strip()
+        self.now = time.time() if now is None else now
+
+    @property
+    def lower(self) -> str:
+        return self.features.lower
+
+    @property
+    def normalized(self) -> str:
+        return self.features.text
+
+
+class FilterStage(ABC):
+    """Base stage: implement check(); stateful stages also override accept()/remember()/reset()"""
+
+    name = "stage"
+
+    @abstractmethod
+    def check(self, ctx: MessageContext) -> Optional[str]:
+        """Rejection reason, or None if the message passes this stage"""
+
+    def accept(self, ctx: MessageContext):
+        """Called once the message passed every stage"""
+
+    def remember(self, author: str, message: str):
+        """Called once the message was answered"""
+
+    def reset(self):
+        """Forget per-session state"""
+
+
+class LengthStage(FilterStage):
+    name = "short"
+
+    def __init__(self, min_chars: int = 5):
+        self.min_chars = min_chars
+
+    def check(self, ctx):
+        if len(ctx.stripped) < self.min_chars:
+            return "message too short"
+        return None
+
+
+class EmojiOnlyStage(FilterStage):
+    name = "emoji"
+
+    def check(self, ctx):
+        if ctx.features.emoji_only:
+            return "emoji/punctuation only"
+        return None
+
+
+class NumericSpamStage(FilterStage):
+    """"3 3 3 3", "7 7 7": at least three copies of the same number and nothing else"""
+
+    name = "numeric"
+
+    def check(self, ctx):
+        if not _DIGITS_ONLY.fullmatch(ctx.stripped):
+            return None
+        numbers = _NUMBER.findall(ctx.stripped)
+        if len(numbers) > 2 and all(n == numbers[0] for n in numbers):
+            return "repeated number spam"
+        return None
+
+
+class ToxicStage(FilterStage):
+    name = "toxic"
+
+    def __init__(self, words: Iterable[str] = TOXIC_WORDS):
+        # Whole words only: "tai"/"asu" must not reject "santai" or "masuk".
+        # The normalized text has stretched letters collapsed ("anjinggg").
+        self._automaton = KeywordAutomaton(whole_words=True)
+        for word in words:
+            self._automaton.add(word, word)
+        self._automaton.build()
+
+    def check(self, ctx):
+        for _, _, word in self._automaton.iter_matches(ctx.normalized):
+            return f"toxic word '{word}'"
+        return None
+
+
+class ReplyHistory:
+    """Normalized (author, message) pairs of the last replied comments"""
+
+    def __init__(self, limit: int = 10):
+        self._entries: deque = deque(maxlen=limit)
+        self._counts: Counter = Counter()
+
+    @property
+    def limit(self) -> int:
+        return self._entries.maxlen
+
+    def add(self, author: str, message: str):
+        key = (author.lower().strip(), features_for(message).text)
+        if len(self._entries) == self._entries.maxlen:
+            old = self._entries[0]
+            self._counts[old] -= 1
+            if self._counts[old] <= 0:
+                del self._counts[old]
+        self._entries.append(key)
+        self._counts[key] += 1
+
+    def contains(self, author_key: str, normalized: str) -> bool:
+        return (author_key, normalized) in self._counts
+
+    def by_author(self, author_key: str) -> List[str]:
+        return [normalized for author, normalized in self._entries if author == author_key]
+
+    def clear(self):
+        self._entries.clear()
+        self._counts.clear()
+
+
+class ExactDuplicateStage(FilterStage):
+    name = "duplicate"
+
+    def __init__(self, history: ReplyHistory):
+        self.history = history
+
+    def check(self, ctx):
+        if self.history.contains(ctx.author_key, ctx.normalized):
+            return "already answered this question"
+        return None
+
+
+class NearDuplicateStage(FilterStage):
+    """Same viewer, similar (shifted, reordered, lightly edited) question within the window"""
+
+    name = "similar"
+
+    def __init__(self, window: float = 600.0, threshold: float = 0.7):
+        self.index = NearDuplicateIndex(window=window, threshold=threshold)
+
+    def check(self, ctx):
+        match = self.index.query(ctx.features, ctx.author_key, now=ctx.now)
+        if match is not None:
+            return f"already asked something similar ({match.similarity:.0%}) {int(match.age)}s ago"
+        return None
+
+    def remember(self, author, message):
+        self.index.add(message, author)
+
+    def reset(self):
+        self.index.clear()
+
+
+class AuthorRateStage(FilterStage):
+    """At most one accepted question per author per cooldown"""
+
+    name = "rate"
+
+    def __init__(self, cooldown: float = 120.0):
+        self.cooldown = cooldown
+        self._last: Dict[str, float] = {}
+
+    def check(self, ctx):
+        last = self._last.get(ctx.author_key)
+        if last is None:
+            return None
+        remaining = self.cooldown - (ctx.now - last)
+        if remaining > 0:
+            return f"asking again too fast (cooldown {int(remaining)}s left)"
+        return None
+
+    def accept(self, ctx):
+        self._last[ctx.author_key] = ctx.now
+        if len(self._last) > 2000:
+            self._last = {a: t for a, t in self._last.items() if ctx.now - t < self.cooldown}
+
+    def reset(self):
+        self._last.clear()
+
+
+class _StageStats:
+    __slots__ = ("checked", "rejected", "elapsed_ns")
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self.elapsed_ns = 0
+
+
+class MessageFilter:
+    """Runs the stages in order, short-circuiting at the first rejection"""
+
+    def __init__(self, stages: Iterable[FilterStage], history: Optional[ReplyHistory] = None,
+                 adaptive: bool = True, reorder_every: int = 200):
+        self.stages: List[FilterStage] = list(stages)
+        self.history = history or ReplyHistory()
+        self.adaptive = adaptive
+        self.reorder_every = reorder_every
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _StageStats] = {stage.name: _StageStats() for stage in self.stages}
+        self._external: Counter = Counter()
+        self._messages = 0
+        self._passed = 0
+
+    def stage(self, name: str) -> Optional[FilterStage]:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        return None
+
+    def check(self, author: str, message, now: Optional[float] = None) -> Optional[FilterVerdict]:
+        """None if the message (str or NormalizedMessage) should be answered,
+        otherwise the rejecting stage and reason"""
+        ctx = MessageContext(author or "", features_for(message), now)
+        with self._lock:
+            self._messages += 1
+            for stage in self.stages:
+                stats = self._stats[stage.name]
+                started = time.perf_counter_ns()
+                reason = stage.check(ctx)
+                stats.elapsed_ns += time.perf_counter_ns() - started
+                stats.checked += 1
+                if reason is not None:
+                    stats.rejected += 1
+                    self._maybe_reorder_locked()
+                    return FilterVerdict(stage.name, reason)
+            for stage in self.stages:
+                stage.accept(ctx)
+            self._passed += 1
+            self._maybe_reorder_locked()
+            return None
+
+    def _maybe_reorder_locked(self):
+        if not self.adaptive or self._messages % self.reorder_every:
+            return
+
+        def expected_cost(stage: FilterStage) -> float:
+            # Time spent per rejection: stages that reject most per microsecond go first
+            stats = self._stats[stage.name]
+            if not stats.checked:
+                return 0.0
+            average = stats.elapsed_ns / stats.checked
+            return average / ((stats.rejected + 1) / (stats.checked + 1))
+
+        self.stages.sort(key=expected_cost)
+
+    def remember(self, author: str, message: str):
+        """Add an answered comment to the history the duplicate stages compare against"""
+        with self._lock:
+            self.history.add(author, message)
+            for stage in self.stages:
+                stage.remember(author, message)
+
+    def record_rejection(self, name: str):
+        """Count a rejection made outside the pipeline (e.g. the daily viewer limit)"""
+        with self._lock:
+            self._external[name] += 1
+
+    def reset(self):
+        """Forget session state (history, cooldowns); counters are kept"""
+        with self._lock:
+            self.history.clear()
+            for stage in self.stages:
+                stage.reset()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {stage.name: _StageStats() for stage in self.stages}
+            self._external.clear()
+            self._messages = 0
+            self._passed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """{"messages", "passed", "rejected", "stages": {name: {...}}} in current stage order"""
+        with self._lock:
+            stages = {}
+            for stage in self.stages:
+                stats = self._stats[stage.name]
+                stages[stage.name] = {
+                    "checked": stats.checked,
+                    "rejected": stats.rejected,
+                    "avg_us": round(stats.elapsed_ns / stats.checked / 1000, 2) if stats.checked else 0.0,
+                }
+            for name, count in self._external.items():
+                stages.setdefault(name, {"checked": 0, "rejected": 0, "avg_us": 0.0})
+                stages[name]["rejected"] += count
+            rejected = sum(s["rejected"] for s in stages.values())
+            return {"messages": self._messages, "passed": self._passed,
+                    "rejected": rejected, "stages": stages}
+
+
+def build_message_filter(history_limit: int = 10, min_chars: int = 5, author_cooldown: float = 120.0,
+                         similar_window: float = 600.0, similarity_threshold: float = 0.7,
+                         toxic_words: Iterable[str] = TOXIC_WORDS) -> MessageFilter:
+    """The auto-reply pipeline: length, emoji, numeric, toxic, duplicate, rate, similar
+
+    Call remember(author, message) after a reply is sent so the duplicate
+    and similar stages see it.
+    """
+    history = ReplyHistory(history_limit)
+    message_filter = MessageFilter([
+        LengthStage(min_chars),
+        EmojiOnlyStage(),
+        NumericSpamStage(),
+        ToxicStage(toxic_words),
+        ExactDuplicateStage(history),
+        AuthorRateStage(author_cooldown),
+        NearDuplicateStage(similar_window, similarity_threshold),
+    ], history=history)
+    return message_filter
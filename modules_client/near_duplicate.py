@@ -0,0 +1,196 @@
+"""
+Near Duplicate - MinHash/LSH index for spotting repeated viewer messages
+
+Messages are reduced to character shingles of their normalized text
+(see message_features), so shifted, reordered or lightly edited
+copies still share most shingles. Each message gets a one-permutation
+MinHash signature (one hash per shingle, densified) split into LSH bands;
+a lookup only compares against entries sharing a band and verifies them
+with the exact shingle Jaccard similarity, instead of scanning every
+stored message. Entries expire after a time window and
+can be looked up per viewer or across all viewers.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+import logging
+
+from modules_client.message_features import features_for
+
+logger = logging.getLogger('StreamMate')
+
+_HASH_MASK = (1 << 64) - 1
+_EMPTY = -1
+
+
+def shingles(message, size: int = 3) -> FrozenSet[str]:
+    """Character shingles of the normalized message (str or NormalizedMessage)"""
+    return features_for(message).shingles(size)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateMatch(NamedTuple):
+    """Closest stored message within the window"""
+    text: str
+    author: str
+    similarity: float
+    age: float
+
+
+class _Entry:
+    __slots__ = ("entry_id", "text", "author", "shingles", "bands", "added_at")
+
+    def __init__(self, entry_id: int, text: str, author: str, shingle_set: FrozenSet[str],
+                 bands: List[Tuple[int, ...]], added_at: float):
+        self.entry_id = entry_id
+        self.text = text
+        self.author = author
+        self.shingles = shingle_set
+        self.bands = bands
+        self.added_at = added_at
+
+
+class NearDuplicateIndex:
+    """Time-windowed MinHash LSH index over short chat messages
+
+    threshold is the shingle Jaccard similarity counted as a duplicate.
+    bands * rows is the signature length; the LSH candidate curve is
+    centred near (1 / bands) ** (1 / rows), so keep that at or a little
+    below threshold (the default 16 x 4 gives ~0.5).
+    """
+
+    def __init__(self, window: float = 600.0, threshold: float = 0.7, bands: int = 16,
+                 rows: int = 4, shingle_size: int = 3, max_entries: int = 5000):
+        self.window = window
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: deque = deque()  # oldest first
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = {}
+        self._by_id: Dict[int, _Entry] = {}
+        self._next_id = 0
+        self._stats = {"added": 0, "queries": 0, "candidates": 0, "matches": 0, "expired": 0}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _bands_for(self, shingle_set: FrozenSet[str]) -> List[Tuple[int, ...]]:
+        # str hashes are salted per process, which is fine for an in-memory index
+        size = self.bands * self.rows
+        bins = [_EMPTY] * size
+        for shingle in shingle_set:
+            h = hash(shingle) & _HASH_MASK
+            slot, value = h % size, h // size
+            if bins[slot] == _EMPTY or value < bins[slot]:
+                bins[slot] = value
+        signature = bins
+        if _EMPTY in bins:
+            # Rotation densification: an empty bin borrows the next filled one,
+            # offset by the distance so borrowed values stay distinguishable
+            signature = list(bins)
+            filled_value, filled_at = _EMPTY, 0
+            for position in range(2 * size - 1, -1, -1):
+                slot = position % size
+                if bins[slot] != _EMPTY:
+                    filled_value, filled_at = bins[slot], position
+                elif filled_value != _EMPTY and position < size:
+                    signature[slot] = filled_value + ((filled_at - position) << 58)
+        rows = self.rows
+        return [tuple(signature[i:i + rows]) for i in range(0, len(signature), rows)]
+
+    def _expire_locked(self, now: float):
+        entries = self._entries
+        while entries and (now - entries[0].added_at > self.window or len(entries) > self.max_entries):
+            entry = entries.popleft()
+            self._by_id.pop(entry.entry_id, None)
+            for band_index, band in enumerate(entry.bands):
+                key = (band_index, band)
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(entry.entry_id)
+                    if not bucket:
+                        del self._buckets[key]
+            self._stats["expired"] += 1
+
+    def add(self, message, author: str = "", now: Optional[float] = None):
+        """Store a message, str or NormalizedMessage (call for accepted/answered ones)"""
+        features = features_for(message)
+        text = features.raw
+        shingle_set = features.shingles(self.shingle_size)
+        if not shingle_set:
+            return
+        now = time.time() if now is None else now
+        bands = self._bands_for(shingle_set)
+        with self._lock:
+            self._expire_locked(now)
+            entry = _Entry(self._next_id, text, author.lower().strip(), shingle_set, bands, now)
+            self._next_id += 1
+            self._entries.append(entry)
+            self._by_id[entry.entry_id] = entry
+            for band_index, band in enumerate(bands):
+                self._buckets.setdefault((band_index, band), set()).add(entry.entry_id)
+            self._stats["added"] += 1
+
+    def query(self, message, author: Optional[str] = None, window: Optional[float] = None,
+              now: Optional[float] = None) -> Optional[DuplicateMatch]:
+        """Most similar stored message at or above threshold
+
+        author limits the lookup to that viewer's messages (None: all
+        viewers); window narrows the index window for this lookup.
+        """
+        shingle_set = shingles(message, self.shingle_size)
+        if not shingle_set:
+            return None
+        now = time.time() if now is None else now
+        window = self.window if window is None else min(window, self.window)
+        author_key = author.lower().strip() if author is not None else None
+        bands = self._bands_for(shingle_set)
+        with self._lock:
+            self._expire_locked(now)
+            self._stats["queries"] += 1
+            candidates: Set[int] = set()
+            for band_index, band in enumerate(bands):
+                bucket = self._buckets.get((band_index, band))
+                if bucket:
+                    candidates.update(bucket)
+            self._stats["candidates"] += len(candidates)
+
+            best, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._by_id[entry_id]
+                if author_key is not None and entry.author != author_key:
+                    continue
+                if now - entry.added_at > window:
+                    continue
+                score = jaccard(shingle_set, entry.shingles)
+                if score >= self.threshold and score > best_score:
+                    best, best_score = entry, score
+            if best is None:
+                return None
+            self._stats["matches"] += 1
+            return DuplicateMatch(best.text, best.author, round(best_score, 3), now - best.added_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._by_id.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._by_id)
+            stats["buckets"] = len(self._buckets)
+        queries = stats["queries"]
+        stats["avg_candidates"] = round(stats["candidates"] / queries, 2) if queries else 0.0
+        return stats
@@ -0,0 +1,200 @@
+"""
+Offline Responder - rule-based replies when every AI provider is down
+
+Classifies only the viewer's own message (never the custom context) with a
+keyword automaton compiled once, then fills a template for that intent.
+Templates come from a built-in bank that the "offline_templates" setting
+can extend or replace per intent; each intent rotates through its
+templates in shuffled order so the same line is not repeated back to back.
+"""
+
+import random
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from modules_client.keyword_automaton import KeywordAutomaton
+
+logger = logging.getLogger('StreamMate')
+
+
+# Intents in priority order: when several match, the earlier one wins
+INTENT_KEYWORDS: Dict[str, Sequence[str]] = {
+    "greeting": ("halo", "hai", "hello", "hi", "hallo", "helo"),
+    "how_are_you": ("kabar", "apa kabar", "gimana"),
+    "build": ("build", "item", "gear", "equipment"),
+    "rank": ("rank", "ranking", "tier", "main"),
+    "hero": ("hero", "champion", "character"),
+    "eating": ("makan", "udah makan", "lunch", "dinner"),
+    "callout": ("col", "bang"),
+}
+
+DEFAULT_TEMPLATES: Dict[str, Sequence[str]] = {
+    "greeting": (
+        "Hai {author}! Lagi push rank nih, gimana kabarmu?",
+        "Halo {author}! Welcome to stream, lagi main MOBA nih",
+        "Hai {author}! Thanks udah join stream, enjoy ya!",
+    ),
+    "how_are_you": (
+        "Baik {author}! Lagi semangat push rank, kamu gimana?",
+        "Alhamdulillah baik {author}, lagi fokus main nih",
+        "Baik dong {author}, lagi grinding rank soalnya hehe",
+    ),
+    "build": (
+        "{author} untuk build sekarang meta damage penetration dulu bro",
+        "Build {author}? War axe, hunter strike, malefic roar meta banget",
+        "{author} coba build damage dulu, nanti tank item terakhir",
+    ),
+    "rank": (
+        "{author} lagi push rank nih, target mythic season ini",
+        "Rank {author}? Lagi di legend, target mythic nih",
+        "{author} main rank yuk, butuh duo partner nih",
+    ),
+    "hero": (
+        "{author} hero favorit gue Layla, damage nya gila sih",
+        "Hero {author}? Coba main marksman, enak buat carry",
+        "{author} hero meta sekarang assassin sama marksman",
+    ),
+    "eating": (
+        "Udah makan {author}, sekarang lagi fokus main nih",
+        "{author} udah makan dong, kamu jangan lupa makan ya",
+        "Alhamdulillah udah makan {author}, energy full buat main",
+    ),
+    "callout": (
+        "Iya {author}! Ada yang bisa gue bantu?",
+        "Hai {author}! Gimana ada pertanyaan?",
+        "Yes {author}! Mau tanya apa nih?",
+    ),
+    "general": (
+        "Hai {author}! Thanks udah nonton stream",
+        "{author} ada yang mau ditanyain tentang game?",
+        "Halo {author}! Enjoy streamnya ya, jangan lupa follow",
+        "{author} gimana pendapat kamu tentang gameplay tadi?",
+        "Thanks {author}! Semoga terhibur sama streamnya",
+    ),
+}
+
+DEFAULT_AUTHOR = "teman"
+
+# "Penonton <author> bertanya: '<message>'" as written by PromptBuilder (and older prompts)
+_PROMPT_VIEWER = re.compile(r"Penonton (.+?) bertanya:\s*'?(.*?)'?(?:\.\s|$)", re.DOTALL)
+
+
+class _Rotation:
+    """Shuffled deck of template indexes; never starts a new deck with the last pick"""
+
+    __slots__ = ("size", "_deck", "_last")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._deck: List[int] = []
+        self._last: Optional[int] = None
+
+    def next(self, rng: random.Random) -> int:
+        if not self._deck:
+            self._deck = list(range(self.size))
+            rng.shuffle(self._deck)
+            if self.size > 1 and self._deck[-1] == self._last:
+                self._deck[0], self._deck[-1] = self._deck[-1], self._deck[0]
+        self._last = self._deck.pop()
+        return self._last
+
+
+class FallbackReply(str):
+    """A reply produced here rather than by an AI provider
+
+    Behaves like the plain text; lets caches recognise and skip it.
+    """
+    __slots__ = ()
+
+
+def is_fallback(reply) -> bool:
+    return isinstance(reply, FallbackReply)
+
+
+class OfflineResponder:
+    """Intent classification + template rotation for the degraded (offline) mode"""
+
+    def __init__(self, templates: Optional[Dict[str, Sequence[str]]] = None,
+                 keywords: Optional[Dict[str, Sequence[str]]] = None, seed: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._keywords = dict(keywords or INTENT_KEYWORDS)
+        self._priority = {intent: rank for rank, intent in enumerate(self._keywords)}
+        self._automaton = KeywordAutomaton()
+        for intent, words in self._keywords.items():
+            for word in words:
+                self._automaton.add(word, intent)
+        self._automaton.build()
+        self._templates: Dict[str, List[str]] = {}
+        self._rotations: Dict[str, _Rotation] = {}
+        self.set_templates(templates)
+
+    def set_templates(self, templates: Optional[Dict[str, Sequence[str]]]):
+        """Use the built-in bank with the given intents replaced (invalid entries ignored)"""
+        merged = {intent: list(items) for intent, items in DEFAULT_TEMPLATES.items()}
+        for intent, items in (templates or {}).items():
+            if isinstance(items, str):
+                items = [items]
+            items = [t for t in items if isinstance(t, str) and t.strip()] if isinstance(items, (list, tuple)) else []
+            if items:
+                merged[intent] = items
+        with self._lock:
+            self._templates = merged
+            self._rotations = {intent: _Rotation(len(items)) for intent, items in merged.items()}
+
+    def classify(self, message: str) -> str:
+        """Highest-priority intent whose keyword appears in message ("general" if none)"""
+        best = None
+        for intent in self._automaton.values_in(message or ""):
+            if best is None or self._priority[intent] < self._priority[best]:
+                best = intent
+        return best or "general"
+
+    def respond(self, message: str, author: str = DEFAULT_AUTHOR) -> FallbackReply:
+        intent = self.classify(message)
+        with self._lock:
+            if intent not in self._templates:
+                intent = "general"
+            index = self._rotations[intent].next(self._rng)
+            template = self._templates[intent][index]
+        try:
+            return FallbackReply(template.format(author=author or DEFAULT_AUTHOR))
+        except (KeyError, IndexError, ValueError):
+            return FallbackReply(template)
+
+    def respond_to_prompt(self, prompt: str) -> FallbackReply:
+        """Reply for a prompt text, classifying only the viewer part of it"""
+        author, message = parse_viewer(prompt)
+        return self.respond(message, author)
+
+
+def parse_viewer(prompt: str) -> Tuple[str, str]:
+    """(author, viewer message) from a reply prompt; the whole text if it has no viewer part"""
+    match = _PROMPT_VIEWER.search(prompt or "")
+    if not match:
+        return DEFAULT_AUTHOR, prompt or ""
+    author = match.group(1).strip() or DEFAULT_AUTHOR
+    return author, match.group(2).strip()
+
+
+_responder: Optional[OfflineResponder] = None
+_responder_lock = threading.Lock()
+
+
+def get_offline_responder() -> OfflineResponder:
+    """Global responder, kept in sync with the "offline_templates" setting"""
+    global _responder
+    with _responder_lock:
+        if _responder is None:
+            _responder = OfflineResponder()
+            try:
+                from modules_client.config_manager import get_config_manager
+                get_config_manager().subscribe(
+                    "offline_templates", lambda change: _responder.set_templates(change.new),
+                    fire_initial=True,
+                )
+            except Exception as e:
+                logger.debug(f"offline_templates setting unavailable: {e}")
+        return _responder
@@ -0,0 +1,172 @@
+"""
+Prompt Builder - cache-friendly prompt layout for cohost replies
+
+Providers with prefix caching (DeepSeek context caching, OpenAI prompt
+caching) only reuse tokens from a byte-identical prefix. The builder
+therefore puts everything that is the same for every reply (persona,
+custom_context, style rules) into one system message that is built once
+per configuration and reused verbatim, and keeps the per-viewer part in a
+short user message after it.
+"""
+
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple, Union
+import logging
+
+from modules_client.length_control import GenerationLimits
+
+logger = logging.getLogger('StreamMate')
+
+
+class ChatPrompt(NamedTuple):
+    """System prefix (stable) + user message (per reply) + optional generation caps"""
+    system: str
+    user: str
+    limits: Optional[GenerationLimits] = None
+
+
+Prompt = Union[str, ChatPrompt]
+
+
+def as_messages(prompt: Prompt) -> List[Dict[str, str]]:
+    """Chat-completions messages for prompt (plain strings become one user message)"""
+    if isinstance(prompt, ChatPrompt):
+        return [{"role": "system", "content": prompt.system},
+                {"role": "user", "content": prompt.user}]
+    return [{"role": "user", "content": prompt}]
+
+
+def as_text(prompt: Prompt) -> str:
+    """Single-string form for endpoints without chat roles (system text first)"""
+    if isinstance(prompt, ChatPrompt):
+        return f"{prompt.system}\n\n{prompt.user}"
+    return prompt
+
+
+def completion_params(prompt: Prompt, max_tokens: int = 400) -> Dict[str, Any]:
+    """max_tokens (and stop) for a chat-completions payload, honouring prompt.limits"""
+    limits = prompt.limits if isinstance(prompt, ChatPrompt) else None
+    if limits is None:
+        return {"max_tokens": max_tokens}
+    params: Dict[str, Any] = {"max_tokens": min(max_tokens, limits.max_tokens)}
+    if limits.stop:
+        params["stop"] = list(limits.stop)
+    return params
+
+
+# 🚀 FAST RESPONSE INSTRUCTIONS: Simplified instructions based on type
+QUESTION_INSTRUCTIONS = {
+    "greeting": "Sapa {author} dengan ramah.",
+    "eating": "Jawab tentang makan dengan santai.",
+    "gaming_build": "Berikan saran build singkat.",
+    "gaming_play": "Ceritakan tentang game saat ini.",
+    "general": "Jawab dengan informatif.",
+}
+
+
+class PromptBuilder:
+    """Builds ChatPrompts whose system message is byte-stable across replies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._system_cache: Dict[Tuple[str, str], str] = {}
+
+    def system_message(self, custom_context: str, lang_out: str) -> str:
+        """Persona + context + style rules; identical string for identical settings"""
+        key = (custom_context or "", lang_out)
+        with self._lock:
+            cached = self._system_cache.get(key)
+            if cached is not None:
+                return cached
+
+        lang_label = "Bahasa Indonesia" if lang_out == "Indonesia" else "English"
+        system = (
+            "Kamu adalah AI Co-Host yang sedang live streaming dan menjawab komentar penonton.\n"
+            f"Informasi: {(custom_context or '').strip()}\n"
+            "Aturan:\n"
+            "- Awali setiap balasan dengan nama penonton yang bertanya.\n"
+            f"- Jawab dalam {lang_label} maksimal 2 kalimat pendek per penonton.\n"
+            "- Gaya santai tanpa emoji berlebihan."
+        )
+        with self._lock:
+            if len(self._system_cache) > 16:
+                self._system_cache.clear()
+            self._system_cache[key] = system
+        return system
+
+    def build_reply(self, author: str, message: str, question_type: str, platform: str,
+                    custom_context: str, lang_out: str,
+                    limits: Optional[GenerationLimits] = None) -> ChatPrompt:
+        """Prompt for one viewer question"""
+        instruction = QUESTION_INSTRUCTIONS.get(question_type, QUESTION_INSTRUCTIONS["general"])
+        user = (
+            f"Platform: {platform}. "
+            f"Penonton {author} bertanya: '{message}'. "
+            f"{instruction.format(author=author)}"
+        )
+        if limits is not None:
+            # Length hint lives in the user part so the system prefix stays cacheable
+            user += f" Maksimal {limits.max_chars} karakter."
+        return ChatPrompt(self.system_message(custom_context, lang_out), user, limits)
+
+    def build_batch(self, items: Sequence[Tuple[str, str, str]], platform: str,
+                    custom_context: str, lang_out: str,
+                    limits: Optional[GenerationLimits] = None) -> ChatPrompt:
+        """Prompt for several questions answered as a JSON object keyed by number
+
+        items are (author, message, question_type).
+        """
+        lines = [f"Platform: {platform}. Beberapa penonton bertanya:"]
+        for number, (author, message, question_type) in enumerate(items, 1):
+            instruction = QUESTION_INSTRUCTIONS.get(question_type, QUESTION_INSTRUCTIONS["general"])
+            lines.append(f"{number}. {author}: '{message}' ({instruction.format(author=author)})")
+        per_reply = f" (maksimal {limits.max_chars} karakter per balasan)" if limits is not None else ""
+        lines.append(
+            f"Balas setiap penonton secara terpisah{per_reply}. "
+            "Kembalikan HANYA JSON object dengan nomor penonton sebagai key, "
+            'contoh: {"1": "balasan untuk penonton 1", "2": "balasan untuk penonton 2"}'
+        )
+        return ChatPrompt(self.system_message(custom_context, lang_out), "\n".join(lines), limits)
+
+
+class PromptCacheStats:
+    """Accumulates provider-reported prefix cache usage
+
+    DeepSeek reports prompt_cache_hit_tokens / prompt_cache_miss_tokens;
+    OpenAI reports prompt_tokens_details.cached_tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"responses": 0, "prompt_tokens": 0, "cache_hit_tokens": 0,
+                       "completion_tokens": 0}
+
+    def record(self, usage: Optional[Dict[str, Any]]):
+        if not isinstance(usage, dict):
+            return
+        hit = usage.get("prompt_cache_hit_tokens")
+        if hit is None:
+            details = usage.get("prompt_tokens_details") or {}
+            hit = details.get("cached_tokens", 0) if isinstance(details, dict) else 0
+        with self._lock:
+            self._stats["responses"] += 1
+            self._stats["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+            self._stats["cache_hit_tokens"] += int(hit or 0)
+            self._stats["completion_tokens"] += int(usage.get("completion_tokens") or 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        prompt_tokens = stats["prompt_tokens"]
+        stats["cache_hit_rate"] = round(stats["cache_hit_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0
+        return stats
+
+
+# Global instances
+prompt_builder = PromptBuilder()
+prompt_cache_stats = PromptCacheStats()
+
+
+def record_prompt_usage(usage: Optional[Dict[str, Any]]):
+    """Feed a provider response's usage block into the prefix-cache counters"""
+    prompt_cache_stats.record(usage)
@@ -0,0 +1,355 @@
+"""
+Provider Chain - health-ordered AI providers with circuit breakers
+
+Each AI backend is registered as a provider. Calls go to the healthiest
+provider first (rolling latency/error score); a provider that keeps
+failing has its circuit opened and is skipped without any network I/O
+until a single half-open probe shows it is back.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Callable, Iterable, List, NamedTuple
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+
+class ProviderUnavailable(Exception):
+    """Raised by a provider that is not configured for this call (no key, no URL)
+
+    Not counted as a failure: the breaker and score are left untouched.
+    """
+
+
+class HedgePolicy(NamedTuple):
+    """When to fire a hedge request at the secondary provider
+
+    The hedge goes out once the primary has been silent for the given
+    percentile of its recent latencies (never sooner than min_delay), and
+    only after the primary has min_samples measurements.
+    """
+    percentile: float = 95.0
+    min_delay: float = 0.5
+    min_samples: int = 5
+
+
+# Sentinel: provider skipped itself (ProviderUnavailable)
+_SKIPPED = object()
+
+
+class CircuitBreaker:
+    """closed -> open after failure_threshold consecutive failures
+
+    While open every call is rejected until recovery_timeout has passed,
+    then one caller is let through as a half-open probe. A successful probe
+    closes the circuit; a failed one re-opens it with a doubled timeout
+    (capped at max_recovery_timeout).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0,
+                 max_recovery_timeout: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._recovery_timeout = recovery_timeout
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._recovery_due():
+                return self.HALF_OPEN
+            return self._state
+
+    def _recovery_due(self) -> bool:
+        return time.monotonic() - self._opened_at >= self._recovery_timeout
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the probe slot if half-open)"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._probe_in_flight or not self._recovery_due():
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._recovery_timeout = self.base_recovery_timeout
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                # Probe failed: back off harder
+                self._recovery_timeout = min(self._recovery_timeout * 2, self.max_recovery_timeout)
+                self._trip()
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._trip()
+
+    def release(self):
+        """Give back a probe slot that ended without a verdict (ProviderUnavailable)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+            self._probe_in_flight = False
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+
+class Provider:
+    """One AI backend plus its breaker and rolling health numbers"""
+
+    def __init__(self, name: str, func: Callable[[str, float], Optional[str]], priority: int,
+                 breaker: CircuitBreaker, alpha: float = 0.2, hedge_only: bool = False,
+                 failure_penalty: float = 30.0):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.breaker = breaker
+        self.alpha = alpha
+        self.hedge_only = hedge_only
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=50)
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def observe(self, ok: bool, latency: float, penalty: Optional[float] = None):
+        """Record one call; a failure counts as penalty seconds (default
+        failure_penalty), not as the time it took to fail, so a provider
+        that errors out quickly does not look fast"""
+        if not ok:
+            latency = max(latency, self.failure_penalty if penalty is None else penalty)
+        a = self.alpha
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.successes += 1
+                self.latencies.append(latency)
+            else:
+                self.failures += 1
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                (1 - a) * self.latency_ewma + a * latency
+            self.error_ewma = (1 - a) * self.error_ewma + a * (0.0 if ok else 1.0)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of recent successful calls (None without data)"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def score(self) -> float:
+        """Expected seconds to a usable reply (lower is better)
+
+        Providers that have not been measured yet score 0 so they keep
+        their registration order until they have data.
+        """
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma / max(1.0 - self.error_ewma, 0.05)
+
+
+class ProviderChain:
+    """Registry of AI providers tried in health order"""
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._providers: List[Provider] = []
+        self._hedge_provider: Optional[Provider] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hedge_stats = {"eligible": 0, "hedged": 0, "hedge_wins": 0,
+                            "primary_wins": 0, "both_failed": 0}
+
+    def register(self, name: str, func: Callable[[str, float], Optional[str]],
+                 priority: Optional[int] = None, hedge_only: bool = False) -> Provider:
+        """Add a provider; func(prompt, timeout) returns the reply, None or raises
+
+        A hedge_only provider is never part of the normal walk; it is only
+        used as the secondary for hedged calls.
+        """
+        with self._lock:
+            provider = Provider(
+                name, func,
+                priority if priority is not None else len(self._providers),
+                CircuitBreaker(self.failure_threshold, self.recovery_timeout),
+                hedge_only=hedge_only,
+            )
+            if hedge_only:
+                self._hedge_provider = provider
+            else:
+                self._providers.append(provider)
+            return provider
+
+    def get(self, name: str) -> Optional[Provider]:
+        """Look up a registered provider (including the hedge provider) by name"""
+        with self._lock:
+            for provider in self._providers + ([self._hedge_provider] if self._hedge_provider else []):
+                if provider.name == name:
+                    return provider
+        return None
+
+    def ordered(self) -> List[Provider]:
+        """Providers healthiest first; open circuits go to the back"""
+        with self._lock:
+            providers = list(self._providers)
+        return sorted(providers, key=lambda p: (p.breaker.state == CircuitBreaker.OPEN,
+                                                p.score(), p.priority))
+
+    def _invoke(self, provider: Provider, prompt: str, timeout: float):
+        """Run one provider call and record its outcome
+
+        Returns the reply, None on failure, or _SKIPPED. The caller must
+        already hold a breaker.allow() slot.
+        """
+        started = time.monotonic()
+        try:
+            reply = provider.func(prompt, timeout)
+        except ProviderUnavailable:
+            provider.breaker.release()
+            provider.skipped += 1
+            return _SKIPPED
+        except Exception as e:
+            reply = None
+            logger.debug(f"Provider {provider.name} failed: {e}")
+
+        ok = bool(reply and reply.strip())
+        provider.observe(ok, time.monotonic() - started, penalty=timeout)
+        if ok:
+            provider.breaker.record_success()
+            return reply
+
+        provider.breaker.record_failure()
+        if provider.breaker.state != CircuitBreaker.CLOSED:
+            print(f"[API] Provider {provider.name} circuit open, skipping it for now")
+        return None
+
+    def call(self, prompt: str, timeout: float = 30.0,
+             hedging: Optional[HedgePolicy] = None,
+             exclude: Iterable[str] = ()) -> Optional[str]:
+        """Return the first non-empty reply, or None if every provider failed
+
+        With a hedging policy the first provider tried is raced against the
+        hedge_only provider once it runs slower than usual. exclude names
+        providers the caller has already tried itself.
+        """
+        hedge_pending = hedging is not None and self._hedge_provider is not None
+        exclude = set(exclude)
+        for provider in self.ordered():
+            if provider.name in exclude:
+                continue
+            if not provider.breaker.allow():
+                provider.skipped += 1
+                continue
+
+            if hedge_pending:
+                hedge_pending = False
+                reply = self._call_hedged(provider, prompt, timeout, hedging)
+            else:
+                reply = self._invoke(provider, prompt, timeout)
+            if reply is not None and reply is not _SKIPPED:
+                return reply
+        return None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="AIHedge")
+            return self._executor
+
+    def _call_hedged(self, primary: Provider, prompt: str, timeout: float,
+                     policy: HedgePolicy):
+        """Race primary against the hedge provider; first good reply wins
+
+        The loser cannot be aborted mid-request, so it is left to finish in
+        the background; its outcome still feeds its own health numbers.
+        """
+        secondary = self._hedge_provider
+        delay = primary.latency_percentile(policy.percentile)
+        if delay is None or len(primary.latencies) < policy.min_samples:
+            # Not enough history to know what "slow" means yet
+            return self._invoke(primary, prompt, timeout)
+        delay = max(policy.min_delay, delay)
+        self.hedge_stats["eligible"] += 1
+
+        executor = self._get_executor()
+        primary_future = executor.submit(self._invoke, primary, prompt, timeout)
+        done, _ = wait([primary_future], timeout=delay)
+        if done or not secondary.breaker.allow():
+            return primary_future.result()
+
+        self.hedge_stats["hedged"] += 1
+        secondary_future = executor.submit(self._invoke, secondary, prompt, timeout)
+        pending = {primary_future, secondary_future}
+        deadline = time.monotonic() + timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                reply = future.result()
+                if reply is not None and reply is not _SKIPPED:
+                    winner = "hedge_wins" if future is secondary_future else "primary_wins"
+                    self.hedge_stats[winner] += 1
+                    return reply
+
+        self.hedge_stats["both_failed"] += 1
+        return None
+
+    def hedging_stats(self) -> Dict[str, Any]:
+        """How often hedges fire (cost) and how often they win (benefit)"""
+        stats = dict(self.hedge_stats)
+        eligible = stats["eligible"]
+        hedged = stats["hedged"]
+        stats["hedge_rate"] = round(hedged / eligible, 3) if eligible else 0.0
+        stats["win_rate"] = round(stats["hedge_wins"] / hedged, 3) if hedged else 0.0
+        return stats
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider health, in current call order"""
+        providers = self.ordered()
+        if self._hedge_provider is not None:
+            providers.append(self._hedge_provider)
+        return {
+            p.name: {
+                "state": p.breaker.state,
+                "calls": p.calls,
+                "successes": p.successes,
+                "failures": p.failures,
+                "skipped": p.skipped,
+                "latency_ms": round(p.latency_ewma * 1000, 1) if p.latency_ewma is not None else None,
+                "error_rate": round(p.error_ewma, 3),
+                "score": round(p.score(), 3),
+            }
+            for p in providers
+        }
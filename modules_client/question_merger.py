@@ -0,0 +1,122 @@
+"""
+Question Merger - answer near-identical pending questions once
+
+When several viewers ask the same thing within a few seconds, only the
+first one is queued. Later askers whose normalized question is close
+enough are attached to that queued question, and when it is answered the
+reply addresses all of them ("Halo A, B dan C ..."), costing one LLM call
+and one TTS playback instead of one per viewer.
+"""
+
+import threading
+import time
+from typing import Dict, Any, List, Tuple
+import logging
+
+from modules_client.reply_cache import normalize_message, word_similarity
+
+logger = logging.getLogger('StreamMate')
+
+# A leader still unanswered after this long was dropped from the queue
+STALE_GROUP_SECONDS = 600
+
+
+def join_authors(authors: List[str], lang_out: str = "Indonesia") -> str:
+    """"A", "A dan B", "A, B dan C" (English: "and")"""
+    conjunction = "dan" if lang_out == "Indonesia" else "and"
+    if len(authors) <= 1:
+        return authors[0] if authors else ""
+    return f"{', '.join(authors[:-1])} {conjunction} {authors[-1]}"
+
+
+class _Group:
+    __slots__ = ("normalized", "authors", "first_seen")
+
+    def __init__(self, normalized: str, author: str):
+        self.normalized = normalized
+        self.authors = [author]
+        self.first_seen = time.time()
+
+
+class QuestionMerger:
+    """Groups pending questions by normalized wording within a short window"""
+
+    def __init__(self, window: float = 10.0, similarity_threshold: float = 0.75,
+                 max_authors: int = 5):
+        self.enabled = True
+        self.window = window
+        self.similarity_threshold = similarity_threshold
+        self.max_authors = max_authors
+        self._lock = threading.Lock()
+        # (leader author, leader message) -> group; leader is the queued entry
+        self._groups: Dict[Tuple[str, str], _Group] = {}
+        self._stats = {"questions": 0, "merged_questions": 0, "merged_replies": 0,
+                       "llm_calls_avoided": 0, "tts_calls_avoided": 0}
+
+    def try_merge(self, author: str, message: str) -> bool:
+        """Attach the question to a pending similar one (True) or register it as a new leader
+
+        A False return means the caller should queue (author, message)
+        itself; call discard() if it ends up not being queued after all.
+        """
+        normalized = normalize_message(message)
+        now = time.time()
+        with self._lock:
+            self._stats["questions"] += 1
+            if not self.enabled or not normalized:
+                return False
+            # Lone leaders past the window have nobody waiting on them; groups with
+            # merged askers stay until their leader is answered (or clearly lost)
+            for key, group in list(self._groups.items()):
+                age = now - group.first_seen
+                if (age > self.window and len(group.authors) == 1) or age > STALE_GROUP_SECONDS:
+                    del self._groups[key]
+
+            best, best_score = None, 0.0
+            for group in self._groups.values():
+                if now - group.first_seen > self.window:
+                    continue
+                if len(group.authors) >= self.max_authors or author in group.authors:
+                    continue
+                score = 1.0 if group.normalized == normalized else word_similarity(normalized, group.normalized)
+                if score > best_score:
+                    best, best_score = group, score
+            if best is not None and best_score >= self.similarity_threshold:
+                best.authors.append(author)
+                self._stats["merged_questions"] += 1
+                return True
+
+            self._groups[(author, message)] = _Group(normalized, author)
+            return False
+
+    def discard(self, author: str, message: str):
+        """Forget a leader that was not queued (queue full)"""
+        with self._lock:
+            self._groups.pop((author, message), None)
+
+    def pop_group(self, author: str, message: str) -> List[str]:
+        """All authors waiting on the queued (author, message), leader first
+
+        Call when the leader leaves the queue; questions arriving afterwards
+        start a new group.
+        """
+        with self._lock:
+            group = self._groups.pop((author, message), None)
+            if group is None or len(group.authors) < 2:
+                return [author]
+            avoided = len(group.authors) - 1
+            self._stats["merged_replies"] += 1
+            self._stats["llm_calls_avoided"] += avoided
+            self._stats["tts_calls_avoided"] += avoided
+            return list(group.authors)
+
+    def clear(self):
+        """Drop all groups (the reply queue was cleared)"""
+        with self._lock:
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_groups"] = len(self._groups)
+        return stats
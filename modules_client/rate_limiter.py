@@ -0,0 +1,272 @@
+"""
+Rate Limiter - adaptive per-provider token buckets over a pool of API keys
+
+Every API key gets its own token bucket. The bucket starts at a modest
+request rate, grows slowly while requests succeed and halves on HTTP 429,
+pausing for Retry-After (or the provider's x-ratelimit reset header) before
+handing the key out again. A provider's keys form a KeyPool that picks a
+key round-robin or least-loaded; callers wait briefly for a free key
+instead of sending a request that would only come back as 429.
+"""
+
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+STRATEGIES = ("round_robin", "least_loaded")
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After / x-ratelimit-reset-* value
+
+    Accepts plain seconds ("2", "0.5"), Go-style durations as sent by
+    OpenAI ("1s", "6m0s", "250ms") and HTTP dates.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+        return sum(float(n) * scale[u] for n, u in parts)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _header(headers, name: str) -> Optional[str]:
+    if not headers:
+        return None
+    # requests' CaseInsensitiveDict and aiohttp's CIMultiDictProxy both match any case
+    value = headers.get(name)
+    if value is None and isinstance(headers, dict):
+        lowered = name.lower()
+        for key, item in headers.items():
+            if key.lower() == lowered:
+                return item
+    return value
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to the provider's 429 responses (AIMD)"""
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, min_rate: float = 0.1,
+                 max_rate: float = 10.0, increase: float = 0.05):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_take(self, now: float) -> float:
+        """Take one token; return 0 on success or the seconds until one is available"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after: Optional[float], now: float):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+
+    def learn_headers(self, headers, now: float):
+        """Pause until the window resets when the provider reports no requests left"""
+        remaining = _header(headers, "x-ratelimit-remaining-requests")
+        if remaining is None:
+            return
+        try:
+            if int(float(remaining)) > 0:
+                return
+        except ValueError:
+            return
+        reset = parse_retry_after(_header(headers, "x-ratelimit-reset-requests"))
+        if reset:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + reset)
+
+
+class _KeyState:
+    __slots__ = ("key", "bucket", "in_flight", "requests", "throttled")
+
+    def __init__(self, key: str, bucket: TokenBucket):
+        self.key = key
+        self.bucket = bucket
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+
+
+class KeyLease:
+    """One acquired key; release() with the response status/headers when done"""
+
+    def __init__(self, pool: "KeyPool", state: _KeyState):
+        self._pool = pool
+        self._state = state
+        self._released = False
+        self.key = state.key
+
+    def release(self, status: Optional[int] = None, headers=None):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._state, status, headers)
+
+
+class KeyPool:
+    """API keys of one provider, each behind its own adaptive token bucket"""
+
+    def __init__(self, name: str, keys: Iterable[str] = (), strategy: str = "least_loaded",
+                 rate: float = 2.0, burst: int = 4):
+        self.name = name
+        self.strategy = strategy if strategy in STRATEGIES else "least_loaded"
+        self.rate = rate
+        self.burst = burst
+        self._cond = threading.Condition()
+        self._states: List[_KeyState] = []
+        self._next = 0
+        self._stats = {"acquired": 0, "waited": 0, "rejected": 0, "throttled": 0}
+        self.set_keys(keys)
+
+    def set_keys(self, keys: Iterable[str]):
+        """Replace the key list; buckets of keys that stay keep their learned rate"""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        with self._cond:
+            if keys == [s.key for s in self._states]:
+                return
+            existing = {s.key: s for s in self._states}
+            self._states = [existing.get(k) or _KeyState(k, TokenBucket(self.rate, self.burst))
+                            for k in keys]
+            self._next = 0
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._states)
+
+    def _candidates(self) -> List[_KeyState]:
+        if self.strategy == "round_robin":
+            start = self._next % len(self._states)
+            return self._states[start:] + self._states[:start]
+        return sorted(self._states, key=lambda s: (s.in_flight, -s.bucket.tokens))
+
+    def acquire(self, wait: float = 0.0) -> Optional[KeyLease]:
+        """Lease a key with capacity, waiting up to wait seconds (None if none frees up)"""
+        deadline = time.monotonic() + wait
+        waited = False
+        with self._cond:
+            while True:
+                if not self._states:
+                    return None
+                now = time.monotonic()
+                shortest = None
+                for state in self._candidates():
+                    delay = state.bucket.try_take(now)
+                    if delay == 0.0:
+                        state.in_flight += 1
+                        state.requests += 1
+                        self._next = self._states.index(state) + 1
+                        self._stats["acquired"] += 1
+                        if waited:
+                            self._stats["waited"] += 1
+                        return KeyLease(self, state)
+                    shortest = delay if shortest is None else min(shortest, delay)
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["rejected"] += 1
+                    return None
+                waited = True
+                self._cond.wait(min(shortest, remaining))
+
+    def _release(self, state: _KeyState, status: Optional[int], headers):
+        now = time.monotonic()
+        with self._cond:
+            state.in_flight = max(0, state.in_flight - 1)
+            if status == 429:
+                retry_after = parse_retry_after(_header(headers, "retry-after"))
+                state.bucket.on_throttled(retry_after, now)
+                state.throttled += 1
+                self._stats["throttled"] += 1
+                logger.info(f"{self.name}: key ...{state.key[-4:]} rate limited, "
+                            f"rate now {state.bucket.rate:.2f}/s")
+            elif status is not None and status < 400:
+                state.bucket.on_success()
+            if headers:
+                state.bucket.learn_headers(headers, now)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["strategy"] = self.strategy
+            stats["keys"] = [
+                {"key": f"...{s.key[-4:]}", "rate": round(s.bucket.rate, 2),
+                 "in_flight": s.in_flight, "requests": s.requests, "throttled": s.throttled,
+                 "blocked_for": round(max(0.0, s.bucket.blocked_until - time.monotonic()), 1)}
+                for s in self._states
+            ]
+        return stats
+
+
+class RateLimiter:
+    """Per-provider KeyPools"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, KeyPool] = {}
+
+    def pool(self, provider: str, keys: Iterable[str], strategy: str = "least_loaded") -> KeyPool:
+        """KeyPool for provider, synced to the current key list and strategy"""
+        with self._lock:
+            pool = self._pools.get(provider)
+            if pool is None:
+                pool = self._pools[provider] = KeyPool(provider, strategy=strategy)
+        if strategy in STRATEGIES:
+            pool.strategy = strategy
+        pool.set_keys(keys)
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
+
+
+# Global instance
+rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get global rate limiter"""
+    return rate_limiter
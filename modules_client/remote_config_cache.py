@@ -0,0 +1,269 @@
+"""
+Remote Config Cache - stale-while-revalidate snapshot of Supabase config
+
+All remote configuration (API keys, iPaymu, environment flags and any
+per-key lookups seen so far) is fetched in one background pass and stored
+as a versioned snapshot under temp/. Startup serves the on-disk snapshot
+immediately; a background refresh revalidates it once the TTL expires.
+Failed refreshes keep serving the stale snapshot and are retried with
+exponential backoff, so an unreachable server is not polled on every read.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, List
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+SCHEMA_VERSION = 1
+DEFAULT_CACHE_FILE = "temp/remote_config_cache.json"
+
+# Sections filled by per-key read-through lookups
+READ_THROUGH_SECTIONS = ("api_keys", "payment", "server", "google")
+
+
+class RemoteConfigCache:
+    """Versioned, disk-backed snapshot of remote configuration"""
+
+    def __init__(self, cache_file: str = DEFAULT_CACHE_FILE, ttl: float = 300.0,
+                 retry_base: float = 5.0):
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.retry_base = retry_base
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+        self._revision = 0
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._failures = 0  # consecutive failed refreshes
+        self._next_attempt_at = 0.0  # backoff after a failed refresh
+        self._bulk_fetcher: Optional[Callable[[Dict[str, List[str]]], Optional[Dict[str, Any]]]] = None
+        self._listeners: List[Callable[[int], None]] = []
+        self._stats = {"disk_loads": 0, "refreshes": 0, "refresh_errors": 0,
+                       "read_through": 0}
+        self._load_from_disk()
+
+    # ------------------------------------------------------------------
+    # Snapshot access
+    # ------------------------------------------------------------------
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    @property
+    def has_data(self) -> bool:
+        return bool(self._data)
+
+    def is_stale(self) -> bool:
+        return time.time() - self._fetched_at >= self.ttl
+
+    def retry_delay(self) -> float:
+        """Seconds to wait after the current run of failed refreshes (capped at the TTL)"""
+        if not self._failures:
+            return 0.0
+        return min(self.retry_base * (2 ** (self._failures - 1)), max(self.ttl, self.retry_base))
+
+    def section(self, name: str) -> Dict[str, Any]:
+        """Return a copy of one snapshot section"""
+        with self._lock:
+            value = self._data.get(name)
+            return dict(value) if isinstance(value, dict) else {}
+
+    def value(self, name: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(name, default)
+
+    def lookup(self, section: str, key: str, fetch_one: Callable[[], Any]) -> Any:
+        """Read-through lookup of one key; remote is hit only on first use
+
+        Misses (None) are cached too, so an absent key costs a single
+        round-trip per revalidation instead of one per call.
+        """
+        with self._lock:
+            items = self._data.get(section)
+            if isinstance(items, dict) and key in items:
+                return items[key]
+
+        value = fetch_one()
+        self._stats["read_through"] += 1
+        with self._lock:
+            items = self._data.setdefault(section, {})
+            items[key] = value
+            self._fetched_at = self._fetched_at or time.time()
+            self._save_to_disk()
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "revision": self._revision,
+                "age_seconds": round(time.time() - self._fetched_at, 1) if self._fetched_at else None,
+                "stale": self.is_stale(),
+                "consecutive_failures": self._failures,
+                "retry_in": round(max(0.0, self._next_attempt_at - time.time()), 1),
+            })
+            return stats
+
+    # ------------------------------------------------------------------
+    # Revalidation
+    # ------------------------------------------------------------------
+    def set_fetcher(self, bulk_fetcher: Callable[[Dict[str, List[str]]], Optional[Dict[str, Any]]]):
+        """Register the function that fetches the complete remote config
+
+        The fetcher receives {section: [keys...]} for every read-through key
+        seen so far and returns the new snapshot data (or None on failure).
+        """
+        self._bulk_fetcher = bulk_fetcher
+
+    def add_listener(self, callback: Callable[[int], None]):
+        """callback(revision) is called after a refresh changed the snapshot"""
+        self._listeners.append(callback)
+
+    def ensure_fresh(self):
+        """Kick off a background refresh if the snapshot is stale (non-blocking)
+
+        After a failed refresh the stale snapshot keeps being served and the
+        next attempt waits for the backoff delay.
+        """
+        if (self._bulk_fetcher is not None and not self._refreshing and self.is_stale()
+                and time.time() >= self._next_attempt_at):
+            self.refresh(wait=False)
+
+    def refresh(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """Fetch all remote config now
+
+        wait=False runs the fetch on a daemon thread and returns immediately.
+        Concurrent refresh requests collapse into the one already running.
+        """
+        if self._bulk_fetcher is None:
+            return False
+
+        with self._lock:
+            if self._refreshing:
+                already_running = True
+            else:
+                already_running = False
+                self._refreshing = True
+
+        if already_running:
+            if wait:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self._refreshing and (deadline is None or time.monotonic() < deadline):
+                    time.sleep(0.05)
+            return not self._refreshing
+
+        if not wait:
+            threading.Thread(target=self._do_refresh, name="RemoteConfigRefresh",
+                             daemon=True).start()
+            return True
+        return self._do_refresh()
+
+    def _do_refresh(self) -> bool:
+        changed = False
+        try:
+            with self._lock:
+                known_keys = {
+                    section: list(self._data.get(section, {}).keys())
+                    for section in READ_THROUGH_SECTIONS
+                    if isinstance(self._data.get(section), dict)
+                }
+            data = self._bulk_fetcher(known_keys)
+            if data is None:
+                self._record_failure()
+                return False
+
+            with self._lock:
+                self._fetched_at = time.time()
+                self._failures = 0
+                self._next_attempt_at = 0.0
+                if data != self._data:
+                    self._data = data
+                    self._revision += 1
+                    changed = True
+                self._stats["refreshes"] += 1
+                self._save_to_disk()
+            return True
+        except Exception as e:
+            self._record_failure()
+            logger.warning(f"Remote config refresh failed: {e}")
+            return False
+        finally:
+            self._refreshing = False
+            if changed:
+                for callback in list(self._listeners):
+                    try:
+                        callback(self._revision)
+                    except Exception as e:
+                        logger.error(f"Remote config listener error: {e}")
+
+    def _record_failure(self):
+        with self._lock:
+            self._stats["refresh_errors"] += 1
+            self._failures += 1
+            self._next_attempt_at = time.time() + self.retry_delay()
+        logger.debug(f"Remote config refresh failed {self._failures}x, "
+                     f"retrying in {self.retry_delay():.0f}s")
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _load_from_disk(self):
+        try:
+            if not self.cache_file.exists():
+                return
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("schema") != SCHEMA_VERSION:
+                logger.info("Remote config cache schema changed, ignoring old snapshot")
+                return
+            self._data = payload.get("data", {}) or {}
+            self._revision = int(payload.get("revision", 0))
+            self._fetched_at = float(payload.get("fetched_at", 0.0))
+            self._stats["disk_loads"] += 1
+        except Exception as e:
+            logger.warning(f"Error loading remote config cache: {e}")
+
+    def _save_to_disk(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            payload = {
+                "schema": SCHEMA_VERSION,
+                "revision": self._revision,
+                "fetched_at": self._fetched_at,
+                "data": self._data,
+            }
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{self.cache_file.name}.", suffix=".tmp",
+                                            dir=str(self.cache_file.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            try:
+                os.chmod(tmp_path, 0o600)  # snapshot contains API keys
+            except OSError:
+                pass
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Error saving remote config cache: {e}")
+
+
+_caches: Dict[str, RemoteConfigCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_remote_config_cache(cache_file: str = DEFAULT_CACHE_FILE,
+                            ttl: Optional[float] = None) -> RemoteConfigCache:
+    """Get the shared cache instance for cache_file"""
+    key = str(Path(cache_file).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = RemoteConfigCache(cache_file, ttl if ttl is not None else 300.0)
+            _caches[key] = cache
+        elif ttl is not None:
+            cache.ttl = ttl
+        return cache
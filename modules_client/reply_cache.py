@@ -0,0 +1,292 @@
+"""
+Reply Cache - reuse AI replies for recurring viewer questions
+
+Replies are stored as templates (the asking viewer's name replaced by
+{author}) under the normalized question, its question type, the output
+language and a hash of the custom context (persona) the reply was
+generated with. Exact keys hit directly; otherwise the closest cached
+question of the same type/language/context is used if it is similar
+enough. Offline fallback replies are never stored. Identical
+questions that arrive while the first one is still being generated wait
+for that one reply instead of starting their own API call.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Tuple
+import logging
+
+from modules_client.message_features import features_for
+from modules_client.offline_responder import is_fallback
+
+logger = logging.getLogger('StreamMate')
+
+AUTHOR_PLACEHOLDER = "{author}"
+SCHEMA_VERSION = 3  # 2: keys from message_features.normalize_text, 3: context hash in keys
+DEFAULT_CACHE_FILE = "temp/reply_cache.json"
+
+def normalize_message(message: str) -> str:
+    """Normalize pesan untuk perbandingan yang lebih akurat."""
+    return features_for(message).text
+
+
+def word_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the word sets of two normalized messages (0-1)"""
+    words_a = set(a.split())
+    words_b = set(b.split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def context_key(context: Optional[str]) -> str:
+    """Short stable hash of the custom context a reply was generated with"""
+    context = (context or "").strip()
+    if not context:
+        return ""
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()[:16]
+
+
+def to_template(reply: str, author: str) -> str:
+    """Replace the viewer's name (as a whole word) in reply with the {author} placeholder"""
+    if not author:
+        return reply
+    pattern = r'(?<!\w)' + re.escape(author) + r'(?!\w)'
+    return re.sub(pattern, lambda _: AUTHOR_PLACEHOLDER, reply, flags=re.IGNORECASE)
+
+
+def personalize(template: str, author: str) -> str:
+    return template.replace(AUTHOR_PLACEHOLDER, author)
+
+
+class _InFlight:
+    __slots__ = ("event", "template")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.template: Optional[str] = None
+
+
+class ReplyCache:
+    """LRU + TTL reply template cache with near-match lookup and in-flight coalescing"""
+
+    def __init__(self, max_entries: int = 500, ttl: float = 6 * 3600,
+                 similarity_threshold: float = 0.8, cache_file: Optional[str] = None,
+                 coalesce_timeout: float = 35.0, autosave_every: int = 20):
+        self.enabled = True
+        self.autosave_every = autosave_every
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.coalesce_timeout = coalesce_timeout
+        self._lock = threading.Lock()
+        # (question_type, language, context_key, normalized) -> (template, stored_at)
+        self._entries: "OrderedDict[Tuple[str, str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str, str, str], _InFlight] = {}
+        self._dirty = False
+        self._stats = {"hits": 0, "near_hits": 0, "misses": 0, "coalesced": 0,
+                       "stores": 0, "evictions": 0, "expired": 0}
+        if self.cache_file is not None:
+            self._load_from_disk()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _key(message: str, question_type: str, language: str,
+             context: Optional[str]) -> Tuple[str, str, str, str]:
+        return (question_type, language, context_key(context), normalize_message(message))
+
+    def _lookup_locked(self, key: Tuple[str, str, str, str], count: bool = True) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            template, stored_at = entry
+            if now - stored_at < self.ttl:
+                if count:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                return template
+            if count:
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        scope, normalized = key[:3], key[3]
+        best_key, best_score = None, 0.0
+        for other_key, (template, stored_at) in self._entries.items():
+            if other_key[:3] != scope:
+                continue
+            if now - stored_at >= self.ttl:
+                continue
+            score = word_similarity(normalized, other_key[3])
+            if score > best_score:
+                best_key, best_score = other_key, score
+        if best_key is not None and best_score >= self.similarity_threshold:
+            if count:
+                self._entries.move_to_end(best_key)
+                self._stats["near_hits"] += 1
+            return self._entries[best_key][0]
+        return None
+
+    def contains(self, message: str, question_type: str, language: str,
+                 context: Optional[str] = None) -> bool:
+        """True if get() would hit; leaves stats and LRU order untouched"""
+        key = self._key(message, question_type, language, context)
+        with self._lock:
+            return self._lookup_locked(key, count=False) is not None
+
+    def get(self, message: str, question_type: str, language: str, author: str,
+            context: Optional[str] = None) -> Optional[str]:
+        """Cached reply for message, personalized for author (None on miss)"""
+        key = self._key(message, question_type, language, context)
+        with self._lock:
+            template = self._lookup_locked(key)
+            if template is None:
+                self._stats["misses"] += 1
+                return None
+        return personalize(template, author)
+
+    def put(self, message: str, question_type: str, language: str, author: str, reply: str,
+            context: Optional[str] = None):
+        """Store reply (generated for author with context) as a template for message"""
+        key = self._key(message, question_type, language, context)
+        if not key[3] or not reply or is_fallback(reply):
+            return
+        with self._lock:
+            self._store_locked(key, to_template(reply, author))
+        self._maybe_autosave()
+
+    def _maybe_autosave(self):
+        if self.autosave_every and self._stats["stores"] % self.autosave_every == 0:
+            self.save()
+
+    def _store_locked(self, key, template: str):
+        self._entries[key] = (template, time.time())
+        self._entries.move_to_end(key)
+        self._stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        self._dirty = True
+
+    def get_or_generate(self, message: str, question_type: str, language: str, author: str,
+                        generate: Callable[[], Optional[str]],
+                        cacheable: Callable[[str], bool] = bool,
+                        context: Optional[str] = None) -> Tuple[Optional[str], bool]:
+        """Return (reply, from_cache), calling generate() only on a miss
+
+        If the same normalized question is already being generated, wait for
+        that result instead of calling generate() again. cacheable(reply)
+        decides whether a fresh reply may be stored (e.g. not error texts);
+        offline fallback replies are never stored.
+        """
+        key = self._key(message, question_type, language, context)
+        with self._lock:
+            template = self._lookup_locked(key)
+            if template is not None:
+                return personalize(template, author), True
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            if flight.event.wait(self.coalesce_timeout) and flight.template is not None:
+                return personalize(flight.template, author), True
+            # Leader failed or took too long: generate our own
+            return generate(), False
+
+        reply = None
+        try:
+            reply = generate()
+            if reply and not is_fallback(reply) and cacheable(reply) and key[3]:
+                flight.template = to_template(reply, author)
+                with self._lock:
+                    self._store_locked(key, flight.template)
+                self._maybe_autosave()
+            return reply, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["near_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _load_from_disk(self):
+        try:
+            if not self.cache_file.exists():
+                return
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("schema") != SCHEMA_VERSION:
+                return
+            now = time.time()
+            for item in payload.get("entries", []):
+                question_type, language, context, normalized, template, stored_at = item
+                if now - stored_at < self.ttl:
+                    self._entries[(question_type, language, context, normalized)] = (template, stored_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Error loading reply cache: {e}")
+
+    def save(self):
+        """Write the cache to cache_file (no-op without a file or changes)"""
+        if self.cache_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [[k[0], k[1], k[2], k[3], template, stored_at]
+                       for k, (template, stored_at) in self._entries.items()]
+            self._dirty = False
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{self.cache_file.name}.", suffix=".tmp",
+                                            dir=str(self.cache_file.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"schema": SCHEMA_VERSION, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Error saving reply cache: {e}")
+
+
+_reply_cache: Optional[ReplyCache] = None
+_reply_cache_lock = threading.Lock()
+
+
+def get_reply_cache() -> ReplyCache:
+    """Shared reply cache, persisted to temp/reply_cache.json across sessions"""
+    global _reply_cache
+    with _reply_cache_lock:
+        if _reply_cache is None:
+            _reply_cache = ReplyCache(cache_file=DEFAULT_CACHE_FILE)
+            atexit.register(_reply_cache.save)
+        return _reply_cache
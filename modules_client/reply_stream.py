@@ -0,0 +1,118 @@
+"""
+Reply Stream - incremental AI replies for early TTS
+
+Reads OpenAI-compatible server-sent-event completions (DeepSeek, OpenAI)
+token by token and cuts them into sentences, so the first sentence can be
+spoken while the rest of the reply is still being generated.
+"""
+
+import json
+import re
+from typing import Dict, Any, Iterator, List, Optional, Callable
+import logging
+
+from modules_client.http_pool import http_pool
+
+logger = logging.getLogger('StreamMate')
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+_SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+
+class StreamError(Exception):
+    """Streaming endpoint returned an error before or during the reply"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+
+
+def iter_sse_completion(url: str, api_key: str, payload: Dict[str, Any],
+                        timeout: float = 30.0,
+                        on_usage: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[str]:
+    """Yield content deltas from an OpenAI-compatible streaming chat completion
+
+    on_usage receives the usage block (sent with the last event when
+    stream_options.include_usage is set).
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+    }
+    body = dict(payload, stream=True)
+    response = http_pool.post(url, headers=headers, json=body, timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            raise StreamError(f"HTTP {response.status_code}", response.status_code, response.headers)
+
+        for raw_line in response.iter_lines(decode_unicode=False):
+            if not raw_line or not raw_line.startswith(b"data:"):
+                continue  # keep-alive comments and blank separators
+            data = raw_line[5:].strip()
+            if data == b"[DONE]":
+                return
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            if event.get("error"):
+                raise StreamError(str(event["error"]))
+            if event.get("usage") and on_usage is not None:
+                on_usage(event["usage"])
+            for choice in event.get("choices", []):
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+    finally:
+        # Returns the connection to the pool (or drops it if unread)
+        response.close()
+
+
+class SentenceSplitter:
+    """Accumulate streamed text and release it one complete sentence at a time"""
+
+    def __init__(self, min_length: int = 8):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add text; return the sentences completed by it"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            # Very short fragments ("Hai.", "1.") are merged into the next sentence
+            if len(candidate) < self.min_length:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Return whatever is left (the unterminated tail)"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest
+
+
+def remainder_after(full_text: str, spoken: str) -> str:
+    """Part of full_text still to be spoken after spoken was already played"""
+    if not spoken:
+        return full_text
+    if full_text.startswith(spoken):
+        return full_text[len(spoken):].strip()
+    index = full_text.find(spoken)
+    if index != -1:
+        return full_text[index + len(spoken):].strip()
+
+    # Cleaning changed the first sentence; drop the first sentence of full_text
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(full_text + " ")
+    if sentences:
+        return full_text[full_text.find(sentences[0]) + len(sentences[0]):].strip()
+    return ""
+
@@ -0,0 +1,238 @@
+"""
+Reply Warmer - pre-generate replies for frequent questions while idle
+
+Counts the questions that reach the reply pipeline (this session plus the
+tail of cohost_log.txt), grouped into clusters of near-identical wording.
+When the caller reports the pipeline idle, the most frequent cluster that
+has no reply in the main reply cache yet is generated in the background
+and kept in a short-TTL warm store, so the next viewer asking it gets an
+answer without waiting for the LLM. A per-session budget caps both the
+number of speculative requests and their estimated token spend.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import logging
+
+from modules_client.prompt_builder import as_text
+from modules_client.offline_responder import is_fallback
+from modules_client.reply_cache import ReplyCache, normalize_message, word_similarity
+
+logger = logging.getLogger('StreamMate')
+
+# Rough chars-per-token for budget estimates (no usage block on this path)
+CHARS_PER_TOKEN = 4
+
+
+class WarmBudget:
+    """Session caps for speculative generation"""
+
+    def __init__(self, max_requests: int = 20, max_tokens: int = 20000, max_per_hour: int = 10):
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.max_per_hour = max_per_hour
+        self.requests = 0
+        self.tokens = 0
+        self._recent: List[float] = []
+
+    def allow(self) -> bool:
+        now = time.time()
+        self._recent = [t for t in self._recent if now - t < 3600]
+        return (self.requests < self.max_requests and self.tokens < self.max_tokens
+                and len(self._recent) < self.max_per_hour)
+
+    def charge(self, tokens: int):
+        self.requests += 1
+        self.tokens += tokens
+        self._recent.append(time.time())
+
+
+class _Cluster:
+    __slots__ = ("question_type", "normalized", "message", "author", "count", "warmed_at")
+
+    def __init__(self, question_type: str, normalized: str, message: str, author: str):
+        self.question_type = question_type
+        self.normalized = normalized
+        self.message = message
+        self.author = author
+        self.count = 0
+        self.warmed_at = 0.0
+
+
+class ReplyWarmer:
+    """Frequency-ranked speculative reply generation with a hard budget
+
+    classify(message) -> question type and build_prompt(author, message,
+    question_type, lang_out, custom_context) must match what the live reply
+    path uses, so warm entries are keyed and worded the same way.
+    """
+
+    def __init__(self, generate: Callable[[Any], Optional[str]],
+                 build_prompt: Callable[[str, str, str, str, str], Any],
+                 classify: Callable[[str], str], reply_cache: Optional[ReplyCache] = None,
+                 ttl: float = 600.0, min_count: int = 2, max_clusters: int = 300,
+                 similarity_threshold: float = 0.8, budget: Optional[WarmBudget] = None):
+        self.enabled = False
+        self.generate = generate
+        self.build_prompt = build_prompt
+        self.classify = classify
+        self.reply_cache = reply_cache
+        self.min_count = min_count
+        self.max_clusters = max_clusters
+        self.similarity_threshold = similarity_threshold
+        self.budget = budget or WarmBudget()
+        self.store = ReplyCache(max_entries=100, ttl=ttl, similarity_threshold=similarity_threshold,
+                                autosave_every=0)
+        self._lock = threading.Lock()
+        self._clusters: Dict[Tuple[str, str], _Cluster] = {}
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {"observed": 0, "warmed": 0, "warm_failures": 0, "served": 0,
+                       "skipped_cached": 0}
+
+    @property
+    def ttl(self) -> float:
+        return self.store.ttl
+
+    @ttl.setter
+    def ttl(self, value: float):
+        self.store.ttl = value
+
+    # ------------------------------------------------------------------
+    # Frequency tracking
+    # ------------------------------------------------------------------
+    def observe(self, message: str, author: str = "", weight: int = 1):
+        """Count one question (call for messages that enter the reply pipeline)"""
+        normalized = normalize_message(message)
+        if len(normalized.split()) < 2:
+            return  # single words carry no question worth warming
+        question_type = self.classify(message)
+        with self._lock:
+            self._stats["observed"] += weight
+            cluster = self._clusters.get((question_type, normalized))
+            if cluster is None:
+                cluster = self._nearest_locked(question_type, normalized)
+            if cluster is None:
+                if len(self._clusters) >= self.max_clusters:
+                    self._evict_locked()
+                cluster = _Cluster(question_type, normalized, message, author)
+                self._clusters[(question_type, normalized)] = cluster
+            cluster.count += weight
+            if author:
+                cluster.author = author
+
+    def _nearest_locked(self, question_type: str, normalized: str) -> Optional[_Cluster]:
+        best, best_score = None, 0.0
+        for (other_type, other), cluster in self._clusters.items():
+            if other_type != question_type:
+                continue
+            score = word_similarity(normalized, other)
+            if score > best_score:
+                best, best_score = cluster, score
+        return best if best_score >= self.similarity_threshold else None
+
+    def _evict_locked(self):
+        key = min(self._clusters, key=lambda k: self._clusters[k].count)
+        del self._clusters[key]
+
+    def load_history(self, log_path, max_bytes: int = 256 * 1024):
+        """Seed counts from the tail of cohost_log.txt (timestamp, author, message, reply)"""
+        path = Path(log_path)
+        try:
+            if not path.exists():
+                return 0
+            with open(path, 'rb') as f:
+                f.seek(0, 2)
+                size = f.tell()
+                f.seek(max(0, size - max_bytes))
+                data = f.read().decode('utf-8', errors='ignore')
+        except OSError as e:
+            logger.debug(f"Reply warmer: cannot read {path}: {e}")
+            return 0
+
+        lines = data.splitlines()
+        if size > max_bytes:
+            lines = lines[1:]  # first line is probably cut
+        loaded = 0
+        for line in lines:
+            parts = line.split("\t")
+            if len(parts) >= 3 and parts[2].strip():
+                self.observe(parts[2].strip(), parts[1].strip())
+                loaded += 1
+        return loaded
+
+    # ------------------------------------------------------------------
+    # Warming
+    # ------------------------------------------------------------------
+    @property
+    def busy(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def _next_candidate(self, lang_out: str, custom_context: str) -> Optional[_Cluster]:
+        now = time.time()
+        with self._lock:
+            ranked = sorted(self._clusters.values(), key=lambda c: c.count, reverse=True)
+        for cluster in ranked:
+            if cluster.count < self.min_count:
+                return None
+            if cluster.warmed_at and now - cluster.warmed_at < self.store.ttl:
+                continue
+            if self.reply_cache is not None and self.reply_cache.enabled:
+                if self.reply_cache.contains(cluster.message, cluster.question_type, lang_out,
+                                            custom_context):
+                    self._stats["skipped_cached"] += 1
+                    cluster.warmed_at = now  # answered already; look again after a TTL
+                    continue
+            return cluster
+        return None
+
+    def warm_next(self, lang_out: str, custom_context: str = "") -> bool:
+        """Start generating the top un-warmed cluster in the background (False if nothing to do)"""
+        if not self.enabled or self.busy or not self.budget.allow():
+            return False
+        cluster = self._next_candidate(lang_out, custom_context)
+        if cluster is None:
+            return False
+        cluster.warmed_at = time.time()
+        self._worker = threading.Thread(target=self._warm, args=(cluster, lang_out, custom_context),
+                                        name="ReplyWarmer", daemon=True)
+        self._worker.start()
+        return True
+
+    def _warm(self, cluster: _Cluster, lang_out: str, custom_context: str):
+        prompt = self.build_prompt(cluster.author, cluster.message, cluster.question_type,
+                                   lang_out, custom_context)
+        reply = None
+        try:
+            reply = self.generate(prompt)
+        except Exception as e:
+            logger.debug(f"Reply warmer: generation failed: {e}")
+        prompt_chars = len(as_text(prompt))
+        self.budget.charge((prompt_chars + len(reply or "")) // CHARS_PER_TOKEN)
+        if reply and not is_fallback(reply) and len(reply.strip()) > 10:
+            self.store.put(cluster.message, cluster.question_type, lang_out, cluster.author, reply,
+                           custom_context)
+            self._stats["warmed"] += 1
+            logger.debug(f"Reply warmer: warmed '{cluster.message}' (seen {cluster.count}x)")
+        else:
+            self._stats["warm_failures"] += 1
+
+    def take(self, message: str, question_type: str, lang_out: str, author: str,
+             custom_context: str = "") -> Optional[str]:
+        """Pre-generated reply for message, personalized for author (None if not warmed)"""
+        if not self.enabled:
+            return None
+        reply = self.store.get(message, question_type, lang_out, author, custom_context)
+        if reply:
+            self._stats["served"] += 1
+        return reply
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        with self._lock:
+            stats["clusters"] = len(self._clusters)
+        stats["warm_entries"] = self.store.stats()["entries"]
+        stats["budget_requests"] = f"{self.budget.requests}/{self.budget.max_requests}"
+        stats["budget_tokens"] = f"{self.budget.tokens}/{self.budget.max_tokens}"
+        return stats
@@ -0,0 +1,239 @@
+"""
+Settings Store - storage backends for ConfigManager's local settings layer
+
+JsonSettingsStore rewrites settings.json atomically on every flush.
+JournaledSettingsStore appends compact delta records to settings.json.journal
+instead, replays them on load, and folds the journal back into settings.json
+in the background once it grows past a size threshold.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Callable
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+Stamp = Optional[Tuple]
+
+# Marker for deleted keys in journal records
+_DELETE = "d"
+
+
+def _stat_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def write_json_atomic(path: Path, data: Dict[str, Any]):
+    """Write JSON to a temp file in the same directory and rename it over path"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def journal_path_for(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+
+def replay_journal(journal_path: Path, state: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Apply journal records to state
+
+    Returns (records applied, offset after the last complete record, file size).
+    A record without its trailing newline is a torn write from a crash and
+    everything from there on is ignored.
+    """
+    applied = 0
+    good_offset = 0
+    if not journal_path.exists():
+        return applied, good_offset, 0
+
+    with open(journal_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get("op") == _DELETE:
+                state.pop(record["k"], None)
+            else:
+                state[record["k"]] = record["v"]
+            good_offset += len(line)
+            applied += 1
+    return applied, good_offset, journal_path.stat().st_size
+
+
+class JsonSettingsStore:
+    """Whole-document storage: every flush rewrites settings.json"""
+
+    kind = "json"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def stamp(self) -> Stamp:
+        """Cheap change detector for the stored state"""
+        return _stat_stamp(self.path)
+
+    def load(self) -> Dict[str, Any]:
+        state = self._load_document()
+        # A journal left behind by the journal store still holds newer values
+        replay_journal(journal_path_for(self.path), state)
+        return state
+
+    def _load_document(self) -> Dict[str, Any]:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading local settings: {e}")
+        return {}
+
+    def write(self, state: Dict[str, Any], changes: Optional[Dict[str, Any]] = None):
+        """Persist state; changes (key -> new value) is a hint for delta stores"""
+        write_json_atomic(self.path, state)
+        # state already includes anything a leftover journal held; replaying
+        # that journal on the next load would bring back older values
+        journal_path = journal_path_for(self.path)
+        try:
+            journal_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove stale settings journal: {e}")
+
+    def close(self):
+        pass
+
+
+class JournaledSettingsStore(JsonSettingsStore):
+    """Append-only delta journal on top of settings.json"""
+
+    kind = "journal"
+
+    def __init__(self, path: Path, compact_threshold: int = 64 * 1024,
+                 on_compacted: Optional[Callable[[], None]] = None):
+        super().__init__(path)
+        self.journal_path = journal_path_for(self.path)
+        self.compact_threshold = compact_threshold
+        self.on_compacted = on_compacted
+        self._lock = threading.Lock()
+        self._latest_state: Optional[Dict[str, Any]] = None
+        self._compacting = False
+        self.stats = {"appends": 0, "appended_bytes": 0, "compactions": 0,
+                      "replayed": 0, "torn_records": 0}
+
+    def stamp(self) -> Stamp:
+        return (_stat_stamp(self.path), _stat_stamp(self.journal_path))
+
+    def load(self) -> Dict[str, Any]:
+        state = self._load_document()
+        with self._lock:
+            applied, good_offset, size = replay_journal(self.journal_path, state)
+            self.stats["replayed"] += applied
+            if good_offset != size:
+                # Cut off the torn tail so new records don't get glued to it
+                self.stats["torn_records"] += 1
+                logger.warning("Settings journal had an incomplete record, truncating it")
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(good_offset)
+            self._latest_state = state
+        return state
+
+    def write(self, state: Dict[str, Any], changes: Optional[Dict[str, Any]] = None):
+        if changes is None:
+            # Full save requested: fold everything into settings.json now
+            self.compact(state)
+            return
+
+        payload = "".join(
+            json.dumps({"k": key, "v": value}, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for key, value in changes.items()
+        ).encode("utf-8")
+
+        with self._lock:
+            # Updated together with the append so compaction never pairs an
+            # older state with a journal that already holds newer records
+            self._latest_state = state
+            with open(self.journal_path, 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats["appends"] += 1
+            self.stats["appended_bytes"] += len(payload)
+            journal_size = self.journal_path.stat().st_size
+
+        if journal_size >= self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._background_compact, name="SettingsCompaction",
+                             daemon=True).start()
+
+    def _background_compact(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Settings journal compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self, state: Optional[Dict[str, Any]] = None):
+        """Write state (default: the latest written state) to settings.json,
+        then empty the journal
+
+        The state is taken under the journal lock, so no record can be
+        appended between choosing it and truncating the journal.
+        settings.json is replaced atomically first; if we crash before the
+        journal is truncated, replaying it again is harmless because every
+        record is an idempotent key assignment.
+        """
+        with self._lock:
+            if state is not None:
+                self._latest_state = state
+            state = self._latest_state
+            if state is None:
+                return
+            write_json_atomic(self.path, state)
+            if self.journal_path.exists():
+                with open(self.journal_path, 'wb') as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.stats["compactions"] += 1
+        if self.on_compacted is not None:
+            try:
+                self.on_compacted()
+            except Exception as e:
+                logger.error(f"Settings compaction callback error: {e}")
+
+    def close(self):
+        """Fold the journal back into settings.json (used when switching stores)"""
+        if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            self.compact()
+
+
+def make_settings_store(path: Path, kind: str = "json", **options) -> JsonSettingsStore:
+    """Create the settings store for kind ("json" or "journal")"""
+    if kind == "journal":
+        return JournaledSettingsStore(path, **options)
+    if kind != "json":
+        logger.warning(f"Unknown settings storage '{kind}', using json")
+    return JsonSettingsStore(path)
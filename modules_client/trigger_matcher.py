@@ -0,0 +1,177 @@
+"""
+Trigger Matcher - compiled trigger-word detection for auto-reply
+
+Built once per trigger-list change. Exact, prefix and substring hits for
+every trigger come from a single Aho-Corasick pass over the message; typo
+tolerance ("ketuwa" -> "ketua") comes from a deletion-neighbourhood index,
+so a message word is checked against all triggers with a handful of dict
+lookups instead of one comparison per trigger. Stretched words ("halloo")
+are also compared with their repeated letters collapsed.
+"""
+
+import re
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import logging
+
+from modules_client.keyword_automaton import KeywordAutomaton
+from modules_client.message_features import features_for
+
+logger = logging.getLogger('StreamMate')
+
+_WORD = re.compile(r'\w+')
+_RUNS = re.compile(r'(.)\1+')
+
+
+class TriggerMatch(NamedTuple):
+    """Which trigger fired and how ("exact", "prefix", "substring" or "fuzzy")"""
+    trigger: str
+    kind: str
+    word: str
+    distance: int = 0
+
+
+def max_edit_distance(length: int) -> int:
+    """Typos tolerated for a trigger of this length (short triggers must match exactly)"""
+    if length < 4:
+        return 0
+    if length < 7:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance of a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)  # transposition
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def collapse_runs(word: str) -> str:
+    """word with every run of a repeated character reduced to one ("halloo" -> "halo")"""
+    return _RUNS.sub(r'\1', word)
+
+
+def _deletions(word: str, depth: int) -> Set[str]:
+    """word with up to depth characters removed (including word itself)"""
+    variants = {word}
+    for count in range(1, min(depth, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add("".join(c for i, c in enumerate(word) if i not in positions))
+    return variants
+
+
+class TriggerMatcher:
+    """Matches a message against a fixed trigger list; construct anew when the list changes"""
+
+    def __init__(self, triggers: Iterable[str], fuzzy: bool = True, word_cache_size: int = 4096):
+        self.triggers: List[str] = list(dict.fromkeys(
+            str(t).lower().strip() for t in triggers if str(t).strip()
+        ))
+        self._order = {trigger: index for index, trigger in enumerate(self.triggers)}
+        self._automaton = KeywordAutomaton(whole_words=False)
+        for trigger in self.triggers:
+            self._automaton.add(trigger, trigger)
+        self._automaton.build()
+
+        # Deletion-neighbourhood index over single-word triggers that allow typos,
+        # holding each trigger as written and with repeated letters collapsed
+        self._fuzzy: Dict[str, List[Tuple[str, str, int]]] = {}
+        self._max_depth = 0
+        self._max_length = 0
+        if fuzzy:
+            for trigger in self.triggers:
+                limit = max_edit_distance(len(trigger))
+                if limit == 0 or " " in trigger:
+                    continue
+                self._max_depth = max(self._max_depth, limit)
+                self._max_length = max(self._max_length, len(trigger) + limit)
+                for form in {trigger, collapse_runs(trigger)}:
+                    for variant in _deletions(form, limit):
+                        self._fuzzy.setdefault(variant, []).append((trigger, form, limit))
+        self._word_cache: Dict[str, Optional[Tuple[str, int]]] = {}
+        self._word_cache_size = word_cache_size
+
+    def __bool__(self):
+        return bool(self.triggers)
+
+    def _classify_hit(self, text: str, start: int, end: int) -> str:
+        starts_word = start == 0 or not text[start - 1].isalnum()
+        ends_word = end == len(text) or not text[end].isalnum()
+        if starts_word and ends_word:
+            return "exact"
+        return "prefix" if starts_word else "substring"
+
+    def _fuzzy_word(self, word: str) -> Optional[Tuple[str, int]]:
+        if word in self._word_cache:
+            return self._word_cache[word]
+        best = None
+        for form in {word, collapse_runs(word)}:
+            if len(form) > self._max_length:
+                continue
+            for variant in _deletions(form, self._max_depth):
+                for trigger, target, limit in self._fuzzy.get(variant, ()):
+                    distance = bounded_edit_distance(form, target, limit)
+                    if distance > limit:
+                        continue
+                    if best is None or (distance, self._order[trigger]) < (best[1], self._order[best[0]]):
+                        best = (trigger, distance)
+        if len(self._word_cache) >= self._word_cache_size:
+            self._word_cache.clear()
+        self._word_cache[word] = best
+        return best
+
+    def match(self, message) -> Optional[TriggerMatch]:
+        """First trigger (in list order) found in message (str or NormalizedMessage);
+        exact/substring hits beat typos"""
+        if not self.triggers or not message:
+            return None
+        text = features_for(message).lower.strip()
+
+        best = None
+        for start, end, trigger in self._automaton.iter_matches(text):
+            if best is None or self._order[trigger] < self._order[best[2]]:
+                best = (start, end, trigger)
+        if best is not None:
+            start, end, trigger = best
+            return TriggerMatch(trigger, self._classify_hit(text, start, end), text[start:end])
+
+        if not self._fuzzy:
+            return None
+        fuzzy_best = None
+        for word in _WORD.findall(text):
+            if len(word) < 3:
+                continue
+            hit = self._fuzzy_word(word)
+            if hit is None:
+                continue
+            trigger, distance = hit
+            if fuzzy_best is None or (distance, self._order[trigger]) < (fuzzy_best.distance, self._order[fuzzy_best.trigger]):
+                fuzzy_best = TriggerMatch(trigger, "fuzzy", word, distance)
+        return fuzzy_best
+
+
+def compile_triggers(trigger_words: Iterable[str], single_trigger: str = "") -> TriggerMatcher:
+    """Matcher for the trigger_words setting, falling back to the legacy single trigger_word
+
+    The single trigger keeps its old substring-only behaviour.
+    """
+    words = [t for t in (trigger_words or []) if str(t).strip()]
+    if words:
+        return TriggerMatcher(words)
+    return TriggerMatcher([single_trigger] if single_trigger else [], fuzzy=False)
@@ -0,0 +1,264 @@
+"""
+Viewer State - compact per-viewer interaction records with timer-wheel expiry
+
+Each viewer seen by the auto-reply filters gets one ViewerRecord
+(__slots__, interned author key, bounded deque of recent normalized
+questions, topic timestamps). Nothing is swept per message: topic
+cooldowns, idle-viewer eviction and the local midnight rollover are
+scheduled on a hierarchical timing wheel that is advanced on each lookup,
+so the cost of handling a comment does not depend on how many viewers
+have been seen. Day rollover is applied lazily to a record the next time
+its viewer shows up.
+"""
+
+import math
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger('StreamMate')
+
+
+class TimingWheel:
+    """Hierarchical timing wheel (seconds / minutes / hours / days by default)
+
+    schedule() and cancel() are O(1); advance() does O(1) amortized work
+    per elapsed tick and per timer, as timers cascade from coarse levels
+    into finer ones when their slot comes up. Timers beyond the total
+    span park in the top level and are re-filed until they are due.
+    Callbacks run inside advance().
+    """
+
+    def __init__(self, tick: float = 1.0, levels: Sequence[int] = (60, 60, 24, 8),
+                 now: Optional[float] = None):
+        self.tick = tick
+        self._sizes = list(levels)
+        self._spans: List[int] = []  # ticks covered by one slot of each level
+        span = 1
+        for size in self._sizes:
+            self._spans.append(span)
+            span *= size
+        self._max_ticks = span
+        self._slots: List[List[list]] = [[[] for _ in range(size)] for size in self._sizes]
+        self._current = int((time.time() if now is None else now) // tick)
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    @property
+    def now(self) -> float:
+        """Time the wheel has advanced to"""
+        return self._current * self.tick
+
+    def schedule(self, deadline: float, callback: Callable, *args) -> list:
+        """Run callback(*args) once deadline (epoch seconds) has passed; returns a handle"""
+        entry = [max(math.ceil(deadline / self.tick), self._current + 1), callback, args]
+        self._file(entry)
+        self._pending += 1
+        return entry
+
+    @staticmethod
+    def cancel(handle: list):
+        handle[1] = None
+
+    def _file(self, entry: list):
+        delta = min(entry[0] - self._current, self._max_ticks - 1)
+        tick = self._current + delta
+        for level, size in enumerate(self._sizes):
+            span = self._spans[level]
+            if delta < span * size:
+                self._slots[level][(tick // span) % size].append(entry)
+                return
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Fire everything due up to now; returns the number of callbacks run"""
+        target = int((time.time() if now is None else now) // self.tick)
+        fired = 0
+        while self._current < target:
+            if not self._pending:
+                self._current = target
+                break
+            self._current += 1
+            current = self._current
+            for level in range(len(self._sizes) - 1, 0, -1):
+                span = self._spans[level]
+                if current % span:
+                    continue
+                slot = self._slots[level]
+                index = (current // span) % self._sizes[level]
+                entries, slot[index] = slot[index], []
+                for entry in entries:
+                    self._file(entry)
+            slot = self._slots[0]
+            index = current % self._sizes[0]
+            entries, slot[index] = slot[index], []
+            for entry in entries:
+                if entry[0] > current:  # parked beyond the wheel span
+                    self._file(entry)
+                    continue
+                self._pending -= 1
+                callback = entry[1]
+                if callback is not None:
+                    callback(*entry[2])
+                    fired += 1
+        return fired
+
+
+class ViewerRecord:
+    """Interaction state of one viewer"""
+
+    __slots__ = ("author", "day", "first_seen", "last_seen", "last_ask", "status",
+                 "interaction_count", "session_count", "recent", "topics")
+
+    def __init__(self, author: str, day: int, now: float, history: int):
+        self.author = author
+        self.day = day
+        self.first_seen = day
+        self.last_seen = now
+        self.last_ask = 0.0
+        self.status = "new"
+        self.interaction_count = 0  # accepted questions today
+        self.session_count = 0  # accepted questions this session (simple limit)
+        self.recent: deque = deque(maxlen=history)  # normalized questions today
+        self.topics: Dict[str, float] = {}  # topic -> last asked (epoch seconds)
+
+    def asked_before(self, normalized: str) -> bool:
+        return normalized in self.recent
+
+
+def status_for(interaction_count: int) -> str:
+    """Loyalty status carried into the next day"""
+    if interaction_count >= 10:
+        return "vip"
+    if interaction_count >= 3:
+        return "regular"
+    return "new"
+
+
+def _day_of(now: float) -> int:
+    return datetime.fromtimestamp(now).date().toordinal()
+
+
+def _next_midnight(now: float) -> float:
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+class ViewerStateStore:
+    """ViewerRecords keyed by interned author name, expired by a TimingWheel"""
+
+    def __init__(self, history: int = 20, idle_days: float = 7, topic_ttl: float = 86400,
+                 now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.history = history
+        self.idle_seconds = idle_days * 86400
+        self.topic_ttl = topic_ttl
+        self._lock = threading.RLock()
+        self._records: Dict[str, ViewerRecord] = {}
+        self._wheel = TimingWheel(now=now)
+        self._today = _day_of(now)
+        self._stats = {"evicted": 0, "topics_expired": 0, "day_rollovers": 0}
+        self._wheel.schedule(_next_midnight(now), self._on_midnight)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, author: str):
+        return author in self._records
+
+    @property
+    def today(self) -> int:
+        """Local date ordinal, updated by the midnight timer"""
+        return self._today
+
+    def _on_midnight(self):
+        now = self._wheel.now
+        self._today = _day_of(now)
+        self._stats["day_rollovers"] += 1
+        self._wheel.schedule(_next_midnight(now), self._on_midnight)
+
+    def _on_idle(self, author: str):
+        record = self._records.get(author)
+        if record is None:
+            return
+        idle_until = record.last_seen + self.idle_seconds
+        if idle_until > self._wheel.now:
+            self._wheel.schedule(idle_until, self._on_idle, author)  # seen again since
+            return
+        del self._records[author]
+        self._stats["evicted"] += 1
+
+    def _on_topic_expired(self, record: ViewerRecord, topic: str, stamp: float):
+        if record.topics.get(topic) == stamp:
+            del record.topics[topic]
+            self._stats["topics_expired"] += 1
+
+    def get(self, author: str, now: Optional[float] = None) -> ViewerRecord:
+        """Record for author (created if new), rolled over to today if needed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._wheel.advance(now)
+            record = self._records.get(author)
+            if record is None:
+                author = sys.intern(author)
+                record = ViewerRecord(author, self._today, now, self.history)
+                self._records[author] = record
+                self._wheel.schedule(now + self.idle_seconds, self._on_idle, author)
+            elif record.day != self._today:
+                record.status = status_for(record.interaction_count)
+                record.day = self._today
+                record.interaction_count = 0
+                record.recent.clear()
+                record.topics.clear()
+            record.last_seen = now
+            return record
+
+    def touch_topic(self, record: ViewerRecord, topic: str, now: Optional[float] = None):
+        """Mark topic as asked now; forgotten after topic_ttl"""
+        now = time.time() if now is None else now
+        with self._lock:
+            record.topics[topic] = now
+            self._wheel.schedule(now + self.topic_ttl, self._on_topic_expired, record, topic, now)
+
+    def record_question(self, record: ViewerRecord, normalized: str, now: Optional[float] = None):
+        """Count an accepted question for today"""
+        with self._lock:
+            record.recent.append(normalized)
+            record.interaction_count += 1
+            record.last_ask = time.time() if now is None else now
+
+    def values(self) -> Iterator[ViewerRecord]:
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def daily_summary(self) -> Tuple[int, int, Dict[str, int]]:
+        """(viewers active today, questions today, status counts) - walks all records"""
+        viewers = questions = 0
+        status_counts = {"new": 0, "regular": 0, "vip": 0}
+        for record in self.values():
+            if record.day != self._today:
+                continue
+            viewers += 1
+            questions += record.interaction_count
+            status_counts[record.status] = status_counts.get(record.status, 0) + 1
+        return viewers, questions, status_counts
+
+    def clear(self):
+        now = time.time()
+        with self._lock:
+            self._records.clear()
+            self._wheel = TimingWheel(now=now)
+            self._today = _day_of(now)
+            self._wheel.schedule(_next_midnight(now), self._on_midnight)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["viewers"] = len(self._records)
+            stats["timers"] = len(self._wheel)
+        return stats
@@ -130,6 +130,50 @@ def test_config_loading():
         traceback.print_exc()
         return False
 
+def test_trigger_matcher():
+    """Test deteksi trigger: exact, prefix, substring, fuzzy dan kata yang dipanjangkan"""
+    print("\n=== Testing Trigger Matcher ===")
+    try:
+        from modules_client.trigger_matcher import compile_triggers
+
+        matcher = compile_triggers(["halo", "bang", "kak", "ketua", "ai"], "")
+
+        # (pesan, trigger yang diharapkan, jenis match yang diharapkan)
+        cases = [
+            ("halo semua", "halo", "exact"),
+            ("bangggg", "bang", "prefix"),
+            ("banget dong", "bang", "prefix"),
+            ("wkwkaiwk", "ai", "substring"),
+            ("ketuwa gimana", "ketua", "fuzzy"),
+            ("halloo semua", "halo", "fuzzy"),
+            # Kata yang dipanjangkan tetap harus kena trigger
+            ("halooo", "halo", None),
+            ("kakkk", "kak", None),
+        ]
+        for message, trigger, kind in cases:
+            match = matcher.match(message)
+            print(f"{message!r} -> {match}")
+            assert match is not None, f"{message!r} tidak terdeteksi"
+            assert match.trigger == trigger, f"{message!r} kena {match.trigger!r}, harusnya {trigger!r}"
+            if kind is not None:
+                assert match.kind == kind, f"{message!r} match {match.kind!r}, harusnya {kind!r}"
+
+        # Typo hanya ditoleransi sesuai panjang trigger
+        ketua = matcher.match("ketuwa")
+        assert ketua.distance == 1, f"ketuwa distance {ketua.distance}, harusnya 1"
+
+        # Pesan tanpa trigger tidak boleh kena
+        for message in ["selamat pagi", "mantap"]:
+            match = matcher.match(message)
+            print(f"{message!r} -> {match}")
+            assert match is None, f"{message!r} harusnya tidak kena trigger"
+
+        return True
+    except Exception as e:
+        print(f"Trigger Matcher Error: {e}")
+        traceback.print_exc()
+        return False
+
 def main():
     print("🔍 StreamMate AI Trigger Debug Test")
     print("=" * 50)
@@ -149,6 +193,9 @@ def main():
     # Test 5: ReplyThread simulation
     reply_thread_ok = test_reply_thread_simulation()
     
+    # Test 6: Trigger matcher
+    matcher_ok = test_trigger_matcher()
+    
     print("\n" + "=" * 50)
     print("📊 TEST RESULTS:")
     print(f"Config Loading: {'✅' if config_ok else '❌'}")
@@ -156,8 +203,9 @@ def main():
     print(f"DeepSeek API: {'✅' if deepseek_ok else '❌'}")
     print(f"ChatGPT API: {'✅' if chatgpt_ok else '❌'}")
     print(f"ReplyThread Simulation: {'✅' if reply_thread_ok else '❌'}")
+    print(f"Trigger Matcher: {'✅' if matcher_ok else '❌'}")
     
-    if all([config_ok, api_bridge_ok, reply_thread_ok]):
+    if all([config_ok, api_bridge_ok, reply_thread_ok, matcher_ok]):
         print("\n🎉 All core tests passed! The issue might be in PyQt event loop interaction.")
     else:
         print("\n⚠️ Some tests failed. Check the errors above.")
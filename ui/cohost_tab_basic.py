@@ -11,6 +11,7 @@ import sounddevice as sd
 import soundfile as sf
 from pathlib import Path
 from datetime import datetime
+from collections import deque
 import logging
 import multiprocessing
 
@@ -32,9 +33,9 @@ import keyboard
 
 # Import ConfigManager dengan fallback
 try:
-    from modules_client.config_manager import ConfigManager
+    from modules_client.config_manager import ConfigManager, get_config_manager
 except ImportError:
-    from modules_client.config_manager import ConfigManager
+    from modules_client.config_manager import ConfigManager, get_config_manager
 
 # Import modules lainnya
 from modules_client.cache_manager import CacheManager
@@ -43,9 +44,23 @@ from modules_client.viewer_memory import ViewerMemory
 
 # Import API functions dengan fallback
 try:
-    from modules_client.api import generate_reply  
+    from modules_client.api import generate_reply, stream_reply
 except ImportError:
     from modules_client.deepseek_ai import generate_reply
+    stream_reply = None
+from modules_client.reply_stream import SentenceSplitter, remainder_after
+from modules_client.reply_cache import get_reply_cache
+from modules_client.message_features import features_for
+from modules_client.reply_warmer import ReplyWarmer
+from modules_client.length_control import get_length_controller
+from modules_client.question_merger import QuestionMerger, join_authors
+from modules_client.trigger_matcher import compile_triggers
+from modules_client.message_filter import build_message_filter
+from modules_client.near_duplicate import NearDuplicateIndex
+from modules_client.viewer_state import ViewerStateStore
+from modules_client.batch_reply import parse_indexed_replies
+from modules_client.async_ai import get_async_ai_client, AICancelled, CancelToken
+from modules_client.prompt_builder import prompt_builder
 
 # Import TTS dari client - FIXED: Use direct import instead
 try:
@@ -158,11 +173,70 @@ def safe_timer_check(obj, timer_name):
 #  ReplyThread for AI Reply Generation
 # ====================================================================
 
+# Topik untuk topic cooldown per penonton
+_COMMON_TOPICS = {
+    "greeting": ["halo", "hai", "hello", "selamat", "salam", "assalamualaikum"],
+    "khodam": ["khodam", "cek", "apa khodam", "siapa khodam", "hewan apa"],
+    "eating": ["makan", "udah makan", "belum makan", "lapar"],
+    "question": ["tanya", "nanya", "mau tanya", "boleh tanya", "bisa tanya"]
+}
+
+
+def _classify_question(message):
+    """⚡ FAST QUESTION DETECTION: Simplified categorization"""
+    message_lower = features_for(message).lower
+    if any(word in message_lower for word in ["kabar", "gimana", "halo", "hai"]):
+        return "greeting"
+    elif any(word in message_lower for word in ["makan", "udah makan"]):
+        return "eating"
+    elif any(word in message_lower for word in ["build", "item", "gear"]):
+        return "gaming_build"
+    elif any(word in message_lower for word in ["main", "game", "rank"]):
+        return "gaming_play"
+    return "general"
+
+
+def _platform_context(author):
+    """🚀 FAST PLATFORM DETECTION: Simplified detection"""
+    is_tiktok = (author.islower() or len(author) <= 15)
+    return "TikTok Live" if is_tiktok else "YouTube Live"
+
+
+def _finalize_reply(author, reply, max_length=250):
+    """Clean AI text for TTS, prefix the author's name and cap the length"""
+    # ⚡ ENHANCED CLEANING: Use clean_text_for_tts function
+    reply = clean_text_for_tts(reply.strip())
+
+    # Ensure starts with author name
+    if not reply.lower().startswith(author.lower()):
+        reply = f"{author} {reply}"
+
+    # ⚡ FAST LENGTH LIMIT: Quick truncation
+    if len(reply) > max_length:  # Reduced limit untuk performa
+        # Find natural break point
+        last_dot = reply.rfind('.', 0, max_length - 3)
+        if last_dot > max_length * 0.8:
+            reply = reply[:last_dot + 1]
+        else:
+            reply = reply[:max_length - 3] + "..."
+    return reply
+
+
+def _max_spoken_length(limits):
+    """Cap for _finalize_reply: the speaking budget plus room for the author prefix"""
+    if limits is None:
+        return 250
+    return max(250, limits.max_chars + 40)
+
+
 class ReplyThread(QThread):
     finished = pyqtSignal(str, str, str)
+    firstSentence = pyqtSignal(str, str, str)  # author, message, sentence (streaming only)
 
     def __init__(self, author: str, message: str, personality: str, 
-                 voice_model: str, language_code: str, lang_out: str):
+                 voice_model: str, language_code: str, lang_out: str,
+                 custom_context: str = None, streaming: bool = False,
+                 reply_cache=None, limits=None):
         super().__init__()
         self.author = author
         self.message = message
@@ -170,66 +244,81 @@ class ReplyThread(QThread):
         self.voice_model = voice_model
         self.language_code = language_code
         self.lang_out = lang_out
+        self.custom_context = custom_context
+        self.streaming = streaming and stream_reply is not None
+        self.reply_cache = reply_cache
+        self.limits = limits  # ⚡ LENGTH CONTROL: max_tokens/stop dari durasi bicara
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        """Stop the AI call of this reply (run() then finishes with an empty reply)"""
+        self.cancel_token.cancel()
+
+    def _generate_reply(self, prompt):
+        if self.streaming:
+            return self._generate_streaming(prompt)
+        # Bounded + cancellable: runs on the shared async AI loop
+        return get_async_ai_client().generate_reply(prompt, token=self.cancel_token)
+
+    def _generate_streaming(self, prompt):
+        """Collect a streamed reply, emitting the first sentence as soon as it is complete"""
+        splitter = SentenceSplitter()
+        parts = []
+        first_sent = False
+        # Same slot/deadline/cancellation as non-streamed calls
+        for chunk in get_async_ai_client().stream(prompt, token=self.cancel_token):
+            if not chunk:
+                continue
+            parts.append(chunk)
+            if first_sent:
+                continue
+            sentences = splitter.feed(chunk)
+            if sentences:
+                first_sent = True
+                sentence = clean_text_for_tts(sentences[0])
+                # Same author prefix rule as the full reply below
+                if not sentence.lower().startswith(self.author.lower()):
+                    sentence = f"{self.author} {sentence}"
+                print(f"[REPLY_THREAD] First sentence ready: {sentence[:50]}")
+                self.firstSentence.emit(self.author, self.message, sentence)
+        if len(parts) == 1:
+            return parts[0]  # not streamed: keep it as is (a FallbackReply stays recognisable)
+        return "".join(parts)
 
     def run(self):
         """🚀 OPTIMIZED: Fast AI reply generation dengan minimal overhead"""
         try:
-            # ⚡ FAST CONFIG: Direct config access
-            cfg = ConfigManager("config/settings.json")
-            extra = cfg.get("custom_context", "").strip()
-            lang_label = "Bahasa Indonesia" if self.lang_out == "Indonesia" else "English"
+            # ⚡ FAST CONFIG: Context is pushed in by CohostTabBasic (config subscription)
+            if self.custom_context is not None:
+                extra = self.custom_context
+            else:
+                extra = get_config_manager("config/settings.json").get("custom_context", "").strip()
 
             # ⚡ SIMPLIFIED: No complex viewer tracking
             # All viewers treated equally for better performance
+            question_type = _classify_question(self.message)
 
-            # ⚡ FAST QUESTION DETECTION: Simplified categorization
-            message_lower = self.message.lower()
-            question_type = "general"
-            
-            if any(word in message_lower for word in ["kabar", "gimana", "halo", "hai"]):
-                question_type = "greeting"
-            elif any(word in message_lower for word in ["makan", "udah makan"]):
-                question_type = "eating"
-            elif any(word in message_lower for word in ["build", "item", "gear"]):
-                question_type = "gaming_build"
-            elif any(word in message_lower for word in ["main", "game", "rank"]):
-                question_type = "gaming_play"
-
-            # 🚀 FAST PLATFORM DETECTION: Simplified detection
-            display_author = self.author
-            is_tiktok = (self.author.islower() or len(self.author) <= 15)
-            platform_context = "TikTok Live" if is_tiktok else "YouTube Live"
-
-            # ⚡ OPTIMIZED PROMPT: Simplified prompt building
-            prompt = (
-                f"Kamu adalah AI Co-Host yang sedang live streaming {platform_context}. "
-                f"Informasi: {extra}. "
-                f"Penonton {display_author} bertanya: '{self.message}'. "
-            )
-
-            # 🚀 FAST RESPONSE INSTRUCTIONS: Simplified instructions based on type
-            if question_type == "greeting":
-                prompt += f"Sapa {self.author} dengan ramah. "
-            elif question_type == "eating":
-                prompt += f"Jawab tentang makan dengan santai. "
-            elif question_type == "gaming_build":
-                prompt += f"Berikan saran build singkat. "
-            elif question_type == "gaming_play":
-                prompt += f"Ceritakan tentang game saat ini. "
-            else:
-                prompt += f"Jawab dengan informatif. "
-
-            # ✅ STANDARD FORMAT: Consistent format instructions
-            prompt += (
-                f"Awali dengan nama {self.author}. "
-                f"Jawab dalam {lang_label} maksimal 2 kalimat pendek. "
-                f"Gaya santai tanpa emoji berlebihan. "
+            # ⚡ CACHE-FRIENDLY PROMPT: stable system prefix (context + rules), small user part
+            prompt = prompt_builder.build_reply(
+                self.author, self.message, question_type, _platform_context(self.author),
+                extra, self.lang_out, limits=self.limits
             )
 
             # 🚀 GENERATE REPLY: Fast AI generation
             try:
                 print(f"[REPLY_THREAD] Calling generate_reply for {self.author}: {self.message}")
-                reply = generate_reply(prompt)
+                if self.reply_cache is not None and self.reply_cache.enabled:
+                    # ⚡ REPLY CACHE: Common questions skip the API call entirely
+                    reply, from_cache = self.reply_cache.get_or_generate(
+                        self.message, question_type, self.lang_out, self.author,
+                        lambda: self._generate_reply(prompt),
+                        cacheable=lambda r: len(r.strip()) > 10,
+                        context=extra
+                    )
+                    if from_cache:
+                        print(f"[REPLY_THREAD] Reply cache hit for: {self.message}")
+                else:
+                    reply = self._generate_reply(prompt)
                 print(f"[REPLY_THREAD] generate_reply returned: {reply}")
                 
                 if not reply:
@@ -237,22 +326,13 @@ class ReplyThread(QThread):
                     reply = f"Hai {self.author} sorry koneksi bermasalah"
                 else:
                     print(f"[REPLY_THREAD] Processing reply: {reply[:50]}...")
-                    # ⚡ ENHANCED CLEANING: Use clean_text_for_tts function
-                    reply = clean_text_for_tts(reply.strip())
-                    
-                    # Ensure starts with author name
-                    if not reply.lower().startswith(self.author.lower()):
-                        reply = f"{self.author} {reply}"
-                
-                    # ⚡ FAST LENGTH LIMIT: Quick truncation
-                    if len(reply) > 250:  # Reduced limit untuk performa
-                        # Find natural break point
-                        last_dot = reply.rfind('.', 0, 247)
-                        if last_dot > 200:
-                            reply = reply[:last_dot + 1]
-                        else:
-                            reply = reply[:247] + "..."
+                    generated = reply
+                    reply = _finalize_reply(self.author, reply, _max_spoken_length(self.limits))
+                    get_length_controller().record(generated, reply)
                         
+            except AICancelled:
+                print(f"[REPLY_THREAD] Reply for {self.author} cancelled (auto-reply stopped)")
+                reply = ""
             except Exception as e:
                 reply = f"Hai {self.author} sorry ada error teknis"
 
@@ -266,6 +346,76 @@ class ReplyThread(QThread):
             error_reply = f"Hai {self.author} maaf ada error"
             self.finished.emit(self.author, self.message, error_reply)
 
+
+class BatchReplyThread(QThread):
+    """🚀 BATCHED AI: One API call answers several queued questions
+
+    Emits finished with [(author, message, reply_or_None), ...] in queue
+    order; None marks a question the batch answer didn't cover, which the
+    caller re-queues for a normal single reply.
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, items, lang_out: str, custom_context: str = "", reply_cache=None,
+                 queue_depth: int = 0):
+        super().__init__()
+        self.items = list(items)
+        self.lang_out = lang_out
+        self.custom_context = custom_context or ""
+        self.reply_cache = reply_cache
+        self.queue_depth = queue_depth
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        """Stop the batch AI call (unanswered questions come back as None)"""
+        self.cancel_token.cancel()
+
+    def _build_prompt(self, items):
+        return prompt_builder.build_batch(
+            [(author, message, _classify_question(message)) for author, message in items],
+            _platform_context(items[0][0]), self.custom_context, self.lang_out,
+            limits=get_length_controller().batch_limits(len(items), self.queue_depth)
+        )
+
+    def run(self):
+        results = [None] * len(self.items)
+        pending = []
+        try:
+            use_cache = self.reply_cache is not None and self.reply_cache.enabled
+            for index, (author, message) in enumerate(self.items):
+                cached = None
+                if use_cache:
+                    cached = self.reply_cache.get(message, _classify_question(message), self.lang_out, author,
+                                                  self.custom_context)
+                if cached:
+                    results[index] = _finalize_reply(author, cached)
+                else:
+                    pending.append(index)
+
+            if pending:
+                batch = [self.items[i] for i in pending]
+                print(f"[BATCH_REPLY] One request for {len(batch)} questions")
+                raw = get_async_ai_client().generate_reply(self._build_prompt(batch), token=self.cancel_token)
+                replies = parse_indexed_replies(raw, len(batch))
+                print(f"[BATCH_REPLY] Parsed {len(replies)}/{len(batch)} replies")
+                for number, index in enumerate(pending, 1):
+                    reply = replies.get(number)
+                    if not reply:
+                        continue
+                    author, message = self.items[index]
+                    if use_cache and len(reply) > 10:
+                        self.reply_cache.put(message, _classify_question(message), self.lang_out, author, reply,
+                                             self.custom_context)
+                    results[index] = _finalize_reply(author, reply)
+                    get_length_controller().record(reply, results[index])
+        except AICancelled:
+            print(f"[BATCH_REPLY] Batch cancelled (auto-reply stopped)")
+        except Exception as e:
+            print(f"[BATCH_REPLY] Error: {e}")
+
+        self.finished.emit([(author, message, results[i])
+                            for i, (author, message) in enumerate(self.items)])
+
 # ====================================================================
 #  DEFINITIVE SOLUTION: In-Process Threaded Pytchat Listener
 # ====================================================================
@@ -1010,11 +1160,14 @@ class CohostTabBasic(QWidget):
     ttsAboutToStart = pyqtSignal()
     ttsFinished = pyqtSignal()
     replyGenerated = pyqtSignal(str, str, str)  # author, message, reply
+    batchRepliesReady = pyqtSignal(object)  # [(author, message, reply_or_None), ...]
     overlayUpdateRequested = pyqtSignal(str, str)  # author, reply
     
     def __init__(self):
         super().__init__()
-        self.cfg = ConfigManager("config/settings.json")
+        # ⚡ Write-behind: slider/spinbox changes are coalesced into one write
+        # (journaled storage is opt-in via the "settings_storage" setting)
+        self.cfg = get_config_manager("config/settings.json", write_behind=True)
         
         # Pastikan direktori penting ada
         required_dirs = [
@@ -1058,6 +1211,10 @@ class CohostTabBasic(QWidget):
         self.processing_batch = False
         self.batch_counter = 0
         self.tts_active = False
+        self._early_tts = None  # (author, message, sentence, done_event) of a streamed reply
+        self._prepared_replies = deque()  # replies from a batched AI call, waiting for TTS
+        self._batch_reply_in_flight = False
+        self._single_replies_due = 0  # re-queued questions the batch missed; answered one by one
         self.recent_messages = []
         self.is_in_cooldown = False
         self.conversation_active = False
@@ -1075,10 +1232,49 @@ class CohostTabBasic(QWidget):
         self.viewer_daily_limit = self.cfg.get("viewer_daily_limit", 5)
         self.topic_cooldown_minutes = self.cfg.get("topic_cooldown_minutes", 10) * 60
         self.topic_blocking_enabled = self.cfg.get("enable_topic_blocking", True)
+
+        # ⚡ Compiled config state for hot paths - rebuilt only when the key changes
+        self._trigger_words = []
+        self._single_trigger = ""
+        self._trigger_matcher = compile_triggers([])
+        self._hotkey_parts = []
+        self._custom_context = ""
+        self._streaming_reply = True
+        self._reply_cache = get_reply_cache()
+        self._batched_replies = True
+        self._reply_warmer = ReplyWarmer(
+            generate=lambda prompt: get_async_ai_client().generate_reply(prompt),
+            build_prompt=lambda author, message, qtype, lang_out, context: prompt_builder.build_reply(
+                author, message, qtype, _platform_context(author), context, lang_out,
+                limits=get_length_controller().limits(0)),
+            classify=_classify_question,
+            reply_cache=self._reply_cache,
+        )
+        self._warm_idle_seconds = 20
+        self._question_merger = QuestionMerger()
+        self._warm_history_loaded = False
+        self._last_reply_activity = time.time()
+        self.cfg.subscribe(["trigger_words", "trigger_word"], self._on_trigger_config_changed, fire_initial=True)
+        self.cfg.subscribe("cohost_hotkey", self._on_hotkey_config_changed, fire_initial=True)
+        self.cfg.subscribe("custom_context", self._on_context_config_changed, fire_initial=True)
+        self.cfg.subscribe("streaming_reply", self._on_streaming_config_changed, fire_initial=True)
+        self.cfg.subscribe("reply_cache", self._on_reply_cache_config_changed, fire_initial=True)
+        self.cfg.subscribe("batched_replies", self._on_batched_config_changed, fire_initial=True)
+        self.cfg.subscribe("reply_warmer", self._on_warmer_config_changed, fire_initial=True)
+        self.cfg.subscribe("reply_length", self._on_length_config_changed, fire_initial=True)
+        self.cfg.subscribe("merge_questions", self._on_merge_config_changed, fire_initial=True)
+        self.cfg.start_watching()
         
         # Tracking data - consolidated
-        self.filter_stats = {"toxic": 0, "short": 0, "emoji": 0, "spam": 0, "numeric": 0}
-        self.viewer_daily_interactions = {}
+        # ⚡ Filter bertahap (short/emoji/numeric/toxic/duplicate/rate/similar) dengan statistik per stage
+        self._message_filter = build_message_filter(
+            history_limit=self.message_history_limit,
+            author_cooldown=self.viewer_cooldown_minutes,
+        )
+        # ⚡ Index MinHash per penonton (24 jam) untuk cek pertanyaan serupa di limit harian
+        self._viewer_question_index = NearDuplicateIndex(window=86400, threshold=0.7, max_entries=20000)
+        # ⚡ Record per penonton (__slots__) + timing wheel untuk expiry topik/hari/penonton lama
+        self.viewer_states = ViewerStateStore(history=20)
         self.viewer_cooldowns = {}
         self.spam_threshold_hours = 24
 
@@ -1090,12 +1286,19 @@ class CohostTabBasic(QWidget):
         self.batch_timer = QTimer()
         self.batch_timer.setSingleShot(True)
         self.batch_timer.timeout.connect(self._process_next_in_batch)
+
+        # ⚡ REPLY WARMER: Cek idle tiap 5 detik, pre-generate pertanyaan yang sering muncul
+        self.warm_timer = QTimer()
+        self.warm_timer.setInterval(5000)
+        self.warm_timer.timeout.connect(self._maybe_warm_replies)
+        self.warm_timer.start()
         
         # ⚡ THREAD-SAFE FIX: Connect TTS signal to handler
         self.ttsFinished.connect(self._handle_tts_complete)
         
         # ⚡ THREAD-SAFE FIX: Connect overlay update signal to handler
         self.overlayUpdateRequested.connect(self._handle_overlay_update)
+        self.batchRepliesReady.connect(self._on_batch_replies)
         
         # ⚡ EMERGENCY CLEANUP: Auto-cleanup timer for thread safety
         self.emergency_cleanup_timer = QTimer()
@@ -1984,6 +2187,7 @@ Current context: Digital products sales expert"""
         """Update cooldown per penonton"""
         self.cfg.set("viewer_cooldown_minutes", value)
         self.viewer_cooldown_minutes = value * 60  # Convert ke detik
+        self._message_filter.stage("rate").cooldown = self.viewer_cooldown_minutes
         self.log_user(f"Viewer cooldown set to {value} minutes", "⏱️")
 
     def update_daily_limit(self, value):
@@ -2307,134 +2511,134 @@ Current context: Digital products sales expert"""
         """Parse hotkey string ke list"""
         return [p.lower() for p in h.split("+") if p]
 
+    def _on_trigger_config_changed(self, change):
+        """Rebuild trigger list when trigger_words / trigger_word changes"""
+        trigger_words = self.cfg.get("trigger_words", []) or []
+        self._trigger_words = [
+            str(t).lower().strip() for t in trigger_words if str(t).strip()
+        ]
+        self._single_trigger = str(self.cfg.get("trigger_word", "") or "").lower().strip()
+        # ⚡ Compile sekali per perubahan: automaton + index typo
+        self._trigger_matcher = compile_triggers(self._trigger_words, self._single_trigger)
+        self.log_debug(f"[CONFIG] Triggers updated ({change.source}): {self._trigger_words}")
+
+    def _on_hotkey_config_changed(self, change):
+        """Re-parse hotkey only when cohost_hotkey changes"""
+        self._hotkey_parts = self._parse(change.new or "Ctrl+Alt+X")
+        self.log_debug(f"[CONFIG] Hotkey updated ({change.source}): {self._hotkey_parts}")
+
+    def _on_context_config_changed(self, change):
+        """Cache custom_context for ReplyThread prompts"""
+        self._custom_context = (change.new or "").strip()
+
+    def _on_streaming_config_changed(self, change):
+        """streaming_reply (default on): speak the first sentence while the rest generates"""
+        self._streaming_reply = change.new is None or bool(change.new)
+
+    def _on_batched_config_changed(self, change):
+        """batched_replies (default on): answer several queued questions with one AI call"""
+        self._batched_replies = change.new is None or bool(change.new)
+
+    def _on_merge_config_changed(self, change):
+        """merge_questions (default on): {"enabled": true, "window_seconds": 10, "similarity": 0.75, "max_authors": 5}"""
+        settings = change.new if isinstance(change.new, dict) else {"enabled": change.new is None or bool(change.new)}
+        merger = self._question_merger
+        merger.enabled = bool(settings.get("enabled", True))
+        try:
+            merger.window = float(settings.get("window_seconds", 10))
+            merger.similarity_threshold = float(settings.get("similarity", 0.75))
+            merger.max_authors = int(settings.get("max_authors", 5))
+        except (TypeError, ValueError):
+            pass
+
+    def _merged_author(self, author, message):
+        """🔗 MERGED QUESTIONS: Nama semua penonton yang menunggu pertanyaan ini"""
+        authors = self._question_merger.pop_group(author, message)
+        if len(authors) < 2:
+            return author
+        stats = self._question_merger.stats()
+        self.log_user(f"🔗 1 balasan untuk {len(authors)} penonton: {', '.join(authors)}", "🤝")
+        self.log_debug(f"Merged questions - LLM calls avoided: {stats['llm_calls_avoided']}, "
+                       f"TTS calls avoided: {stats['tts_calls_avoided']}")
+        return join_authors(authors, self.out_lang.currentText())
+
+    def _on_length_config_changed(self, change):
+        """reply_length: {"target_seconds": 20, "min_seconds": 6, "chars_per_second": 12}"""
+        settings = change.new if isinstance(change.new, dict) else {}
+        controller = get_length_controller()
+        try:
+            controller.target_seconds = float(settings.get("target_seconds", 20))
+            controller.min_seconds = float(settings.get("min_seconds", 6))
+            controller.chars_per_second = float(settings.get("chars_per_second", 12))
+        except (TypeError, ValueError):
+            pass
+
+    def _on_warmer_config_changed(self, change):
+        """reply_warmer (default off): {"enabled": true, "max_requests": 20, "max_tokens": 20000,
+        "max_per_hour": 10, "ttl_minutes": 10, "idle_seconds": 20, "min_count": 2}"""
+        settings = change.new if isinstance(change.new, dict) else {"enabled": bool(change.new)}
+        warmer = self._reply_warmer
+        warmer.enabled = bool(settings.get("enabled", False))
+        try:
+            # Budget counters are per session; only the caps change here
+            warmer.budget.max_requests = int(settings.get("max_requests", 20))
+            warmer.budget.max_tokens = int(settings.get("max_tokens", 20000))
+            warmer.budget.max_per_hour = int(settings.get("max_per_hour", 10))
+            warmer.ttl = float(settings.get("ttl_minutes", 10)) * 60
+            warmer.min_count = int(settings.get("min_count", 2))
+            self._warm_idle_seconds = float(settings.get("idle_seconds", 20))
+        except (TypeError, ValueError):
+            pass
+        if warmer.enabled and not self._warm_history_loaded:
+            self._warm_history_loaded = True
+            threading.Thread(target=warmer.load_history, args=(COHOST_LOG,), daemon=True).start()
+
+    def _maybe_warm_replies(self):
+        """⚡ REPLY WARMER: Pakai waktu idle untuk pre-generate balasan (budget dibatasi)"""
+        warmer = self._reply_warmer
+        if not warmer.enabled or not self.reply_busy:
+            return
+        if self.processing_batch or self.reply_queue or safe_attr_check(self, 'tts_active'):
+            return
+        if any(t.isRunning() for t in getattr(self, '_active_threads', [])):
+            return
+        if time.time() - self._last_reply_activity < self._warm_idle_seconds:
+            return
+        if warmer.warm_next(self.out_lang.currentText(), self._custom_context):
+            self.log_debug(f"Reply warmer started: {warmer.stats()}")
+
+    def _on_reply_cache_config_changed(self, change):
+        """reply_cache: {"enabled": true, "ttl_hours": 6, "similarity": 0.8, "persist": true}"""
+        settings = change.new if isinstance(change.new, dict) else {}
+        cache = self._reply_cache
+        cache.enabled = bool(settings.get("enabled", True))
+        try:
+            cache.ttl = float(settings.get("ttl_hours", 6)) * 3600
+            cache.similarity_threshold = float(settings.get("similarity", 0.8))
+        except (TypeError, ValueError):
+            pass
+        if not settings.get("persist", True):
+            cache.cache_file = None
+
     def _is_pressed(self, h):
         """Cek apakah hotkey sedang ditekan"""
         return all(keyboard.is_pressed(p) for p in self._parse(h))
 
     def _should_skip_message(self, author, message):
-        """Filter pesan yang tidak perlu dibalas dengan tracking yang lebih ketat"""
-        message_clean = message.strip()
-
-        # 1. Skip pesan terlalu pendek
-        if len(message_clean) < 5:
-            self.filter_stats["short"] += 1  
-            self.log_debug(f"Filtered short message: '{message}'")
-            return True
-
-        # 2. Skip emoji-only
-        import re
-        text_only = re.sub(r'[^\w\s]', '', message)
-        if len(text_only.strip()) == 0:
-            self.filter_stats["emoji"] += 1  
-            self.log_debug(f"Filtered emoji-only message: '{message}'")
-            return True
-
-        # 3. Skip kata toxic (selalu aktif)
-        toxic_words = ["anjing", "tolol", "bangsat", "kontol", "memek", "goblok", "babi",
-                        "kampret", "tai", "bajingan", "pepek", "jancok", "asu"]
-        message_lower = message.lower()
-        for toxic in toxic_words:
-            if toxic in message_lower:
-                self.filter_stats["toxic"] += 1  
-                self.log_debug(f"Filtered toxic word '{toxic}' in message: '{message}'")
-                return True
-
-        # 4. Skip nomor seri spam (3 3 3 3, 7 7 7, dll)
-        nomor_pattern = r'^(\d+\s*)+$'
-        if re.match(nomor_pattern, message_clean):
-            numbers = re.findall(r'\d+', message_clean)
-            if len(numbers) > 2 and all(n == numbers[0] for n in numbers):
-                self.filter_stats["numeric"] += 1  
-                self.log_debug(f"Filtered number spam: '{message}'")
-                return True
-
-        # 5. PERBAIKAN UTAMA: Skip kombinasi author + message yang sudah pernah diproses
-        current_key = (author.lower().strip(), self._normalize_message(message_lower))
-        
-        # Cek dalam recent_messages (yang sudah dibalas dalam sesi ini)
-        for prev_author, prev_msg in self.recent_messages:
-            prev_key = (prev_author.lower().strip(), self._normalize_message(prev_msg.lower()))
-            
-            if current_key == prev_key:
-                self.filter_stats["spam"] += 1
-                self.log_debug(f"Filtered duplicate/similar message: '{message}'")
-                return True
-
-        # 6. PERBAIKAN TAMBAHAN: Skip jika author yang sama dengan pertanyaan sangat mirip dalam 10 menit terakhir
-        author_lower = author.lower().strip()
-        similar_threshold = 0.85  # 85% kemiripan
-        
-        # Hitung berapa kali author ini sudah bertanya hal serupa
-        similar_count = 0
-        for prev_author, prev_msg in self.recent_messages[-20:]:  # Cek 20 pesan terakhir
-            if prev_author.lower().strip() == author_lower:
-                similarity = self._calculate_similarity(
-                    self._normalize_message(message_lower),
-                    self._normalize_message(prev_msg.lower())
-                )
-                if similarity > similar_threshold:
-                    similar_count += 1
-                    
-        if similar_count > 0:
-            self.filter_stats["spam"] += 1
-            self.log_view.append(f"[FILTERED] {author} sudah bertanya hal serupa {similar_count}x: '{message[:30]}...'")
-            return True
-
-        # 7. PERBAIKAN EKSTRA: Batasi frekuensi per author (maksimal 1 pertanyaan per 2 menit)
-        import time
-        current_time = time.time()
-        
-        # Inisialisasi tracker jika belum ada
-        if not safe_attr_check(self, 'author_last_time'):
-            self.author_last_time = {}
-        
-        last_time = self.author_last_time.get(author_lower, 0)
-        time_diff = current_time - last_time
-        
-        if time_diff < 120:  # 2 menit = 120 detik
-            remaining = int(120 - time_diff)
-            self.filter_stats["spam"] += 1
-            self.log_view.append(f"[FILTERED] {author} terlalu cepat bertanya lagi (sisa cooldown: {remaining}s)")
-            return True
-        
-        # Update waktu terakhir author bertanya
-        self.author_last_time[author_lower] = current_time
-
-        return False
+        """Filter pesan yang tidak perlu dibalas (pipeline bertahap, lihat message_filter)"""
+        features = features_for(message)
+        verdict = self._message_filter.check(author, features)
+        if verdict is None:
+            return False
+        if verdict.stage in ("similar", "rate"):
+            self.log_user(f"{author}: {verdict.reason} - '{features.raw[:30]}'", "🚫")
+        else:
+            self.log_debug(f"[FILTER] {verdict.stage}: {verdict.reason} - '{features.raw[:30]}'")
+        return True
 
     def _normalize_message(self, message):
         """Normalize pesan untuk perbandingan yang lebih akurat."""
-        import re
-        
-        # Hapus tanda baca dan karakter khusus
-        message = re.sub(r'[^\w\s]', '', message)
-        
-        # Hapus extra spaces dan lowercase
-        message = re.sub(r'\s+', ' ', message)
-        message = message.strip().lower()
-        
-        # Normalisasi kata-kata serupa
-        replacements = {
-            'halooo': 'halo',
-            'haloooo': 'halo', 
-            'haloo': 'halo',
-            'haalo': 'halo',
-            'haaaalo': 'halo',
-            'banggg': 'bang',
-            'bangg': 'bang',
-            'abangku': 'bang',
-            'abang': 'bang',
-            'bro': 'bang',  # Normalisasi bro jadi bang
-            'brooo': 'bang',
-            'khodam': 'khodam',
-            'kodam': 'khodam',
-            'kodham': 'khodam'
-        }
-        
-        for old, new in replacements.items():
-            message = message.replace(old, new)
-        
-        return message
+        return features_for(message).text
 
     def _calculate_similarity(self, str1, str2):
         """Hitung kemiripan antara dua string (0-1)"""
@@ -2462,21 +2666,13 @@ Current context: Digital products sales expert"""
     def _is_viewer_daily_limit_reached_simple(self, author, message):
         """⚡ PERFORMANCE FIX: Simplified viewer daily limit check to prevent hanging"""
         try:
-            # Initialize viewer interactions dict if not exists
-            if not hasattr(self, 'viewer_daily_interactions'):
-                self.viewer_daily_interactions = {}
-            
             # Simple check: Allow max 5 interactions per viewer per session
-            if author not in self.viewer_daily_interactions:
-                self.viewer_daily_interactions[author] = 1
-                return False
-            
-            current_count = self.viewer_daily_interactions[author]
-            if current_count >= 5:
+            record = self.viewer_states.get(author)
+            if record.session_count >= 5:
                 return True  # Limit reached
             
             # Increment counter
-            self.viewer_daily_interactions[author] = current_count + 1
+            record.session_count += 1
             return False
             
         except Exception as e:
@@ -2485,88 +2681,34 @@ Current context: Digital products sales expert"""
     
     def _is_viewer_daily_limit_reached(self, author, message):
         """Cek apakah penonton sudah bertanya hal yang sama atau serupa dalam 24 jam."""
-        self.log_debug(f"[VIEWER_LIMIT] Starting check for: {author}")
-        from datetime import datetime
-        today = datetime.now().strftime("%Y-%m-%d")
-        self.log_debug(f"[VIEWER_LIMIT] Today: {today}")
-        
-        normalized_message = self._normalize_message(message.lower())
-        self.log_debug(f"[VIEWER_LIMIT] Normalized message: {normalized_message[:50]}...")
-        
-        # Bersihkan data hari lama
-        self.log_debug(f"[VIEWER_LIMIT] About to cleanup old daily data")
-        self._cleanup_old_daily_data()
-        self.log_debug(f"[VIEWER_LIMIT] Cleanup completed")
-        
-        # Inisialisasi data penonton jika belum ada
-        if author not in self.viewer_daily_interactions:
-            self.viewer_daily_interactions[author] = {
-                "date": today,
-                "messages": [],
-                "normalized_messages": [],
-                "interaction_count": 0,
-                "status": "new",
-                "first_seen": today,
-                "similar_topics": {}
-            }
-        
-        viewer_data = self.viewer_daily_interactions[author]
-        
-        # Reset jika hari berbeda
-        if viewer_data["date"] != today:
-            old_count = viewer_data.get("interaction_count", 0)
-            if old_count >= 10:
-                new_status = "vip"
-            elif old_count >= 3:
-                new_status = "regular"
-            else:
-                new_status = "new"
-            
-            viewer_data.update({
-                "date": today,
-                "messages": [],
-                "normalized_messages": [],
-                "interaction_count": 0,
-                "status": new_status,
-                "similar_topics": {}
-            })
-            self.log_debug(f"Daily reset for {author} - Status: {new_status}")
+        features = features_for(message)
+        normalized_message = features.text
+        current_time = time.time()
+
+        # ⚡ Record penonton; pergantian hari, topik & penonton lama diurus timing wheel
+        viewer = self.viewer_states.get(author, current_time)
         
         # FILTER 1: Cek pertanyaan exact sama
-        exact_count = viewer_data["normalized_messages"].count(normalized_message)
-        if exact_count >= 1:
+        if viewer.asked_before(normalized_message):
             self.log_user(f"⚠️ {author} already asked the same thing today", "🚫")
             self.log_debug(f"Exact duplicate: {author} - '{message[:30]}...' already asked today")
-            self.filter_stats["spam"] += 1
+            self._message_filter.record_rejection("daily_limit")
             return True
         
-        # FILTER 2: Cek kemiripan dengan pesan sebelumnya
-        similarity_threshold = 0.75  # 75% kemiripan
-        for prev_normalized in viewer_data["normalized_messages"]:
-            similarity = self._calculate_similarity(normalized_message, prev_normalized)
-            if similarity > similarity_threshold:
-                self.log_user(f"⚠️ {author} already asked similar question ({similarity:.0%})", "🚫")
-                self.log_debug(f"Similar duplicate: {author} - similarity {similarity:.0%}: '{message[:30]}...'")
-                self.filter_stats["spam"] += 1
-                return True
-        
-        # 🔧 PERBAIKAN: Topic cooldown yang lebih natural (10 menit)
-        common_topics = {
-            "greeting": ["halo", "hai", "hello", "selamat", "salam", "assalamualaikum"],
-            "khodam": ["khodam", "cek", "apa khodam", "siapa khodam", "hewan apa"],
-            "eating": ["makan", "udah makan", "belum makan", "lapar"],
-            "question": ["tanya", "nanya", "mau tanya", "boleh tanya", "bisa tanya"]
-        }
-        
-        import time
-        current_time = time.time()
+        # FILTER 2: Cek kemiripan dengan pesan sebelumnya (index MinHash, bukan scan per pesan)
+        similar = self._viewer_question_index.query(features, author)
+        if similar is not None:
+            self.log_user(f"⚠️ {author} already asked similar question ({similar.similarity:.0%})", "🚫")
+            self.log_debug(f"Similar duplicate: {author} - similarity {similar.similarity:.0%}: '{message[:30]}...'")
+            self._message_filter.record_rejection("daily_limit")
+            return True
         
         # 🔧 Topic blocking dengan setting yang bisa diatur user
         if self.topic_blocking_enabled and self.topic_cooldown_minutes > 0:
-            for topic, keywords in common_topics.items():
+            for topic, keywords in _COMMON_TOPICS.items():
                 if any(keyword in normalized_message for keyword in keywords):
                     # Cek kapan terakhir kali membahas topik ini
-                    last_topic_time = viewer_data["similar_topics"].get(topic, 0)
+                    last_topic_time = viewer.topics.get(topic, 0)
                     time_diff = current_time - last_topic_time
                     
                     # Gunakan setting user untuk topic cooldown
@@ -2574,21 +2716,15 @@ Current context: Digital products sales expert"""
                         remaining_minutes = (self.topic_cooldown_minutes - time_diff) / 60
                         self.log_user(f"⏱️ {author} wait {remaining_minutes:.1f} more minutes for topic '{topic}'", "🚫")
                         self.log_debug(f"Topic cooldown: {author} - '{topic}' asked {remaining_minutes:.1f}min ago")
-                        self.filter_stats["spam"] += 1
+                        self._message_filter.record_rejection("daily_limit")
                         return True
                     
-                    # Update waktu topik terakhir
-                    viewer_data["similar_topics"][topic] = current_time
-                    self.log_debug(f"Topic tracking: {author} - '{topic}' timestamp updated")
+                    # Update waktu topik terakhir (dilupakan otomatis setelah 24 jam)
+                    self.viewer_states.touch_topic(viewer, topic, current_time)
                     break
         
         # FILTER 4: Batasi frekuensi per author dengan cooldown custom
-        if not safe_attr_check(self, 'author_last_time'):
-            self.author_last_time = {}
-
-        author_lower = author.lower().strip()
-        last_time = self.author_last_time.get(author_lower, 0)
-        time_diff = current_time - last_time
+        time_diff = current_time - viewer.last_ask
 
         # Gunakan cooldown custom dari setting
         cooldown_seconds = getattr(self, 'viewer_cooldown_minutes', 180)  # Default 3 menit jika belum diset
@@ -2603,81 +2739,30 @@ Current context: Digital products sales expert"""
             
             self.log_user(f"⏱️ {author} tunggu {time_str} lagi", "🚫")
             self.log_debug(f"User cooldown: {author} - {remaining}s remaining")
-            self.filter_stats["spam"] += 1
+            self._message_filter.record_rejection("daily_limit")
             return True
         
         # FILTER 5: Batasi maksimal interaksi per penonton per hari (custom)
         daily_limit = getattr(self, 'viewer_daily_limit', 5)
-        if viewer_data["interaction_count"] >= daily_limit:
+        if viewer.interaction_count >= daily_limit:
             self.log_user(f"⚠️ {author} has reached the limit of {daily_limit} questions today", "🚫")
-            self.log_debug(f"Daily limit: {author} - {viewer_data['interaction_count']}/{daily_limit} interactions today")
-            self.filter_stats["spam"] += 1
+            self.log_debug(f"Daily limit: {author} - {viewer.interaction_count}/{daily_limit} interactions today")
+            self._message_filter.record_rejection("daily_limit")
             return True
         
-        # Jika lolos semua filter, tambahkan ke history
-        viewer_data["messages"].append(message)
-        viewer_data["normalized_messages"].append(normalized_message)
-        viewer_data["interaction_count"] += 1
-        
-        # Update waktu terakhir author bertanya
-        self.author_last_time[author_lower] = current_time
-        
-        # Batasi history untuk menghemat memory (simpan 20 pesan terakhir)
-        if len(viewer_data["messages"]) > 20:
-            viewer_data["messages"] = viewer_data["messages"][-20:]
-            viewer_data["normalized_messages"] = viewer_data["normalized_messages"][-20:]
+        # Jika lolos semua filter, tambahkan ke history (deque 20 pesan terakhir)
+        self.viewer_states.record_question(viewer, normalized_message, current_time)
+        self._viewer_question_index.add(features, author)
         
         # Log interaksi yang valid - USER FRIENDLY
         status_emoji = {"new": "🆕", "regular": "👤", "vip": "⭐"}
-        status_icon = status_emoji.get(viewer_data['status'], "👤")
+        status_icon = status_emoji.get(viewer.status, "👤")
         
-        daily_limit = getattr(self, 'viewer_daily_limit', 5)
-        self.log_user(f"{status_icon} {author} - Question {viewer_data['interaction_count']}/{daily_limit} today", "✅")
-        self.log_debug(f"Valid interaction: {author} ({viewer_data['status']}) - {viewer_data['interaction_count']}/{daily_limit} today")
+        self.log_user(f"{status_icon} {author} - Question {viewer.interaction_count}/{daily_limit} today", "✅")
+        self.log_debug(f"Valid interaction: {author} ({viewer.status}) - {viewer.interaction_count}/{daily_limit} today")
         
         return False
 
-    def _cleanup_old_daily_data(self):
-        """Bersihkan data lebih dari 7 hari dan topic cooldown lama."""
-        from datetime import datetime, timedelta
-        import time
-        
-        today = datetime.now()
-        week_ago = today - timedelta(days=7)
-        current_time = time.time()
-        
-        expired_viewers = []
-        cleaned_topics = 0
-        
-        for author, data in self.viewer_daily_interactions.items():
-            try:
-                data_date = datetime.strptime(data["date"], "%Y-%m-%d")
-                if data_date < week_ago:
-                    expired_viewers.append(author)
-                else:
-                    # Cleanup topic cooldown yang sudah lebih dari 24 jam
-                    if "similar_topics" in data:
-                        expired_topics = []
-                        for topic, timestamp in data["similar_topics"].items():
-                            if current_time - timestamp > 86400:  # 24 jam
-                                expired_topics.append(topic)
-                        
-                        for topic in expired_topics:
-                            del data["similar_topics"][topic]
-                            cleaned_topics += 1
-                            
-            except Exception as e:
-                self.log_debug(f"Error parsing date for {author}: {e}")
-                expired_viewers.append(author)
-        
-        # Hapus viewer yang expired
-        for author in expired_viewers:
-            del self.viewer_daily_interactions[author]
-        
-                        # Log cleanup only if anything was cleaned
-        if expired_viewers or cleaned_topics:
-            self.log_debug(f"Cleanup: removed {len(expired_viewers)} old viewers, {cleaned_topics} expired topics")
-
     def _cleanup_old_viewer_data(self, current_time):
         """Bersihkan data penonton yang sudah lebih dari 24 jam."""
         expired_viewers = []
@@ -2695,33 +2780,20 @@ Current context: Digital products sales expert"""
 
     def show_filter_stats(self):
         """Tampilkan statistik filter dan interaksi harian."""
-        from datetime import datetime
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # Statistik filter biasa
-        total_filtered = sum(self.filter_stats.values())
+        # Statistik filter per stage (urutan sesuai pipeline saat ini)
+        filter_stats = self._message_filter.stats()
         
         # Statistik penonton hari ini
-        today_viewers = 0
-        total_interactions_today = 0
-        status_counts = {"new": 0, "regular": 0, "vip": 0}
-        
-        for author, data in self.viewer_daily_interactions.items():
-            if data.get("date") == today:
-                today_viewers += 1
-                total_interactions_today += data.get("interaction_count", 0)
-                status = data.get("status", "new")
-                status_counts[status] += 1
+        today_viewers, total_interactions_today, status_counts = self.viewer_states.daily_summary()
 
         stats_msg = "\n[FILTER STATISTICS]\n"
         stats_msg += "=" * 40 + "\n"
-        stats_msg += f"Toxic words: {self.filter_stats.get('toxic', 0)}\n"
-        stats_msg += f"Short messages: {self.filter_stats.get('short', 0)}\n"
-        stats_msg += f"Emoji only: {self.filter_stats.get('emoji', 0)}\n"
-        stats_msg += f"Spam/daily limit: {self.filter_stats.get('spam', 0)}\n"
-        stats_msg += f"Numeric spam: {self.filter_stats.get('numeric', 0)}\n"
+        for name, stage in filter_stats["stages"].items():
+            stats_msg += (f"{name}: {stage['rejected']} rejected / {stage['checked']} checked"
+                          f" ({stage['avg_us']:.1f} µs avg)\n")
         stats_msg += "=" * 40 + "\n"
-        stats_msg += f"Total filtered: {total_filtered}\n\n"
+        stats_msg += f"Messages checked: {filter_stats['messages']}\n"
+        stats_msg += f"Total filtered: {filter_stats['rejected']}\n\n"
         
         stats_msg += "[DAILY INTERACTIONS]\n"
         stats_msg += "=" * 40 + "\n"
@@ -2757,24 +2829,16 @@ Current context: Digital products sales expert"""
 
     def reset_filter_stats(self):
         """Reset filter statistics"""
-        self.filter_stats = {
-            "toxic": 0, "short": 0, "emoji": 0, "spam": 0, "numeric": 0
-        }
+        self._message_filter.reset_stats()
         self.log_view.append("[INFO] Filter statistics have been reset")
 
     def reset_spam_blocks(self):
         """Reset semua block spam penonton."""
         import time
 
-        # Hitung berapa yang sedang diblock
+        # Reset semua data spam (record penonton tidak menyimpan block)
         blocked_count = 0
-        if safe_attr_check(self, 'viewer_daily_interactions'):
-            current_time = time.time()
-            for author, data in self.viewer_daily_interactions.items():
-                if data.get("blocked_until", 0) > current_time:
-                    blocked_count += 1
-            # Reset semua data spam
-            self.viewer_daily_interactions.clear()
+        self.viewer_states.clear()
 
         # Reset old system juga jika ada
         if safe_attr_check(self, 'viewer_cooldowns'):
@@ -2792,8 +2856,8 @@ Current context: Digital products sales expert"""
                 prev = False
                 continue
 
-            hot = self.cfg.get("cohost_hotkey", "Ctrl+Alt+X")
-            pressed = self._is_pressed(hot)
+            parts = self._hotkey_parts
+            pressed = bool(parts) and all(keyboard.is_pressed(p) for p in parts)
 
             if pressed and not prev:
                 prev = True
@@ -3197,48 +3261,50 @@ Current context: Digital products sales expert"""
         
         logger.info("Starting CoHost Basic mode")
         
-        # 1. VALIDATE AND SET MODE
-        self.cfg.set("reply_mode", "Trigger")
-        self.cfg.set("paket", "basic")
+        # ⚡ Config writes below are flushed once when the batch block exits
+        with self.cfg.batch():
+            # 1. VALIDATE AND SET MODE
+            self.cfg.set("reply_mode", "Trigger")
+            self.cfg.set("paket", "basic")
 
-        # Reset batch counter
-        self.batch_counter = 0
-        self.is_in_cooldown = False
-        self.processing_batch = False
+            # Reset batch counter
+            self.batch_counter = 0
+            self.is_in_cooldown = False
+            self.processing_batch = False
 
-        # 2. MIGRATE OLD TRIGGER FORMAT
-        old_trigger = self.cfg.get("trigger_word", "")
-        if old_trigger and not self.cfg.get("trigger_words"):
-            self.cfg.set("trigger_words", [old_trigger])
-            self.log_view.append(f"[INFO] Migrated trigger: {old_trigger}")
+            # 2. MIGRATE OLD TRIGGER FORMAT
+            old_trigger = self.cfg.get("trigger_word", "")
+            if old_trigger and not self.cfg.get("trigger_words"):
+                self.cfg.set("trigger_words", [old_trigger])
+                self.log_view.append(f"[INFO] Migrated trigger: {old_trigger}")
 
-        # 3. VALIDATE TRIGGER WORDS
-        trigger_words = self.cfg.get("trigger_words", [])
-        if not trigger_words:
-            self.log_user("Trigger word belum diset. Silakan atur trigger terlebih dahulu.", "⚠️")
+            # 3. VALIDATE TRIGGER WORDS
+            trigger_words = self.cfg.get("trigger_words", [])
+            if not trigger_words:
+                self.log_user("Trigger word belum diset. Silakan atur trigger terlebih dahulu.", "⚠️")
             
-            return
+                return
 
-        # 4. VALIDATE PLATFORM CONFIG
-        plat = self.platform_cb.currentText()
-        self.cfg.set("platform", plat)
+            # 4. VALIDATE PLATFORM CONFIG
+            plat = self.platform_cb.currentText()
+            self.cfg.set("platform", plat)
 
-        if plat == "YouTube":
-            vid = self.cfg.get("video_id", "").strip()
-            if not vid:
-                self.log_user("Video ID YouTube belum diisi.", "⚠️")
-                return
-            if len(vid) != 11:
-                self.log_view.append(f"[ERROR] Video ID harus 11 karakter (saat ini: {len(vid)})")
-                return
-        else:  # TikTok
-            nick = self.cfg.get("tiktok_nickname", "").strip()
-            if not nick:
-                self.log_user("TikTok nickname belum diisi.", "⚠️")
-                return
-            if not nick.startswith("@"):
-                nick = "@" + nick
-                self.cfg.set("tiktok_nickname", nick)
+            if plat == "YouTube":
+                vid = self.cfg.get("video_id", "").strip()
+                if not vid:
+                    self.log_user("Video ID YouTube belum diisi.", "⚠️")
+                    return
+                if len(vid) != 11:
+                    self.log_view.append(f"[ERROR] Video ID harus 11 karakter (saat ini: {len(vid)})")
+                    return
+            else:  # TikTok
+                nick = self.cfg.get("tiktok_nickname", "").strip()
+                if not nick:
+                    self.log_user("TikTok nickname belum diisi.", "⚠️")
+                    return
+                if not nick.startswith("@"):
+                    nick = "@" + nick
+                    self.cfg.set("tiktok_nickname", nick)
 
         # 5. LOG CONFIGURATION
         self.log_user("=== StreamMate Basic Started ===", "🚀")
@@ -3260,8 +3326,9 @@ Current context: Digital products sales expert"""
         # Reset message tracking untuk session baru
         if safe_attr_check(self, 'recent_messages'):
             self.recent_messages.clear()
-        if safe_attr_check(self, 'viewer_daily_interactions'):
-            self.viewer_daily_interactions.clear()
+        self._message_filter.reset()
+        self._viewer_question_index.clear()
+        self.viewer_states.clear()
 
         # ✅ PERBAIKAN KRITIKAL: Set reply_busy = True SETELAH cleanup untuk aktivasi auto-reply
         self.reply_busy = True
@@ -3611,6 +3678,8 @@ Current context: Digital products sales expert"""
         print("[USAGE] Stopping usage tracking for cohost_basic mode")
 
         self.reply_busy = False
+        # Drop AI calls that are still waiting or running; nobody will speak them
+        get_async_ai_client().cancel_all()
         self.log_user("⏹️ Auto-reply stopped.", "🛑")
 
     def closeEvent(self, event: QCloseEvent):
@@ -3648,46 +3717,15 @@ Current context: Digital products sales expert"""
 
     def _has_trigger(self, message):
         """Check if message contains any trigger word"""
-        message_lower = message.lower().strip()
-        trigger_words = self.cfg.get("trigger_words", [])
-        
-        # Debug logging untuk troubleshooting
-        self.log_debug(f"[TRIGGER-DEBUG] Original message: '{message}'")
-        self.log_debug(f"[TRIGGER-DEBUG] Cleaned message: '{message_lower}'")
-        self.log_debug(f"[TRIGGER-DEBUG] Trigger words from config: {trigger_words}")
-        self.log_debug(f"[TRIGGER-DEBUG] Config type: {type(trigger_words)}")
-
-        if not trigger_words:
-            trigger_word = self.cfg.get("trigger_word", "").lower().strip()
-            self.log_debug(f"[TRIGGER-DEBUG] Using single trigger_word: '{trigger_word}'")
-            if trigger_word and trigger_word in message_lower:
-                self.log_debug(f"[TRIGGER-DEBUG] ✅ Single trigger matched: '{trigger_word}'")
-                self.log_user(f"🎯 TRIGGER DETECTED: '{trigger_word}' in '{message}'", "🔔")
-                return True
-        else:
-            self.log_debug(f"[TRIGGER-DEBUG] Checking {len(trigger_words)} trigger words...")
-            for i, trigger in enumerate(trigger_words):
-                trigger_clean = str(trigger).lower().strip()
-                self.log_debug(f"[TRIGGER-DEBUG] [{i+1}] Checking trigger: '{trigger_clean}' in '{message_lower}'")
-                
-                # Enhanced matching: exact word, substring, or fuzzy match
-                if trigger_clean and (
-                    trigger_clean in message_lower or 
-                    any(word.startswith(trigger_clean) for word in message_lower.split()) or
-                    any(trigger_clean in word for word in message_lower.split()) or
-                    # Fuzzy matching for similar words (like "ketua" in "ketuwa")
-                    any(abs(len(word) - len(trigger_clean)) <= 2 and 
-                        sum(c1 != c2 for c1, c2 in zip(word, trigger_clean)) <= 2
-                        for word in message_lower.split() if len(word) >= 3)
-                ):
-                    self.log_debug(f"[TRIGGER-DEBUG] ✅ Trigger matched: '{trigger_clean}'")
-                    self.log_user(f"🎯 TRIGGER DETECTED: '{trigger_clean}' in '{message}'", "🔔")
-                    return True
-                else:
-                    self.log_debug(f"[TRIGGER-DEBUG] ❌ No match for: '{trigger_clean}'")
-        
-        self.log_debug(f"[TRIGGER-DEBUG] ❌ No trigger found in message: '{message_lower}'")
-        return False
+        # ⚡ Matcher dikompilasi di _on_trigger_config_changed (exact/prefix/substring + typo)
+        match = self._trigger_matcher.match(message)
+        if match is None:
+            return False
+        if match.kind == "fuzzy":
+            self.log_debug(f"[TRIGGER] Fuzzy match '{match.word}' -> '{match.trigger}' (distance {match.distance})")
+        # message bisa berupa NormalizedMessage, log teks aslinya
+        self.log_user(f"🎯 TRIGGER DETECTED: '{match.trigger}' in '{features_for(message).raw}'", "🔔")
+        return True
 
     def _prepare_text_for_tts(self, text):
         """🔥 NEW: Prepare text specifically for TTS - separate from saving full text"""
@@ -3812,7 +3850,7 @@ Current context: Digital products sales expert"""
     
     def _analyze_basic_sentiment(self, text):
         """🚀 FAST: Basic sentiment analysis untuk local storage"""
-        text_lower = text.lower()
+        text_lower = features_for(text).lower
         
         # Quick positive check
         if any(word in text_lower for word in ["bagus", "keren", "mantap", "seru", "wow", "love", "good", "great"]):
@@ -3832,18 +3870,6 @@ Current context: Digital products sales expert"""
         
         return "neutral"
 
-        # Update recent messages untuk spam prevention
-        self.recent_messages.append((author, message))
-        if len(self.recent_messages) > self.message_history_limit:
-            self.recent_messages.pop(0)
-            
-        # PERBAIKAN: Emit signal untuk log tab dengan data lengkap
-        try:
-            self.replyGenerated.emit(author, message, reply)
-            self.log_debug(f"Signal replyGenerated emitted: {author} - {reply[:30]}...")
-        except Exception as e:
-            self.log_error(f"Error emitting replyGenerated signal: {e}")
-
     def _handle_reply_immediately(self, author, message, reply):
         """IMMEDIATE: Handle reply without delays or complex processing"""
         print(f"[HANDLE_REPLY_IMMEDIATE] ✅ SIGNAL RECEIVED!")
@@ -3861,12 +3887,54 @@ Current context: Digital products sales expert"""
             import traceback
             traceback.print_exc()
     
+    def _on_first_sentence(self, author, message, sentence):
+        """🚀 STREAMING: Speak the first sentence while the rest of the reply is generated"""
+        if not self.reply_busy or safe_attr_check(self, 'tts_active'):
+            # Something is still playing; _on_reply will speak the whole reply in order
+            return
+
+        done = threading.Event()
+        self._early_tts = (author, message, sentence, done)
+        # Audio is playing from here on: the batch queue and reply warmer wait for it
+        self.tts_active = True
+        code = "id-ID" if self.out_lang.currentText() == "Indonesia" else "en-US"
+        voice_model = self.voice_cb.currentData()
+
+        def early_tts_worker():
+            try:
+                from modules_server.tts_engine import speak
+                print(f"[TTS_EARLY] Speaking first sentence: {sentence[:50]}...")
+                speak(sentence, code, voice_model)
+            except Exception as e:
+                self.log_error(f"Early TTS error: {e}")
+            finally:
+                done.set()
+
+        threading.Thread(target=early_tts_worker, daemon=True).start()
+
+    def _release_early_tts(self, early_tts):
+        """Clear tts_active once a first sentence nobody queues behind has been spoken"""
+        if not early_tts:
+            return
+        done = early_tts[3]
+
+        def wait_for_early_tts():
+            done.wait(timeout=60)
+            self.tts_active = False
+
+        threading.Thread(target=wait_for_early_tts, daemon=True).start()
+
     def _on_reply(self, author, message, reply):
         """Handle reply dengan logging dan tracking yang lebih baik"""
         self.log_debug(f"_on_reply called: {author} - {reply}")
         print(f"[ON_REPLY] Called with author: {author}, message: {message}, reply: {reply}")
 
+        # First sentence of a streamed reply that is already being spoken
+        early_tts = self._early_tts
+        self._early_tts = None
+
         if not reply:
+            self._release_early_tts(early_tts)
             self.log_user("⚠️ Failed to generate reply", "❌")
             print(f"[ON_REPLY] No reply received, processing next batch")
             # ⚡ THREAD-SAFE FIX: Use batch_timer instead of QTimer.singleShot
@@ -3895,6 +3963,12 @@ Current context: Digital products sales expert"""
             # 🔥 PERBAIKAN: Save full text first, then truncate for TTS
             # Save complete interaction with full text
             self._save_interaction(author, message, reply)
+
+            # Update recent messages untuk spam prevention
+            self.recent_messages.append((author, message))
+            if len(self.recent_messages) > self.message_history_limit:
+                self.recent_messages.pop(0)
+            self._message_filter.remember(author, message)
             
             # Store the full reply for display
             full_reply = reply
@@ -3929,9 +4003,21 @@ Current context: Digital products sales expert"""
             # PERBAIKAN KRITIKAL: Simpan karakter count untuk tracking
             self.current_reply_char_count = len(tts_reply)
 
+            # 🚀 STREAMING: First sentence is already playing, queue only the rest behind it
+            speak_after = None
+            if early_tts and early_tts[0] == author and early_tts[1] == message:
+                tts_reply = remainder_after(tts_reply, clean_text_for_tts(early_tts[2]))
+                speak_after = early_tts[3]
+                early_tts = None  # the remainder's TTS now owns tts_active
+                print(f"[ON_REPLY] First sentence already spoken, remainder: {len(tts_reply)} chars")
+            else:
+                # Not ours: queue behind it (_do_async_tts waits while tts_active)
+                self._release_early_tts(early_tts)
+                early_tts = None
+
             # TTS dengan text yang sudah di-truncate khusus untuk TTS
             print(f"[ON_REPLY] Calling _do_async_tts...")
-            self._do_async_tts(tts_reply)
+            self._do_async_tts(tts_reply, after=speak_after)
             print(f"[ON_REPLY] _do_async_tts called successfully")
 
             # PERBAIKAN: Track activity untuk license tracking
@@ -3942,6 +4028,7 @@ Current context: Digital products sales expert"""
             import traceback
             traceback.print_exc()
             self._cleanup_tts_state()
+            self._release_early_tts(early_tts)
 
     def _get_ai_reply(self, message):
         """Get AI reply from API server as fallback"""
@@ -3953,8 +4040,12 @@ Current context: Digital products sales expert"""
             self.log_debug(f"_get_ai_reply error: {e}")
             return None
 
-    def _do_async_tts(self, text):
-        """TTS asynchronous dengan queue control yang ketat"""
+    def _do_async_tts(self, text, after=None):
+        """TTS asynchronous dengan queue control yang ketat
+
+        after: optional threading.Event of audio already playing (the streamed
+        first sentence); this text is spoken only once it is set.
+        """
         print(f"[TTS] _do_async_tts called with text: {text[:50]}...")
         import threading
         from PyQt6.QtCore import QTimer
@@ -3966,6 +4057,14 @@ Current context: Digital products sales expert"""
         if not cleaned_text:
             print(f"[TTS] Text became empty after cleaning, skipping TTS")
             self.log_debug("Text became empty after cleaning, skipping TTS")
+            if after is not None:
+                # Nothing left to say, but don't move on while the first sentence plays
+                self.tts_active = True
+                def wait_for_early_tts():
+                    after.wait(timeout=60)
+                    self.ttsFinished.emit()
+                threading.Thread(target=wait_for_early_tts, daemon=True).start()
+                return
             self._handle_tts_complete()
             return
 
@@ -3973,6 +4072,9 @@ Current context: Digital products sales expert"""
             """Worker function untuk TTS di thread terpisah"""
             try:
                 print(f"[TTS_WORKER] TTS worker started")
+                if after is not None:
+                    # Keep order: wait until the streamed first sentence has been spoken
+                    after.wait(timeout=60)
                 code = "id-ID" if self.out_lang.currentText() == "Indonesia" else "en-US"
                 voice_model = self.voice_cb.currentData()
 
@@ -4013,7 +4115,8 @@ Current context: Digital products sales expert"""
                 self.tts_active = False
 
         # PERBAIKAN: Cek apakah sedang ada TTS yang berjalan
-        if safe_attr_check(self, 'tts_active'):
+        # (with after set, the active TTS is the first sentence we chain behind)
+        if after is None and safe_attr_check(self, 'tts_active'):
             self.log_debug("TTS masih berjalan, menunda...")
             # ⚡ THREAD-SAFE FIX: Use timer from main thread instead
             if hasattr(self, 'tts_retry_timer'):
@@ -4085,6 +4188,8 @@ Current context: Digital products sales expert"""
         if not self.reply_busy:
             self.log_debug("Auto-reply stopped, clearing remaining queue")
             self.reply_queue.clear()
+            self._question_merger.clear()
+            self._prepared_replies.clear()
             self.log_user("⏹️ Auto-reply stopped.", "🛑")
             return
         
@@ -4135,6 +4240,7 @@ Current context: Digital products sales expert"""
             if len(self.reply_queue) > self.max_queue_size:
                 cleared = len(self.reply_queue)
                 self.reply_queue.clear()
+                self._question_merger.clear()
                 self.log_user(f"⚡ Emergency: Cleared {cleared} stuck items from queue", "🚨")
             
             # Force end any stuck batch
@@ -4623,10 +4729,9 @@ Current context: Digital products sales expert"""
     
     def reset_daily_interactions(self):
         """Reset semua interaksi harian dan topic cooldown."""
-        if safe_attr_check(self, 'viewer_daily_interactions'):
-            interaction_count = len(self.viewer_daily_interactions)
-            self.viewer_daily_interactions.clear()
-            self.log_view.append(f"[RESET] {interaction_count} daily interactions reset")
+        interaction_count = len(self.viewer_states)
+        self.viewer_states.clear()
+        self.log_view.append(f"[RESET] {interaction_count} daily interactions reset")
         
         self.log_view.append("[RESET] All viewers can ask questions about any topic again")
 
@@ -4706,7 +4811,9 @@ Current context: Digital products sales expert"""
                 self.log_debug(f"Status update error: {e}")
 
             # Check for triggers and process auto-reply - OPTIMIZED: Single check
-            trigger_check = self._has_trigger(message)
+            # ⚡ Normalisasi sekali; trigger, filter & klasifikasi memakai record yang sama
+            features = features_for(message)
+            trigger_check = self._has_trigger(features)
             self.log_debug(f"[ENQUEUE_LIGHTWEIGHT] Trigger check result: {trigger_check}")
             
             if trigger_check:
@@ -4804,8 +4911,9 @@ Current context: Digital products sales expert"""
 
             # Check trigger words - OPTIMIZED: Skip if already checked
             self.log_debug(f"[_ENQUEUE] Checking trigger (skip_trigger_check: {skip_trigger_check})")
+            features = features_for(message)
             if not skip_trigger_check:
-                if not self._has_trigger(message):
+                if not self._has_trigger(features):
                     self.log_debug(f"No trigger detected in: {message}")
                     return
             else:
@@ -4894,12 +5002,21 @@ Current context: Digital products sales expert"""
             self.log_debug(f"[_ENQUEUE] Activity registered successfully")
             self.log_debug(f"Processing comment from {author}: {message}")
             
+            # ⚡ REPLY WARMER: Hitung frekuensi pertanyaan untuk pre-generation
+            self._reply_warmer.observe(message, author)
+            self._last_reply_activity = time.time()
+
             # Proses batch
             if self.processing_batch:
+                # 🔗 MERGED QUESTIONS: Pertanyaan sama yang masih antri dijawab sekali
+                if self._question_merger.try_merge(author, message):
+                    self.log_user(f"🔗 {author} ikut pertanyaan yang sama di antrian", "⏳")
+                    return
                 if len(self.reply_queue) < self.max_queue_size:
                     self.reply_queue.append((author, message))
                     self.log_user(f"📋 Added to queue ({len(self.reply_queue)} items)", "⏳")
                 else:
+                    self._question_merger.discard(author, message)
                     self.log_user(f"⚠️ Queue full, skipped: {author}", "📋")
                 return
             else:
@@ -4924,6 +5041,7 @@ Current context: Digital products sales expert"""
             if not self.reply_busy:
                 self.log_debug("Auto-reply stopped, not starting batch")
                 self.reply_queue.clear()
+                self._question_merger.clear()
                 return
                 
             if not self.reply_queue:
@@ -4959,16 +5077,40 @@ Current context: Digital products sales expert"""
                     self.batch_timer.start(1000)
                     return
                 
+                # 🚀 BATCHED AI: Wait for the running batch call, then speak its replies in order
+                if self._batch_reply_in_flight:
+                    self.log_debug("Batched AI call still running, waiting for it")
+                    return
+                if self._prepared_replies:
+                    author, msg, reply = self._prepared_replies.popleft()
+                    self.log_debug(f"Speaking prepared batch reply for {author}")
+                    self._on_reply(author, msg, reply)
+                    return
+                
                 # PERBAIKAN: Cek apakah reply_queue ada dan tidak kosong
                 if not safe_attr_check(self, 'reply_queue') or self.batch_counter >= self.batch_size:
                     self.log_debug(f"Ending batch - queue empty: {not safe_attr_check(self, 'reply_queue')}, batch full: {self.batch_counter >= self.batch_size}")
                     self._end_batch()
                     return
                     
+                # 🚀 BATCHED AI: Several questions waiting -> one API call for all of them
+                room = self.batch_size - self.batch_counter
+                if (self._batched_replies and self._single_replies_due <= 0
+                        and room >= 2 and len(self.reply_queue) >= 2):
+                    take = min(room, len(self.reply_queue))
+                    items = [self.reply_queue.pop(0) for _ in range(take)]
+                    items = [(self._merged_author(a, m), m) for a, m in items]
+                    self.batch_counter += take
+                    self.log_debug(f"Batched AI call for {take} questions")
+                    self._create_batch_reply_thread(items)
+                    return
+                    
                 # PERBAIKAN: Ambil pesan dari queue dengan error handling
                 try:
                     author, msg = self.reply_queue.pop(0)
+                    author = self._merged_author(author, msg)
                     self.batch_counter += 1
+                    self._single_replies_due = max(0, self._single_replies_due - 1)
                     
                     self.log_debug(f"Processing message {self.batch_counter}/{self.batch_size}: {author} - {msg}")
                     self._create_reply_thread(author, msg)
@@ -4988,9 +5130,63 @@ Current context: Digital products sales expert"""
                 # Fallback - coba end batch
                 self._end_batch()
 
+    def _create_batch_reply_thread(self, items):
+            """🚀 BATCHED AI: Start one multi-question reply call"""
+            try:
+                self._batch_reply_in_flight = True
+                batch_thread = BatchReplyThread(
+                    items, self.out_lang.currentText(),
+                    custom_context=self._custom_context,
+                    reply_cache=self._reply_cache,
+                    queue_depth=len(self.reply_queue)
+                )
+                # Default (queued) connection: results are handled on the GUI thread
+                batch_thread.finished.connect(self.batchRepliesReady)
+                if not hasattr(self, 'threads'):
+                    self.threads = []
+                self.threads.append(batch_thread)
+                batch_thread.start()
+            except Exception as e:
+                self.log_error(f"Error creating batch reply thread: {e}")
+                self._batch_reply_in_flight = False
+                # Put the questions back and fall back to one-by-one replies
+                self.reply_queue[0:0] = items
+                self.batch_counter -= len(items)
+                self._batched_replies = False
+                self.batch_timer.start(self.reply_delay)
+
+    def _on_batch_replies(self, results):
+            """🚀 BATCHED AI: Fan replies out; re-queue questions the batch missed"""
+            self._batch_reply_in_flight = False
+            missed = []
+            for author, message, reply in results:
+                if reply:
+                    self._prepared_replies.append((author, message, reply))
+                else:
+                    missed.append((author, message))
+            if missed:
+                self.log_debug(f"Batch reply missed {len(missed)} questions, re-queueing them")
+                self.reply_queue[0:0] = missed
+                self.batch_counter -= len(missed)
+                self._single_replies_due = len(missed)
+            if not self.reply_busy:
+                self._prepared_replies.clear()
+            self._process_next_in_batch()
+
     def _create_reply_thread(self, author, message):
             """🔥 FIXED: Create reply thread and connect signals properly"""
+            self._last_reply_activity = time.time()
             try:
+                # ⚡ REPLY WARMER: Balasan sudah disiapkan saat idle, langsung ke TTS
+                warm_reply = self._reply_warmer.take(
+                    message, _classify_question(message), self.out_lang.currentText(), author,
+                    self._custom_context
+                )
+                if warm_reply:
+                    print(f"[REPLY_WARMER] Pre-generated reply for {author}: {message}")
+                    self._on_reply(author, message, _finalize_reply(author, warm_reply))
+                    return
+
                 # Fix personality combobox reference
                 personality = self.person_cb.currentText()
                 voice_model = self.voice_cb.currentData()
@@ -5019,7 +5215,12 @@ Current context: Digital products sales expert"""
                 # ✅ Create thread and connect signals
                 reply_thread = ReplyThread(
                     author, message, personality, voice_model, 
-                    language_code, lang_out
+                    language_code, lang_out,
+                    custom_context=self._custom_context,
+                    streaming=self._streaming_reply,
+                    reply_cache=self._reply_cache,
+                    # ⚡ LENGTH CONTROL: Antrian panjang -> balasan lebih pendek
+                    limits=get_length_controller().limits(len(self.reply_queue))
                 )
                 
                 # ✅ CRITICAL FIX: Direct signal connection with immediate processing
@@ -5028,6 +5229,7 @@ Current context: Digital products sales expert"""
                 # Use direct connection for immediate processing
                 print(f"[THREAD_SETUP] Connecting signal for {author}")
                 reply_thread.finished.connect(self._handle_reply_immediately, Qt.ConnectionType.DirectConnection)
+                reply_thread.firstSentence.connect(self._on_first_sentence, Qt.ConnectionType.DirectConnection)
                 print(f"[THREAD_SETUP] Signal connected successfully for {author}")
                 
                 # Store reference to prevent garbage collection
@@ -5076,6 +5278,10 @@ Current context: Digital products sales expert"""
     
     def _cleanup_all_threads(self):
         """🔧 Clean up all active threads on shutdown"""
+        # Reply threads block on their AI call; cancelling it lets them finish
+        for thread in getattr(self, 'threads', []):
+            if hasattr(thread, 'cancel') and thread.isRunning():
+                thread.cancel()
         try:
             if safe_attr_check(self, 'active_reply_threads'):
                 self.log_debug(f"Cleaning up {len(self.active_reply_threads)} reply threads...")
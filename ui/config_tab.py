@@ -2,7 +2,6 @@
 
 import json
 import os
-import requests
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
@@ -12,7 +11,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont, QIcon
 
-from modules_client.config_manager import ConfigManager
+from modules_client.config_manager import get_config_manager
+from modules_client.http_pool import http_pool
 
 class APITestThread(QThread):
     """Thread untuk test API connection"""
@@ -53,7 +53,7 @@ class APITestThread(QThread):
                 "max_tokens": 10
             }
             
-            response = requests.post(
+            response = http_pool.post(
                 "https://api.deepseek.com/v1/chat/completions",
                 headers=headers,
                 json=data,
@@ -84,7 +84,7 @@ class APITestThread(QThread):
                 "max_tokens": 10
             }
             
-            response = requests.post(
+            response = http_pool.post(
                 "https://api.openai.com/v1/chat/completions",
                 headers=headers,
                 json=data,
@@ -104,7 +104,7 @@ class ConfigTab(QWidget):
     
     def __init__(self):
         super().__init__()
-        self.cfg = ConfigManager("config/settings.json")
+        self.cfg = get_config_manager("config/settings.json")
         self.test_thread = None
         self.init_ui()
         self.load_saved_keys()
@@ -852,12 +852,9 @@ class ConfigTab(QWidget):
     def save_config(self):
         """Save configuration"""
         try:
-            # Get current config
-            config = self.cfg.get_all_settings()
-            
-            # Update API keys
-            if "api_keys" not in config:
-                config["api_keys"] = {}
+            # Local API keys only: the merged view also holds Supabase keys,
+            # which must not be written back to settings.json
+            api_keys = self.cfg.get_local("api_keys", {}) or {}
             
             api_key = self.api_key_input.text().strip()
             provider = self.provider_combo.currentText()
@@ -865,17 +862,15 @@ class ConfigTab(QWidget):
             
             if api_key:
                 if provider == "DeepSeek":
-                    config["api_keys"]["DEEPSEEK_API_KEY"] = api_key
+                    api_keys["DEEPSEEK_API_KEY"] = api_key
                 elif provider == "OpenAI (ChatGPT)":
-                    config["api_keys"]["OPENAI_API_KEY"] = api_key
-            
-            if tts_file:
-                config["google_tts_credentials"] = tts_file
+                    api_keys["OPENAI_API_KEY"] = api_key
             
-            # Save to file
-            config_path = Path("config/settings.json")
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            # Save through the shared ConfigManager so every tab sees it at once
+            with self.cfg.batch():
+                self.cfg.set("api_keys", api_keys)
+                if tts_file:
+                    self.cfg.set("google_tts_credentials", tts_file)
             
             QMessageBox.information(self, "Success", "✅ Konfigurasi berhasil disimpan!")
             self.update_status_overview()
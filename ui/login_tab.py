@@ -16,7 +16,7 @@ from PyQt6.QtCore import Qt, QSize, QTimer, QPropertyAnimation, QRect, QEasingCu
 from PyQt6.QtGui import QFont, QIcon, QPixmap, QLinearGradient, QBrush, QPalette, QColor
 
 # ─── Supabase client untuk authentication ─────────────────
-from modules_client.config_manager import ConfigManager
+from modules_client.config_manager import get_config_manager
 from modules_client.google_oauth import login_google
 from modules_client.supabase_client import SupabaseClient
 
@@ -142,7 +142,7 @@ class LoginTab(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent_window = parent
-        self.cfg = ConfigManager("config/settings.json")
+        self.cfg = get_config_manager("config/settings.json")
         self.supabase = SupabaseClient()
         
         # Animation timer untuk loading effect
@@ -144,8 +144,8 @@ DARK_THEME = """
     }
 """
 
-# Import ConfigManager
-from modules_client.config_manager import ConfigManager
+# Import shared ConfigManager getter
+from modules_client.config_manager import get_config_manager
 
 # Import Supabase client
 from modules_client.supabase_client import SupabaseClient
@@ -439,7 +439,7 @@ class MainWindow(QMainWindow):
         self._setup_icon()
         
         # Load configuration
-        self.cfg = ConfigManager("config/settings.json")
+        self.cfg = get_config_manager("config/settings.json")
         version = "v1.0.0-basic"
         self.cfg.set("app_version", version)
         